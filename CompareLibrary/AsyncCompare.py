@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# 基于asyncio的文件比对接口，用于在异步的测试框架中调用
+# 文件的读写和比对都在线程池（或者指定的执行器）中完成，不会阻塞事件循环
+#
+# 使用方法：
+#   async with AsyncCompare(CompareWithMask=True) as m_Comparer:
+#       m_Result = await m_Comparer.compare_files("work.log", "work.ref", timeout=60)
+#       m_Results = await m_Comparer.compare_many([("a.log", "a.ref"), ("b.log", "b.ref")], timeout=60)
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from CompareLibrary.CompareEngine import CompareJob, CompareDeadline, run_compare_job
+
+
+def _prepare_and_run(p_Job):
+    # 在执行器中执行，删除之前生成的dif和suc文件，然后执行比对
+    for m_szFileName in (p_Job.m_DifFileName, p_Job.m_SucFileName):
+        if os.path.exists(m_szFileName):
+            os.remove(m_szFileName)
+    return run_compare_job(p_Job)
+
+
+class AsyncCompare:
+    # 异步的文件比对
+    # 构造时指定的比对选项作为所有比对的默认值，和CompareJob的参数相同，例如：
+    #   skiplines, ignoreEmptyLine, CompareWithMask, CompareIgnoreCase, CompareIgnoreTailOrHeadBlank,
+    #   CompareEngine, CompareStreaming, DiffFormat, DiffContextLines, ResultCacheDir, CollectStats, MaxDifferences,
+    #   ParallelWorkers, CompareUnordered, ReferenceCache, ReferenceCacheDir
+    # p_Executor      执行比对的执行器，默认是一个线程池
+    #                 使用进程池的时候，比对只能在开始之前被取消，已经开始的比对只受超时时间的限制
+    # p_nMaxWorkers   默认线程池的大小
+    def __init__(self, p_Executor=None, p_nMaxWorkers=None, **CompareOptions):
+        self.m_Executor = p_Executor
+        self.m_bOwnExecutor = p_Executor is None
+        if self.m_bOwnExecutor:
+            self.m_Executor = ThreadPoolExecutor(max_workers=p_nMaxWorkers,
+                                                 thread_name_prefix="AsyncCompare")
+        self.m_nTimeout = CompareOptions.pop("Timeout", None)
+        self.m_CompareOptions = CompareOptions
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        # 关闭默认的线程池，外部传入的执行器由调用者负责关闭
+        if self.m_bOwnExecutor and self.m_Executor is not None:
+            self.m_Executor.shutdown(wait=False)
+            self.m_Executor = None
+
+    @staticmethod
+    def result_files(p_szWorkFile):
+        # 和Compare_Files相同，如果定义了T_WORK，则dif和suc文件生成在T_WORK下, 否则生成在当前目录下
+        (m_ShortWorkFileName, _) = os.path.splitext(os.path.basename(p_szWorkFile))
+        if "T_WORK" in os.environ:
+            m_szDirectory = os.environ["T_WORK"]
+        else:
+            m_szDirectory = os.getcwd()
+        return (os.path.join(m_szDirectory, m_ShortWorkFileName + '.dif'),
+                os.path.join(m_szDirectory, m_ShortWorkFileName + '.suc'))
+
+    async def compare_files(self, p_szWorkFile, p_szReferenceFile,
+                            p_szDifFile=None, p_szSucFile=None, timeout=None, **CompareOptions):
+        # 比对两个文件，返回一个字典，和Compare_Files_Batch返回的每一项相同
+        #   work           当前结果文件
+        #   reference      结果参考文件
+        #   result         True表示比对成功，False表示比对中发现了差异
+        #   file           生成的dif或者suc文件
+        #   message        比对失败时的错误信息
+        #   aborted        比对超时时为TIMEOUT，差异超过了最多查找的差异行数时为TRUNCATED，否则为None
+        #   stats          比对的统计信息，只有在CollectStats为True的时候才有
+        # timeout         比对的超时时间（秒），从调用时开始计算，默认使用构造时指定的Timeout
+        #                 超时的时候不会抛出例外，而是返回不完整的比对结果，作为存在差异处理
+        # 调用者取消的时候，正在执行的比对会在下一次检查截止时间的时候中止，不会生成dif文件
+        if self.m_Executor is None:
+            raise RuntimeError("AsyncCompare is closed")
+        (m_szDifFile, m_szSucFile) = self.result_files(p_szWorkFile)
+        if p_szDifFile is not None:
+            m_szDifFile = p_szDifFile
+        if p_szSucFile is not None:
+            m_szSucFile = p_szSucFile
+        m_Options = dict(self.m_CompareOptions)
+        m_Options.update(CompareOptions)
+        m_Options.pop("Timeout", None)
+        m_Job = CompareJob(p_szWorkFile, p_szReferenceFile, m_szDifFile, m_szSucFile, **m_Options)
+        m_Job.m_Deadline = CompareDeadline(self.m_nTimeout if timeout is None else timeout)
+
+        m_Future = self.m_Executor.submit(_prepare_and_run, m_Job)
+        try:
+            (m_CompareResult, m_ErrorMessage, m_Stats, m_Aborted) = await asyncio.wrap_future(m_Future)
+        except asyncio.CancelledError:
+            # 还没有开始的比对直接取消，已经开始的比对通过截止时间中的取消标志中止
+            m_Future.cancel()
+            m_Job.m_Deadline.cancel()
+            raise
+        except Exception as ex:
+            (m_CompareResult, m_ErrorMessage, m_Stats, m_Aborted) = \
+                (False, 'Fatal Compare Exception:: ' + repr(ex), None, None)
+
+        m_szFile = None
+        if m_ErrorMessage is None:
+            m_szFile = m_szSucFile if m_CompareResult else m_szDifFile
+        return {
+            "work": p_szWorkFile,
+            "reference": p_szReferenceFile,
+            "result": m_CompareResult,
+            "file": m_szFile,
+            "message": m_ErrorMessage,
+            "aborted": m_Aborted,
+            "stats": None if m_Stats is None else m_Stats.as_dict()
+        }
+
+    async def compare_many(self, p_FilePairs, timeout=None, **CompareOptions):
+        # 同时比对多组文件，p_FilePairs中的每一项为(当前结果文件, 结果参考文件)
+        # 返回一个列表，顺序和p_FilePairs相同，每一项和compare_files的返回值相同
+        # 每一组文件有各自的超时时间，同时执行的比对个数受执行器大小的限制
+        return await asyncio.gather(*[
+            self.compare_files(m_szWorkFile, m_szReferenceFile, timeout=timeout, **CompareOptions)
+            for (m_szWorkFile, m_szReferenceFile) in p_FilePairs])
@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+# POSIXCompare的性能测试
+# 生成不同场景、不同大小的工作文件和参考文件，分别统计各种比对方式的耗时和内存峰值
+#
+# 使用方法：
+#   python -m CompareLibrary.CompareBenchmark --sizes 1000,10000,100000 --output result.json
+#   python -m CompareLibrary.CompareBenchmark --baseline last_release.json
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+from CompareLibrary.CompareEngine import POSIXCompare, SkipLineFilter
+
+
+# 支持的测试场景
+#   IDENTICAL   两个文件完全相同
+#   SPARSE      每一万行有一处差异
+#   DENSE       每一百行有一处差异，差异包括修改、增加和删除
+#   MASK        参考文件中有五分之一的行是正则表达式，比对时启用正则，每一万行有一处差异
+#   SKIP        工作文件和参考文件中有三成的行需要被忽略，使用多个忽略行的正则表达式，每一万行有一处差异
+SCENARIOS = ["IDENTICAL", "SPARSE", "DENSE", "MASK", "SKIP"]
+
+# 支持的比对方式
+#   COMPARE       文件内容读入内存后调用POSIXCompare.compare，分别测试MYERS和LCS
+#   FILES         调用POSIXCompare.compare_text_files，分别测试MYERS和LCS
+#   STREAMING     调用POSIXCompare.compare_text_files_streaming
+#   PARALLEL      和FILES相同，但是启用分段并行比对，进程数为CPU的个数（至少为2）
+PATHS = ["COMPARE", "FILES", "STREAMING", "PARALLEL"]
+ENGINES = [POSIXCompare.ENGINE_MYERS, POSIXCompare.ENGINE_LCS]
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# LCS算法的耗时和内存都是O(N*M)，超过这个行数的测试会被跳过
+DEFAULT_LCS_MAX_LINES = 2000
+
+# DENSE场景中Myers算法的耗时和差异的多少相关，超过这个行数的测试会被跳过
+DEFAULT_DENSE_MAX_LINES = 100000
+
+# 导入时间的测试，分别在新的Python进程中导入这些模块，比对引擎不能导入Robot，并且导入时间不能超过预算
+#   CompareLibrary.CompareEngine   比对引擎，进程池的子进程中只需要导入这个模块
+#   CompareLibrary.RunCompare      Robot的关键字库，作为参考，没有预算
+IMPORT_MODULES = ["CompareLibrary.CompareEngine", "CompareLibrary.RunCompare"]
+IMPORT_BUDGET_MODULES = ["CompareLibrary.CompareEngine"]
+DEFAULT_IMPORT_BUDGET = 0.05
+
+# SKIP场景中使用的忽略行
+SKIP_PATTERNS = [r"DEBUG heartbeat .*",
+                 r"TRACE \d+ .*",
+                 r"Elapsed: [\d.]+ sec",
+                 r"Connected to server .* at \d\d:\d\d:\d\d",
+                 r"\[GC .*\]"] + [r"NOISE%02d .*" % m_nPos for m_nPos in range(15)]
+
+
+def _format_line(p_Random, p_nLineNo):
+    # 生成一行模拟的日志内容
+    return "%08d worker-%d processed request %d status=%s rows=%d" % (
+        p_nLineNo, p_Random.randint(1, 8), p_Random.randint(1, 1000000),
+        p_Random.choice(["OK", "OK", "OK", "RETRY", "FAILED"]), p_Random.randint(0, 100000))
+
+
+def _skip_line(p_Random):
+    # 生成一行需要被忽略的内容，工作文件和参考文件中的内容是不同的
+    m_nPattern = p_Random.randint(0, 5)
+    if m_nPattern == 0:
+        return "DEBUG heartbeat %d" % p_Random.randint(0, 1000000)
+    elif m_nPattern == 1:
+        return "TRACE %d enter" % p_Random.randint(0, 1000000)
+    elif m_nPattern == 2:
+        return "Elapsed: %.2f sec" % p_Random.random()
+    elif m_nPattern == 3:
+        return "Connected to server db%d at %02d:%02d:%02d" % (
+            p_Random.randint(0, 9), p_Random.randint(0, 23), p_Random.randint(0, 59), p_Random.randint(0, 59))
+    elif m_nPattern == 4:
+        return "[GC pause %dms]" % p_Random.randint(0, 1000)
+    else:
+        return "NOISE%02d %d" % (p_Random.randint(0, 14), p_Random.randint(0, 1000000))
+
+
+def _write_lines(p_szFileName, p_Lines):
+    with open(p_szFileName, mode='w', encoding='utf-8') as m_File:
+        for m_Line in p_Lines:
+            m_File.write(m_Line)
+            m_File.write('\n')
+
+
+def generate_log_pair(p_szDirectory, p_szScenario, p_nLines, p_nSeed=0):
+    """ 生成一组测试用的工作文件和参考文件  """
+    """
+    输入参数：
+         p_szDirectory:        文件生成的目录，如果文件已经存在，则直接使用
+         p_szScenario:         测试场景，参考SCENARIOS
+         p_nLines:             工作文件的行数
+         p_nSeed:              随机数种子，相同的种子生成的文件内容相同
+    返回值：
+        (工作文件, 参考文件, 比对选项)，比对选项是一个字典，可以直接作为compare_text_files的参数
+    """
+    p_szScenario = str(p_szScenario).upper()
+    if p_szScenario not in SCENARIOS:
+        raise ValueError("Unknown benchmark scenario [%s]" % p_szScenario)
+    m_szWorkFile = os.path.join(p_szDirectory, "%s_%d_%d.log" % (p_szScenario.lower(), p_nLines, p_nSeed))
+    m_szReferenceFile = os.path.join(p_szDirectory, "%s_%d_%d.ref" % (p_szScenario.lower(), p_nLines, p_nSeed))
+    m_Options = {}
+    if p_szScenario == "MASK":
+        m_Options["CompareWithMask"] = True
+    if p_szScenario == "SKIP":
+        m_Options["skiplines"] = list(SKIP_PATTERNS)
+    if os.path.isfile(m_szWorkFile) and os.path.isfile(m_szReferenceFile):
+        return m_szWorkFile, m_szReferenceFile, m_Options
+
+    m_Random = random.Random("%s-%d-%d" % (p_szScenario, p_nLines, p_nSeed))
+    m_WorkLines = []
+    m_RefLines = []
+    for m_nLineNo in range(p_nLines):
+        m_Line = _format_line(m_Random, m_nLineNo)
+        m_WorkLines.append(m_Line)
+        m_RefLines.append(m_Line)
+
+    if p_szScenario == "MASK":
+        # 参考文件中用正则表达式代替每一行中变化的部分，正则表达式的种类不多，和实际的参考文件类似
+        for m_nLineNo in range(0, p_nLines, 5):
+            m_Fields = m_WorkLines[m_nLineNo].split(' ')
+            m_RefLines[m_nLineNo] = " ".join(m_Fields[:4]) + r" \d+ status=\w+ rows=\d+"
+
+    if p_szScenario == "SKIP":
+        # 工作文件和参考文件中插入内容不同的需要忽略的行
+        for m_Lines in (m_WorkLines, m_RefLines):
+            m_Mixed = []
+            for m_Line in m_Lines:
+                while m_Random.random() < 0.3:
+                    m_Mixed.append(_skip_line(m_Random))
+                m_Mixed.append(m_Line)
+            m_Lines[:] = m_Mixed
+
+    if p_szScenario == "DENSE":
+        m_nChanges = max(p_nLines // 100, 1)
+    elif p_szScenario == "IDENTICAL":
+        m_nChanges = 0
+    else:
+        m_nChanges = max(p_nLines // 10000, 1)
+    for m_nPos in sorted(m_Random.sample(range(len(m_RefLines)), min(m_nChanges, len(m_RefLines))),
+                         reverse=True):
+        if p_szScenario == "DENSE":
+            m_nAction = m_Random.randint(0, 2)
+        else:
+            m_nAction = 0
+        if m_nAction == 0:
+            m_RefLines[m_nPos] = "changed " + m_RefLines[m_nPos]
+        elif m_nAction == 1:
+            m_RefLines.insert(m_nPos, "inserted line %d" % m_nPos)
+        else:
+            del m_RefLines[m_nPos]
+
+    _write_lines(m_szWorkFile, m_WorkLines)
+    _write_lines(m_szReferenceFile, m_RefLines)
+    return m_szWorkFile, m_szReferenceFile, m_Options
+
+
+def _run_case(p_szPath, p_szEngine, p_szWorkFile, p_szReferenceFile, p_Options):
+    # 执行一次比对，返回(比对结果, 比对结果的行数)
+    # 比对结果是生成器的时候，需要全部消费掉，这样才包含了输出比对结果的开销
+    m_Comparer = POSIXCompare()
+    if p_szPath == "COMPARE":
+        m_SkipFilter = SkipLineFilter(p_Options.get("skiplines"), False)
+        with open(p_szWorkFile, mode='r', encoding='utf-8') as m_File:
+            (x, linenox) = m_Comparer.normalize_lines(m_File, m_SkipFilter)
+        with open(p_szReferenceFile, mode='r', encoding='utf-8') as m_File:
+            (y, linenoy) = m_Comparer.normalize_lines(m_File, m_SkipFilter)
+        (m_CompareResult, m_CompareResultList) = m_Comparer.compare(
+            x, y, linenox, linenoy,
+            p_compare_maskEnabled=p_Options.get("CompareWithMask", False),
+            p_compare_engine=p_szEngine)
+        return m_CompareResult, len(m_CompareResultList)
+    elif p_szPath in ("FILES", "PARALLEL"):
+        if p_szPath == "PARALLEL":
+            m_Comparer.m_ParallelWorkers = max(os.cpu_count() or 1, 2)
+        (m_CompareResult, m_CompareResultList) = m_Comparer.compare_text_files(
+            p_szWorkFile, p_szReferenceFile,
+            skiplines=p_Options.get("skiplines"),
+            CompareWithMask=p_Options.get("CompareWithMask"),
+            CompareEngine=p_szEngine)
+        m_nRows = 0
+        for _ in m_CompareResultList:
+            m_nRows = m_nRows + 1
+        return m_CompareResult, m_nRows
+    else:
+        m_CompareResult = True
+        m_nRows = 0
+        for m_Row in m_Comparer.compare_text_files_streaming(
+                p_szWorkFile, p_szReferenceFile,
+                skiplines=p_Options.get("skiplines"),
+                CompareWithMask=p_Options.get("CompareWithMask")):
+            if m_Row[0] in ('+', '-'):
+                m_CompareResult = False
+            m_nRows = m_nRows + 1
+        return m_CompareResult, m_nRows
+
+
+def measure_import_time(p_szModule, p_nRepeat=5):
+    """ 测量在一个新的Python进程中导入模块的耗时  """
+    """
+    输入参数：
+         p_szModule:           模块的名称
+         p_nRepeat:            重复的次数，耗时取最小值
+    返回值：
+        (耗时（秒）, 是否导入了Robot)
+        耗时通过python -X importtime统计，包括CompareLibrary包本身和这个模块导入的所有模块
+    """
+    m_szCode = "import sys, %s; sys.stdout.write(str('robot' in sys.modules))" % p_szModule
+    # 安装后的模块都有编译好的字节码，所以允许写入字节码，第一次导入之后的测量不包括编译的时间
+    m_Environ = dict(os.environ)
+    m_Environ.pop("PYTHONDONTWRITEBYTECODE", None)
+    m_nSeconds = None
+    m_bRobotImported = None
+    for _ in range(max(int(p_nRepeat), 1)):
+        m_Process = subprocess.run([sys.executable, "-X", "importtime", "-c", m_szCode],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   universal_newlines=True, check=True, env=m_Environ,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        # 每一行的格式为 import time: self [us] | cumulative | imported package，嵌套导入的模块名前有缩进
+        m_nMicroSeconds = 0
+        for m_Line in m_Process.stderr.splitlines():
+            m_Fields = m_Line.split('|')
+            if len(m_Fields) != 3 or not m_Line.startswith("import time:"):
+                continue
+            m_szName = m_Fields[2].rstrip()
+            if m_szName.startswith("  "):
+                continue
+            if m_szName.strip() == "CompareLibrary" or m_szName.strip() == p_szModule:
+                m_nMicroSeconds = m_nMicroSeconds + int(m_Fields[1])
+        if m_nSeconds is None or m_nMicroSeconds / 1000000.0 < m_nSeconds:
+            m_nSeconds = m_nMicroSeconds / 1000000.0
+        m_bRobotImported = m_Process.stdout.strip() == "True"
+    return m_nSeconds, m_bRobotImported
+
+
+def run_import_benchmark(p_nBudget=DEFAULT_IMPORT_BUDGET, p_nRepeat=5):
+    """ 测量各个模块的导入时间  """
+    """
+    输入参数：
+         p_nBudget:            比对引擎导入时间的预算（秒）
+         p_nRepeat:            每个模块重复测量的次数
+    返回值：
+        一个列表，每一项对应IMPORT_MODULES中的一个模块
+            module          模块的名称
+            seconds         导入的耗时（秒）
+            robot_imported  是否导入了Robot
+            budget          导入时间的预算，没有预算时为None
+            passed          是否满足预算，并且没有导入Robot，没有预算时为None
+    """
+    m_Results = []
+    for m_szModule in IMPORT_MODULES:
+        (m_nSeconds, m_bRobotImported) = measure_import_time(m_szModule, p_nRepeat)
+        m_nBudget = p_nBudget if m_szModule in IMPORT_BUDGET_MODULES else None
+        m_Results.append({
+            "module": m_szModule,
+            "seconds": round(m_nSeconds, 6),
+            "robot_imported": m_bRobotImported,
+            "budget": m_nBudget,
+            "passed": None if m_nBudget is None else (m_nSeconds <= m_nBudget and not m_bRobotImported)
+        })
+    return m_Results
+
+
+def run_benchmark(p_Scenarios=None, p_Sizes=None, p_Paths=None, p_Engines=None,
+                  p_szDirectory=None, p_nRepeat=1, p_nSeed=0,
+                  p_bMeasureMemory=True,
+                  p_nLCSMaxLines=DEFAULT_LCS_MAX_LINES,
+                  p_nDenseMaxLines=DEFAULT_DENSE_MAX_LINES,
+                  p_Output=None):
+    """ 执行性能测试  """
+    """
+    输入参数：
+         p_Scenarios:          测试场景的列表，默认是全部场景
+         p_Sizes:              工作文件行数的列表，默认是1000到1000000
+         p_Paths:              比对方式的列表，默认是全部比对方式
+         p_Engines:            比对算法的列表，默认是MYERS和LCS，STREAMING总是使用MYERS
+         p_szDirectory:        测试文件生成的目录，默认是一个临时目录，测试完成后会被删除
+         p_nRepeat:            每个测试重复的次数，耗时取最小值
+         p_nSeed:              生成测试文件的随机数种子
+         p_bMeasureMemory:     是否统计内存峰值，内存峰值通过tracemalloc单独执行一次来统计，不影响耗时的统计
+         p_nLCSMaxLines:       LCS算法测试的最大行数，超过的测试会被跳过
+         p_nDenseMaxLines:     DENSE场景测试的最大行数，超过的测试会被跳过
+         p_Output:             每个测试完成后调用的函数，参数为测试结果
+    返回值：
+        一个字典，包括测试的环境信息，以及results，results中的每一项对应一个测试的结果
+            scenario        测试场景
+            lines           工作文件的行数
+            path            比对方式
+            engine          比对算法
+            seconds         耗时（秒）
+            peak_memory     内存峰值（字节），没有统计时为None
+            result          比对结果，True表示没有差异
+            rows            比对结果的行数
+    """
+    m_Scenarios = [str(m_Scenario).upper() for m_Scenario in (p_Scenarios or SCENARIOS)]
+    m_Sizes = [int(m_nSize) for m_nSize in (p_Sizes or DEFAULT_SIZES)]
+    m_Paths = [str(m_Path).upper() for m_Path in (p_Paths or PATHS)]
+    m_Engines = [str(m_Engine).upper() for m_Engine in (p_Engines or ENGINES)]
+    for m_Path in m_Paths:
+        if m_Path not in PATHS:
+            raise ValueError("Unknown benchmark path [%s]" % m_Path)
+
+    m_bRemoveDirectory = False
+    if p_szDirectory is None:
+        p_szDirectory = tempfile.mkdtemp(prefix="compare_benchmark_")
+        m_bRemoveDirectory = True
+    elif not os.path.isdir(p_szDirectory):
+        os.makedirs(p_szDirectory)
+
+    m_Results = []
+    try:
+        for m_szScenario in m_Scenarios:
+            for m_nLines in m_Sizes:
+                if m_szScenario == "DENSE" and 0 < p_nDenseMaxLines < m_nLines:
+                    continue
+                (m_szWorkFile, m_szReferenceFile, m_Options) = \
+                    generate_log_pair(p_szDirectory, m_szScenario, m_nLines, p_nSeed)
+                for m_szPath in m_Paths:
+                    if m_szPath == "STREAMING":
+                        m_CaseEngines = [POSIXCompare.ENGINE_MYERS]
+                    else:
+                        m_CaseEngines = m_Engines
+                    for m_szEngine in m_CaseEngines:
+                        if m_szEngine == POSIXCompare.ENGINE_LCS and 0 < p_nLCSMaxLines < m_nLines:
+                            continue
+                        m_nSeconds = None
+                        for _ in range(max(int(p_nRepeat), 1)):
+                            m_nStart = time.perf_counter()
+                            (m_CompareResult, m_nRows) = _run_case(m_szPath, m_szEngine,
+                                                                   m_szWorkFile, m_szReferenceFile, m_Options)
+                            m_nElapsed = time.perf_counter() - m_nStart
+                            if m_nSeconds is None or m_nElapsed < m_nSeconds:
+                                m_nSeconds = m_nElapsed
+                        m_nPeakMemory = None
+                        if p_bMeasureMemory:
+                            tracemalloc.start()
+                            try:
+                                _run_case(m_szPath, m_szEngine, m_szWorkFile, m_szReferenceFile, m_Options)
+                                m_nPeakMemory = tracemalloc.get_traced_memory()[1]
+                            finally:
+                                tracemalloc.stop()
+                        m_Result = {
+                            "scenario": m_szScenario,
+                            "lines": m_nLines,
+                            "path": m_szPath,
+                            "engine": m_szEngine,
+                            "seconds": round(m_nSeconds, 6),
+                            "peak_memory": m_nPeakMemory,
+                            "result": m_CompareResult,
+                            "rows": m_nRows
+                        }
+                        m_Results.append(m_Result)
+                        if p_Output is not None:
+                            p_Output(m_Result)
+    finally:
+        if m_bRemoveDirectory:
+            shutil.rmtree(p_szDirectory, ignore_errors=True)
+
+    return {
+        "library_version": _library_version(),
+        "engine_version": POSIXCompare.ENGINE_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": p_nSeed,
+        "results": m_Results
+    }
+
+
+def compare_benchmark(p_Baseline, p_Current):
+    """ 比较两次性能测试的结果  """
+    """
+    输入参数：
+         p_Baseline:           作为基准的测试结果，即run_benchmark的返回值
+         p_Current:            当前的测试结果
+    返回值：
+        一个列表，每一项对应一个在两次测试中都存在的测试，包括scenario、lines、path、engine，
+        以及seconds_ratio和memory_ratio，表示当前结果和基准结果的比值，小于1表示性能有提高
+    """
+    m_Baseline = {}
+    for m_Result in p_Baseline["results"]:
+        m_Baseline[(m_Result["scenario"], m_Result["lines"], m_Result["path"], m_Result["engine"])] = m_Result
+    m_Comparison = []
+    for m_Result in p_Current["results"]:
+        m_BaseResult = m_Baseline.get((m_Result["scenario"], m_Result["lines"], m_Result["path"], m_Result["engine"]))
+        if m_BaseResult is None:
+            continue
+        m_Comparison.append({
+            "scenario": m_Result["scenario"],
+            "lines": m_Result["lines"],
+            "path": m_Result["path"],
+            "engine": m_Result["engine"],
+            "seconds_ratio": _ratio(m_Result["seconds"], m_BaseResult["seconds"]),
+            "memory_ratio": _ratio(m_Result["peak_memory"], m_BaseResult["peak_memory"])
+        })
+    return m_Comparison
+
+
+def _ratio(p_nCurrent, p_nBaseline):
+    if p_nCurrent is None or not p_nBaseline:
+        return None
+    return round(float(p_nCurrent) / p_nBaseline, 3)
+
+
+def _library_version():
+    try:
+        from CompareLibrary import ROBOT_LIBRARY_VERSION
+        return ROBOT_LIBRARY_VERSION
+    except ImportError:
+        return None
+
+
+def _print_result(p_Result):
+    if p_Result["peak_memory"] is None:
+        m_szMemory = "-"
+    else:
+        m_szMemory = "%.1fMB" % (p_Result["peak_memory"] / 1024.0 / 1024.0)
+    print("%-10s %9d %-10s %-6s %10.3fs %10s %6s %9d" % (
+        p_Result["scenario"], p_Result["lines"], p_Result["path"], p_Result["engine"],
+        p_Result["seconds"], m_szMemory, p_Result["result"], p_Result["rows"]))
+    sys.stdout.flush()
+
+
+def _split_list(p_szValue):
+    return [m_Item.strip() for m_Item in p_szValue.split(',') if m_Item.strip() != '']
+
+
+def main(argv=None):
+    m_Parser = argparse.ArgumentParser(prog="python -m CompareLibrary.CompareBenchmark",
+                                       description="Benchmark POSIXCompare on synthetic log files.")
+    m_Parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                          help="comma separated scenarios, default: %(default)s")
+    m_Parser.add_argument("--sizes", default=",".join([str(m_nSize) for m_nSize in DEFAULT_SIZES]),
+                          help="comma separated line counts, default: %(default)s")
+    m_Parser.add_argument("--paths", default=",".join(PATHS),
+                          help="comma separated compare paths, default: %(default)s")
+    m_Parser.add_argument("--engines", default=",".join(ENGINES),
+                          help="comma separated compare engines, default: %(default)s")
+    m_Parser.add_argument("--repeat", type=int, default=1,
+                          help="run each case N times and keep the fastest, default: %(default)s")
+    m_Parser.add_argument("--seed", type=int, default=0,
+                          help="random seed of the generated files, default: %(default)s")
+    m_Parser.add_argument("--workdir", default=None,
+                          help="directory of the generated files, they are kept and reused if given")
+    m_Parser.add_argument("--lcs-max-lines", type=int, default=DEFAULT_LCS_MAX_LINES,
+                          help="skip LCS cases larger than this, 0 means no limit, default: %(default)s")
+    m_Parser.add_argument("--dense-max-lines", type=int, default=DEFAULT_DENSE_MAX_LINES,
+                          help="skip DENSE cases larger than this, 0 means no limit, default: %(default)s")
+    m_Parser.add_argument("--no-memory", action="store_true",
+                          help="do not measure peak memory")
+    m_Parser.add_argument("--output", default=None,
+                          help="write the results as JSON to this file")
+    m_Parser.add_argument("--baseline", default=None,
+                          help="JSON results of a previous run to compare with")
+    m_Parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET,
+                          help="import time budget of the compare engine in seconds, default: %(default)s")
+    m_Parser.add_argument("--no-import", action="store_true",
+                          help="do not measure the import time")
+    m_Args = m_Parser.parse_args(argv)
+
+    m_ImportResults = None
+    if not m_Args.no_import:
+        m_ImportResults = run_import_benchmark(m_Args.import_budget)
+        print("%-30s %11s %8s %8s" % ("MODULE", "IMPORT", "ROBOT", "BUDGET"))
+        for m_Item in m_ImportResults:
+            print("%-30s %10.3fs %8s %8s" % (
+                m_Item["module"], m_Item["seconds"], m_Item["robot_imported"],
+                "-" if m_Item["passed"] is None else ("OK" if m_Item["passed"] else "EXCEEDED")))
+        print("")
+
+    print("%-10s %9s %-10s %-6s %11s %10s %6s %9s" % (
+        "SCENARIO", "LINES", "PATH", "ENGINE", "TIME", "MEMORY", "RESULT", "ROWS"))
+    m_Benchmark = run_benchmark(p_Scenarios=_split_list(m_Args.scenarios),
+                                p_Sizes=_split_list(m_Args.sizes),
+                                p_Paths=_split_list(m_Args.paths),
+                                p_Engines=_split_list(m_Args.engines),
+                                p_szDirectory=m_Args.workdir,
+                                p_nRepeat=m_Args.repeat,
+                                p_nSeed=m_Args.seed,
+                                p_bMeasureMemory=not m_Args.no_memory,
+                                p_nLCSMaxLines=m_Args.lcs_max_lines,
+                                p_nDenseMaxLines=m_Args.dense_max_lines,
+                                p_Output=_print_result)
+    m_Benchmark["import"] = m_ImportResults
+    if m_Args.output is not None:
+        with open(m_Args.output, mode='w', encoding='utf-8') as m_File:
+            json.dump(m_Benchmark, m_File, indent=2)
+    if m_Args.baseline is not None:
+        with open(m_Args.baseline, mode='r', encoding='utf-8') as m_File:
+            m_Baseline = json.load(m_File)
+        print("")
+        print("Compared with [%s] (library %s):" % (m_Args.baseline, m_Baseline.get("library_version")))
+        print("%-10s %9s %-10s %-6s %8s %8s" % ("SCENARIO", "LINES", "PATH", "ENGINE", "TIME", "MEMORY"))
+        for m_Item in compare_benchmark(m_Baseline, m_Benchmark):
+            print("%-10s %9d %-10s %-6s %8s %8s" % (
+                m_Item["scenario"], m_Item["lines"], m_Item["path"], m_Item["engine"],
+                "-" if m_Item["seconds_ratio"] is None else "%.2fx" % m_Item["seconds_ratio"],
+                "-" if m_Item["memory_ratio"] is None else "%.2fx" % m_Item["memory_ratio"]))
+    if m_ImportResults is not None and any(m_Item["passed"] is False for m_Item in m_ImportResults):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2945 @@
+# -*- coding: UTF-8 -*-
+# 文件比对的核心实现，不依赖Robot，可以在普通的Python程序以及进程池的子进程中直接使用
+# Robot的关键字在RunCompare中定义
+import os
+import re
+import sys
+import mmap
+import marshal
+import json
+import shutil
+import hashlib
+import time
+import threading
+import shlex
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from itertools import islice
+
+
+class DiffException(Exception):
+    def __init__(self, message):
+        Exception.__init__(self)
+        self.message = message
+
+    def __reduce__(self):
+        # 例外需要从分段比对的子进程中传回
+        return self.__class__, (self.message, )
+
+
+class CompareAborted(DiffException):
+    # 比对超过了截止时间或者被取消
+    #   reason    TIMEOUT或者CANCELLED
+    # 差异超过了最多查找的差异行数时比对也会提前结束，这种情况不抛出例外，比对任务的中止原因为TRUNCATED
+    TIMEOUT = "TIMEOUT"
+    CANCELLED = "CANCELLED"
+    TRUNCATED = "TRUNCATED"
+
+    def __init__(self, reason, message):
+        DiffException.__init__(self, message)
+        self.reason = reason
+
+    def __reduce__(self):
+        return self.__class__, (self.reason, self.message)
+
+
+class CompareDeadline:
+    # 比对的截止时间以及取消标志，比对的各个循环中会定期调用check
+    # 超过截止时间或者被取消后，check会抛出CompareAborted，比对在下一次检查的时候中止
+    # 在进程之间传递时取消标志不会被传递，子进程中只检查截止时间
+    def __init__(self, p_nTimeout=None):
+        self.m_nTimeout = None if p_nTimeout is None else float(p_nTimeout)
+        self.m_nDeadline = None if p_nTimeout is None else time.time() + float(p_nTimeout)
+        self.m_Cancelled = threading.Event()
+
+    def cancel(self):
+        self.m_Cancelled.set()
+
+    def cancelled(self):
+        return self.m_Cancelled.is_set()
+
+    def expired(self):
+        return self.m_nDeadline is not None and time.time() >= self.m_nDeadline
+
+    def check(self):
+        if self.m_Cancelled.is_set():
+            raise CompareAborted(CompareAborted.CANCELLED, 'Compare cancelled')
+        if self.m_nDeadline is not None and time.time() >= self.m_nDeadline:
+            raise CompareAborted(CompareAborted.TIMEOUT,
+                                 'Compare timeout after %g seconds, too many differences' % self.m_nTimeout)
+
+    def __getstate__(self):
+        return {"m_nTimeout": self.m_nTimeout, "m_nDeadline": self.m_nDeadline}
+
+    def __setstate__(self, p_State):
+        self.__dict__.update(p_State)
+        self.m_Cancelled = threading.Event()
+
+
+class RegexPatternCache:
+    # 编译后正则表达式的LRU缓存，容量有限，可以在多线程中使用
+    # 无法编译的表达式（通常并不是一个正则表达式）也会被缓存，避免反复编译失败
+    DEFAULT_MAXSIZE = 4096
+
+    # 用来标记无法编译的表达式
+    INVALID_PATTERN = object()
+
+    def __init__(self, p_nMaxSize=DEFAULT_MAXSIZE):
+        self.m_Lock = threading.Lock()
+        self.m_Patterns = OrderedDict()
+        self.m_nMaxSize = max(int(p_nMaxSize), 1)
+        self.m_nHits = 0
+        self.m_nMisses = 0
+        self.m_nEvictions = 0
+        self.m_nInvalid = 0
+
+    def get(self, p_szPattern, p_compare_ignorecase=False):
+        # 返回编译后的正则表达式，如果表达式无法编译，返回None
+        m_Key = (p_szPattern, p_compare_ignorecase)
+        with self.m_Lock:
+            m_CompiledPattern = self.m_Patterns.get(m_Key)
+            if m_CompiledPattern is not None:
+                self.m_Patterns.move_to_end(m_Key)
+                self.m_nHits = self.m_nHits + 1
+                if m_CompiledPattern is self.INVALID_PATTERN:
+                    return None
+                return m_CompiledPattern
+            self.m_nMisses = self.m_nMisses + 1
+
+        # 编译的时候不持有锁，同一个表达式可能被重复编译，但结果是一样的
+        try:
+            if p_compare_ignorecase:
+                m_CompiledPattern = re.compile(p_szPattern, re.IGNORECASE)
+            else:
+                m_CompiledPattern = re.compile(p_szPattern)
+        except re.error:
+            m_CompiledPattern = self.INVALID_PATTERN
+
+        with self.m_Lock:
+            if m_CompiledPattern is self.INVALID_PATTERN:
+                self.m_nInvalid = self.m_nInvalid + 1
+            self.m_Patterns[m_Key] = m_CompiledPattern
+            self.m_Patterns.move_to_end(m_Key)
+            self.__evict()
+        if m_CompiledPattern is self.INVALID_PATTERN:
+            return None
+        return m_CompiledPattern
+
+    def __evict(self):
+        # 调用者需要持有锁
+        while len(self.m_Patterns) > self.m_nMaxSize:
+            self.m_Patterns.popitem(last=False)
+            self.m_nEvictions = self.m_nEvictions + 1
+
+    def resize(self, p_nMaxSize):
+        with self.m_Lock:
+            self.m_nMaxSize = max(int(p_nMaxSize), 1)
+            self.__evict()
+
+    def clear(self):
+        with self.m_Lock:
+            self.m_Patterns.clear()
+            self.m_nHits = 0
+            self.m_nMisses = 0
+            self.m_nEvictions = 0
+            self.m_nInvalid = 0
+
+    def __len__(self):
+        return len(self.m_Patterns)
+
+    def stats(self):
+        with self.m_Lock:
+            return {
+                "size": len(self.m_Patterns),
+                "maxsize": self.m_nMaxSize,
+                "hits": self.m_nHits,
+                "misses": self.m_nMisses,
+                "evictions": self.m_nEvictions,
+                "invalid": self.m_nInvalid,
+            }
+
+
+class SkipLineFilter:
+    # 比对时需要忽略的行的过滤器
+    # 和原有的比对规则相同（参考POSIXCompare.compare_string），一行内容和规则相同，或者规则从行首开始匹配（re.match）
+    # 并且匹配的内容是整行的时候，这一行被忽略。无法编译的规则只按照内容相同来判断
+    # 为了避免每一行都对每一个规则逐一匹配，所有的规则被合并为一个正则表达式，用fullmatch预先过滤：
+    # 满足上述条件的行一定能够被合并后的表达式完整匹配，所以不能完整匹配的行不需要再逐一检查
+    # 能够完整匹配的行（通常就是需要忽略的行）再按照原有的规则确认，例如规则a|ab只能匹配a，不能匹配ab
+    # 被忽略的行通常都是由同一个规则忽略的（例如时间戳），所以首先确认上一次确认成功的规则
+    # 包含反向引用的规则在合并后分组的编号会发生变化，这类规则不参与合并，总是单独匹配
+    BackReference = re.compile(r'\\[1-9]|\(\?P=')
+
+    def __init__(self, skiplines=None, ignoreEmptyLine=False):
+        self.m_IgnoreEmptyLine = ignoreEmptyLine
+        self.m_Literals = set()
+        # 参与合并的规则，以及不参与合并、总是需要单独匹配的规则
+        self.m_CombinedPatterns = []
+        self.m_Patterns = []
+        self.m_CombinedPattern = None
+        # 上一次确认成功的规则
+        self.m_LastPattern = None
+
+        if skiplines is not None:
+            for pattern in skiplines:
+                self.m_Literals.add(pattern)
+                m_CompiledPattern = POSIXCompare.CompiledRegexPattern.get(pattern)
+                if m_CompiledPattern is None:
+                    continue
+                if m_CompiledPattern.groups > 0 and self.BackReference.search(pattern) is not None:
+                    self.m_Patterns.append(m_CompiledPattern)
+                else:
+                    self.m_CombinedPatterns.append(m_CompiledPattern)
+        if len(self.m_CombinedPatterns) == 1:
+            self.m_CombinedPattern = self.m_CombinedPatterns[0]
+        elif len(self.m_CombinedPatterns) > 1:
+            try:
+                self.m_CombinedPattern = re.compile('|'.join('(?:' + m_CompiledPattern.pattern + ')'
+                                                             for m_CompiledPattern in self.m_CombinedPatterns))
+            except re.error:
+                # 无法合并（例如规则中使用了全局的匹配标志），逐一匹配
+                self.m_Patterns.extend(self.m_CombinedPatterns)
+                self.m_CombinedPatterns = []
+
+    @staticmethod
+    def __match_line(p_CompiledPattern, p_szLine):
+        # 原有的匹配规则：从行首开始匹配，并且匹配的内容是整行
+        matchObj = p_CompiledPattern.match(p_szLine)
+        return matchObj is not None and matchObj.group() == p_szLine
+
+    def is_skipped(self, p_szLine):
+        # 判断一行内容是否需要在比对的时候被忽略
+        if p_szLine in self.m_Literals:
+            return True
+        if self.m_CombinedPattern is not None and self.m_CombinedPattern.fullmatch(p_szLine) is not None:
+            m_LastPattern = self.m_LastPattern
+            if m_LastPattern is not None and self.__match_line(m_LastPattern, p_szLine):
+                return True
+            for m_CompiledPattern in self.m_CombinedPatterns:
+                if m_CompiledPattern is not m_LastPattern and self.__match_line(m_CompiledPattern, p_szLine):
+                    self.m_LastPattern = m_CompiledPattern
+                    return True
+        for m_CompiledPattern in self.m_Patterns:
+            if self.__match_line(m_CompiledPattern, p_szLine):
+                return True
+        if self.m_IgnoreEmptyLine and len(p_szLine.strip()) == 0:
+            return True
+        return False
+
+
+class LineMatchIndex:
+    # 启用正则比对时使用的匹配索引，每次比对只构建一次
+    # 参考文件中不包含正则元字符的行只能和内容相同的行匹配，直接比较行ID即可
+    # 只有真正的正则表达式才需要执行正则匹配，匹配的结果按照(工作行ID, 表达式ID)缓存
+    RegexMetaCharacters = frozenset('.^$*+?{}[]\\|()')
+
+    def __init__(self, p_Comparer, x, y, idx, idy, p_compare_ignorecase=False, p_PatternIDs=None):
+        self.m_Comparer = p_Comparer
+        self.x = x
+        self.y = y
+        self.idx = idx
+        self.idy = idy
+        self.m_IgnoreCase = p_compare_ignorecase
+        self.m_MatchCache = {}
+
+        # 记录参考文件中所有是正则表达式的行ID
+        # 参考文件的预处理结果中已经记录了这些行ID的时候（参考ReferenceArtifact），不需要再扫描参考文件
+        if p_PatternIDs is not None:
+            self.m_PatternIDs = p_PatternIDs
+            return
+        self.m_PatternIDs = set()
+        m_CheckedIDs = set()
+        for m_nPos in range(len(y)):
+            m_LineID = idy[m_nPos]
+            if m_LineID in m_CheckedIDs:
+                continue
+            m_CheckedIDs.add(m_LineID)
+            if not self.RegexMetaCharacters.isdisjoint(y[m_nPos]):
+                self.m_PatternIDs.add(m_LineID)
+
+    def equal(self, i, j):
+        m_WorkID = self.idx[i]
+        m_RefID = self.idy[j]
+        if m_WorkID == m_RefID:
+            return True
+        if m_RefID not in self.m_PatternIDs:
+            return False
+        m_Key = (m_WorkID, m_RefID)
+        m_Result = self.m_MatchCache.get(m_Key)
+        if m_Result is None:
+            m_Result = self.m_Comparer.compare_string(self.x[i], self.y[j], True, self.m_IgnoreCase)
+            self.m_MatchCache[m_Key] = m_Result
+        return m_Result
+
+
+class DiffRecord:
+    # 一行比对结果，只在输出的时候才被格式化为字符串
+    #   op            ' '相同，'-'工作文件中多出的行，'+'参考文件中多出的行，'S'工作文件中被忽略的行
+    #   work_lineno   工作文件的行号
+    #   ref_lineno    参考文件的行号
+    #   text          行的内容
+    # 各种op下行号的含义参考POSIXCompare.iter_compare_records
+    __slots__ = ('op', 'work_lineno', 'ref_lineno', 'text')
+
+    def __init__(self, op, work_lineno, ref_lineno, text):
+        self.op = op
+        self.work_lineno = work_lineno
+        self.ref_lineno = ref_lineno
+        self.text = text
+
+    def __repr__(self):
+        return "DiffRecord(%r, %r, %r, %r)" % (self.op, self.work_lineno, self.ref_lineno, self.text)
+
+
+class CompareStats:
+    # 比对过程中各个阶段的耗时和计数，用来分析比对的性能瓶颈
+    # 只有在启用统计的时候才会创建，没有启用时各处的统计代码都会被跳过
+    # 多次比对的统计可以通过merge合并，用来生成整个Suite的汇总信息
+    #   phases      各个阶段的耗时（秒）
+    #               reference_lookup  查找参考文件
+    #               cache_lookup      查找比对结果缓存
+    #               exact_compare     按字节比对文件
+    #               read              读取文件，包括去掉首尾空格以及忽略行的过滤
+    #               skip_filter       忽略行的过滤，包含在read中
+    #               intern            将每一行映射为整数ID
+    #               trim              去掉相同的头部和尾部
+    #               diff              执行比对算法
+    #               streaming         流式比对，包括读取、比对和写入dif文件
+    #               write             生成比对结果并写入dif文件，包括读取被忽略的行
+    #               cache_store       保存比对结果到缓存
+    #               console           在Robot的日志中输出比对结果
+    #   counters    各种计数，例如比对的行数、正则表达式的编译和匹配次数、LCS矩阵的大小等
+    PHASES = ["reference_lookup", "cache_lookup", "exact_compare", "read", "skip_filter", "intern",
+              "trim", "diff", "streaming", "write", "cache_store", "console"]
+
+    class NullPhase:
+        # 没有启用统计的时候使用的空的计时器
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            return False
+
+    class Phase:
+        def __init__(self, p_Stats, p_szPhase):
+            self.m_Stats = p_Stats
+            self.m_szPhase = p_szPhase
+            self.m_nStart = None
+
+        def __enter__(self):
+            self.m_nStart = time.perf_counter()
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.m_Stats.add_time(self.m_szPhase, time.perf_counter() - self.m_nStart)
+            return False
+
+    NULL_PHASE = NullPhase()
+
+    def __init__(self):
+        self.m_nCompares = 0
+        self.m_Phases = {}
+        self.m_Counters = {}
+        self.m_nPeakMemory = None
+        self.m_nMaxRSS = None
+
+    @staticmethod
+    def phase(p_Stats, p_szPhase):
+        # 返回一个统计阶段耗时的上下文，p_Stats为None的时候不做任何统计
+        #   with CompareStats.phase(m_Stats, 'read'):
+        if p_Stats is None:
+            return CompareStats.NULL_PHASE
+        return CompareStats.Phase(p_Stats, p_szPhase)
+
+    def add_time(self, p_szPhase, p_nSeconds):
+        self.m_Phases[p_szPhase] = self.m_Phases.get(p_szPhase, 0.0) + p_nSeconds
+
+    def add_count(self, p_szCounter, p_nCount=1):
+        self.m_Counters[p_szCounter] = self.m_Counters.get(p_szCounter, 0) + p_nCount
+
+    def timed(self, p_szPhase, p_Function):
+        # 返回一个包装后的函数，每次调用的耗时计入p_szPhase，调用次数计入p_szPhase_calls
+        def timed_function(*args):
+            m_nStart = time.perf_counter()
+            try:
+                return p_Function(*args)
+            finally:
+                self.m_Phases[p_szPhase] = self.m_Phases.get(p_szPhase, 0.0) + time.perf_counter() - m_nStart
+                self.m_Counters[p_szPhase + "_calls"] = self.m_Counters.get(p_szPhase + "_calls", 0) + 1
+        return timed_function
+
+    def record_memory(self, p_nPeakMemory=None):
+        # 记录内存峰值
+        # p_nPeakMemory为tracemalloc统计的Python对象的内存峰值，只有在启用内存跟踪的时候才有
+        # 进程的最大常驻内存通过resource获取，这是整个进程的峰值，在Windows上没有这个信息
+        if p_nPeakMemory is not None:
+            self.m_nPeakMemory = max(self.m_nPeakMemory or 0, p_nPeakMemory)
+        try:
+            import resource
+        except ImportError:
+            return
+        m_nMaxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != 'darwin':
+            # Linux下的单位是KB，MacOS下的单位是字节
+            m_nMaxRSS = m_nMaxRSS * 1024
+        self.m_nMaxRSS = max(self.m_nMaxRSS or 0, m_nMaxRSS)
+
+    def merge(self, p_Stats):
+        # 将另一次比对的统计信息合并进来
+        if p_Stats is None:
+            return
+        self.m_nCompares = self.m_nCompares + p_Stats.m_nCompares
+        for (m_szPhase, m_nSeconds) in p_Stats.m_Phases.items():
+            self.add_time(m_szPhase, m_nSeconds)
+        for (m_szCounter, m_nCount) in p_Stats.m_Counters.items():
+            self.add_count(m_szCounter, m_nCount)
+        for m_szAttribute in ("m_nPeakMemory", "m_nMaxRSS"):
+            if getattr(p_Stats, m_szAttribute) is not None:
+                setattr(self, m_szAttribute, max(getattr(self, m_szAttribute) or 0, getattr(p_Stats, m_szAttribute)))
+
+    def as_dict(self):
+        # 阶段按照PHASES中的顺序输出，计数按照名称排序
+        m_Phases = OrderedDict()
+        for m_szPhase in self.PHASES:
+            if m_szPhase in self.m_Phases:
+                m_Phases[m_szPhase] = round(self.m_Phases[m_szPhase], 6)
+        for m_szPhase in sorted(self.m_Phases):
+            if m_szPhase not in m_Phases:
+                m_Phases[m_szPhase] = round(self.m_Phases[m_szPhase], 6)
+        return {
+            "compares": self.m_nCompares,
+            "total_seconds": round(sum(self.m_Phases.get(m_szPhase, 0.0) for m_szPhase in self.m_Phases
+                                       if m_szPhase != "skip_filter"), 6),
+            "phases": dict(m_Phases),
+            "counters": dict(sorted(self.m_Counters.items())),
+            "peak_memory": self.m_nPeakMemory,
+            "max_rss": self.m_nMaxRSS
+        }
+
+
+class POSIXCompare:
+    # 所有比对共用的正则表达式缓存
+    CompiledRegexPattern = RegexPatternCache()
+
+    # 支持的比对算法
+    ENGINE_MYERS = "MYERS"
+    ENGINE_LCS = "LCS"
+
+    # 流式比对时，初始的窗口大小，以及判断差异结束需要的连续相同行数
+    STREAM_WINDOW_LINES = 1024
+    STREAM_SYNC_LINES = 4
+
+    # 比对引擎的版本，比对结果的格式或者算法发生变化时需要修改，用来使之前缓存的比对结果失效
+    ENGINE_VERSION = 1
+
+    # 按字节比对文件时，每次比较的块大小
+    EXACT_BLOCK_SIZE = 1024 * 1024
+
+    # 支持的比对结果格式
+    FORMAT_ANNOTATED = "ANNOTATED"
+    FORMAT_UNIFIED = "UNIFIED"
+
+    # 压缩文件开头的标记和对应的压缩格式，按照文件的内容而不是扩展名来判断是否是压缩文件
+    # bzip2的标记只有3个字节，需要同时检查第一个数据块（或者空文件的结束块）的标记
+    COMPRESSION_MAGIC = (
+        (b'\x1f\x8b\x08', "gzip"),
+        (b'\xfd7zXZ\x00', "xz"),
+        (b'\x28\xb5\x2f\xfd', "zstd"),
+    )
+    BZIP2_BLOCK_MAGIC = (b'\x31\x41\x59\x26\x53\x59', b'\x17\x72\x45\x38\x50\x90')
+    # 压缩文件常用的扩展名，查找文件以及生成dif文件名的时候使用
+    COMPRESSION_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+
+    # 读取文件、流式比对以及输出比对结果的时候，每处理这么多行检查一次截止时间
+    DEADLINE_CHECK_LINES = 4096
+
+    # 分段并行比对时，参与比对的总行数不少于这个值才会启用并行
+    PARALLEL_MIN_LINES = 100000
+    # 分段并行比对时，需要比对的差异段落的总行数少于这个值时，直接在当前进程中比对
+    PARALLEL_MIN_SEGMENT_LINES = 10000
+    # 分段并行比对时，每个进程平均分配到的任务个数，任务越多，各个进程之间的负载越均衡
+    PARALLEL_TASKS_PER_WORKER = 4
+
+    def __init__(self):
+        # 比对的统计信息，参考CompareStats，为None时不做统计
+        self.m_Stats = None
+        # 比对的截止时间，参考CompareDeadline，为None时不限制
+        self.m_Deadline = None
+        # 最多查找的差异行数，为None时不限制，为0时只判断是否相同
+        # 超过限制的时候比对提前结束，比对结果中只包含开头的部分，并设置m_Truncated
+        self.m_MaxDifferences = None
+        self.m_Truncated = False
+        # 工作文件的总行数，在产生比对记录的同时记录，UNIFIED格式据此判断最后一个差异块是否位于文件的结尾
+        # 比对提前结束、没有读取到文件结尾的时候为None
+        self.m_WorkLineCount = None
+        # 分段并行比对使用的进程数，为None或者小于2时不启用，参考parallel_diff
+        self.m_ParallelWorkers = None
+        # 参考文件预处理结果的缓存，参考ReferenceArtifactCache，为None时每次比对都重新处理参考文件
+        self.m_ReferenceCache = None
+        # 比对中参考文件所有是正则表达式的行ID，由参考文件的预处理结果提供，为None时由LineMatchIndex扫描得到
+        self.m_ReferencePatternIDs = None
+
+    # 正则表达比较两个字符串
+    # p_str1                  原字符串
+    # p_str2                  正则表达式
+    # p_compare_maskEnabled   是否按照正则表达式来判断是否相等
+    # p_compare_ignorecase    是否忽略匹配中的大小写
+    def compare_string(self, p_str1, p_str2,
+                       p_compare_maskEnabled=False,
+                       p_compare_ignorecase=False):
+        # 如果两个字符串完全相等，直接返回
+        if p_str1 == p_str2:
+            return True
+
+        # 如果忽略大小写的情况下，两个字符串的大写相同，则直接返回
+        if p_compare_ignorecase:
+            if p_str1.upper() == p_str2.upper():
+                return True
+
+        # 如果没有启用正则，则直接返回不相等
+        if not p_compare_maskEnabled:
+            return False
+
+        # 用正则判断表达式是否相等
+        # 已经编译的正则表达式不能再指定匹配标志，所以忽略大小写的表达式需要单独编译
+        m_CompiledPattern = self.CompiledRegexPattern.get(p_str2, p_compare_ignorecase)
+        if m_CompiledPattern is None:
+            # 正则表达式错误，可能是由于这并非是一个正则表达式
+            return False
+        matchObj = m_CompiledPattern.match(p_str1)
+        if matchObj is None:
+            return False
+        elif str(matchObj.group()) != p_str1:
+            return False
+        else:
+            return True
+
+    @staticmethod
+    def iter_with_deadline(p_Lines, p_Deadline):
+        # 逐行返回p_Lines的内容，每DEADLINE_CHECK_LINES行检查一次截止时间，没有截止时间时直接返回p_Lines
+        # 每次取出一批行后再逐行返回，不需要在每一行上计数
+        if p_Deadline is None:
+            return p_Lines
+        return POSIXCompare.__iter_with_deadline(iter(p_Lines), p_Deadline)
+
+    @staticmethod
+    def __iter_with_deadline(p_Lines, p_Deadline):
+        while True:
+            p_Deadline.check()
+            m_Lines = list(islice(p_Lines, POSIXCompare.DEADLINE_CHECK_LINES))
+            if len(m_Lines) == 0:
+                return
+            yield from m_Lines
+
+    @staticmethod
+    def intern_lines(p_Lines, p_LineIDs, p_compare_ignorecase=False, p_Deadline=None, p_BaseLineIDs=None):
+        # 将每一行规范化后映射为一个整数ID，相同内容的行具有相同的ID
+        # p_Lines                 需要映射的行
+        # p_LineIDs               规范化后的行到ID的字典，两个比对文件需要共用一个字典
+        # p_compare_ignorecase    是否忽略大小写，忽略大小写时用大写后的内容作为规范化的结果
+        # p_Deadline              比对的截止时间，参考CompareDeadline
+        # p_BaseLineIDs           已经分配好的行ID（例如参考文件预处理结果中的ReferenceArtifact.m_KeyIDs），只读
+        #                         不在其中的行记录在p_LineIDs中，ID从len(p_BaseLineIDs)开始分配
+        m_LineIDs = []
+        if p_BaseLineIDs is None:
+            for m_Line in POSIXCompare.iter_with_deadline(p_Lines, p_Deadline):
+                if p_compare_ignorecase:
+                    m_Line = m_Line.upper()
+                m_LineID = p_LineIDs.get(m_Line)
+                if m_LineID is None:
+                    m_LineID = len(p_LineIDs)
+                    p_LineIDs[m_Line] = m_LineID
+                m_LineIDs.append(m_LineID)
+            return m_LineIDs
+        m_nBase = len(p_BaseLineIDs)
+        for m_Line in POSIXCompare.iter_with_deadline(p_Lines, p_Deadline):
+            if p_compare_ignorecase:
+                m_Line = m_Line.upper()
+            m_LineID = p_BaseLineIDs.get(m_Line)
+            if m_LineID is None:
+                m_LineID = p_LineIDs.get(m_Line)
+                if m_LineID is None:
+                    m_LineID = m_nBase + len(p_LineIDs)
+                    p_LineIDs[m_Line] = m_LineID
+            m_LineIDs.append(m_LineID)
+        return m_LineIDs
+
+    def line_comparator(self, x, y, idx=None, idy=None,
+                        p_compare_maskEnabled=False,
+                        p_compare_ignorecase=False):
+        # 返回一个比较函数equal(i, j)，用来判断x[i]和y[j]是否相等
+        # 比较的时候只比较行ID，如果没有提供行ID，则在这里生成
+        # 启用正则的时候，通过LineMatchIndex来判断ID不同的行是否能够被正则匹配
+        if idx is None or idy is None:
+            m_LineIDs = {}
+            idx = self.intern_lines(x, m_LineIDs, p_compare_ignorecase)
+            idy = self.intern_lines(y, m_LineIDs, p_compare_ignorecase)
+        if p_compare_maskEnabled:
+            m_MatchIndex = LineMatchIndex(self, x, y, idx, idy, p_compare_ignorecase, self.m_ReferencePatternIDs)
+            return m_MatchIndex.equal
+        else:
+            def equal(i, j):
+                return idx[i] == idy[j]
+            return equal
+
+    def compare(self,
+                x,
+                y,
+                linenox,
+                linenoy,
+                p_compare_maskEnabled=False,
+                p_compare_ignorecase=False,
+                p_compare_engine="MYERS",
+                idx=None,
+                idy=None):
+        # 根据设置的比对算法选择不同的实现
+        # MYERS       Myers O(ND)差分算法，耗时和差异的多少相关，默认算法
+        # LCS         原有的全矩阵LCS算法，耗时和空间都是O(N*M)，作为备选保留
+        # idx, idy    可选，源数据和目的数据每一行对应的整数ID（参考intern_lines）
+        # 输出的结果是一个翻转的列表
+        (compare_result, m_DiffOps) = self.compare_ops(x, y,
+                                                       p_compare_maskEnabled, p_compare_ignorecase,
+                                                       p_compare_engine, idx, idy)
+        return compare_result, self.format_diff_ops(m_DiffOps[::-1], x, y, linenox, linenoy)
+
+    def compare_ops(self,
+                    x,
+                    y,
+                    p_compare_maskEnabled=False,
+                    p_compare_ignorecase=False,
+                    p_compare_engine="MYERS",
+                    idx=None,
+                    idy=None):
+        # 和compare相同，但是返回的是正序的编辑脚本[(op, i, j), ...]，而不是格式化后的比对结果
+        # 设置了m_MaxDifferences的时候，如果差异超过了限制，返回的是编辑脚本的开头部分
+        equal = self.line_comparator(x, y, idx, idy, p_compare_maskEnabled, p_compare_ignorecase)
+        with CompareStats.phase(self.m_Stats, "diff"):
+            m_DiffOps = None
+            if self.m_MaxDifferences is not None:
+                # 先用有限的代价确认差异是否超过了限制，没有超过的时候仍然用指定的算法计算完整的结果
+                # 确认的代价为O((N+M)*min(D,K))，不超过Myers算法本身；两个文件的行数之和不超过限制时不需要确认
+                m_DiffOps = self.myers_diff_prefix(len(x), len(y), equal, self.m_MaxDifferences, self.m_Deadline)
+            m_bTruncated = m_DiffOps is not None
+            if m_bTruncated:
+                self.m_Truncated = True
+            elif self.m_ParallelWorkers is not None and self.m_ParallelWorkers > 1 and \
+                    len(x) + len(y) >= self.PARALLEL_MIN_LINES:
+                m_DiffOps = self.parallel_diff(x, y, idx, idy, p_compare_maskEnabled, p_compare_ignorecase,
+                                               p_compare_engine)
+            elif p_compare_engine is None or str(p_compare_engine).upper() == self.ENGINE_MYERS:
+                m_DiffOps = self.myers_diff(len(x), len(y), equal, self.m_Deadline)
+            elif str(p_compare_engine).upper() == self.ENGINE_LCS:
+                m_DiffOps = self.lcs_diff(len(x), len(y), equal, self.m_Deadline)
+                if self.m_Stats is not None:
+                    self.m_Stats.add_count("matrix_cells", (len(x) + 1) * (len(y) + 1))
+            else:
+                raise DiffException('ERROR: unknown compare engine [%s]' % str(p_compare_engine))
+        compare_result = not m_bTruncated
+        for m_DiffOp in m_DiffOps:
+            if m_DiffOp[0] != ' ':
+                compare_result = False
+                break
+        if self.m_Stats is not None:
+            self.m_Stats.add_count("diff_work_lines", len(x))
+            self.m_Stats.add_count("diff_reference_lines", len(y))
+            self.m_Stats.add_count("edit_distance", len(m_DiffOps) - sum(1 for m_DiffOp in m_DiffOps
+                                                                         if m_DiffOp[0] == ' '))
+        return compare_result, m_DiffOps
+
+    @staticmethod
+    def format_diff_ops(p_DiffOps, x, y, linenox, linenoy):
+        # 将编辑脚本格式化为比对结果
+        # 相同和删除的行输出源数据的行号和内容，增加的行输出目的数据的行号和内容
+        m_CompareDiffResult = []
+        for (m_Op, i, j) in p_DiffOps:
+            if m_Op == '+':
+                m_CompareDiffResult.append("+{:>{}} ".format(linenoy[j], 6) + y[j])
+            else:
+                m_CompareDiffResult.append(m_Op + "{:>{}} ".format(linenox[i], 6) + x[i])
+        return m_CompareDiffResult
+
+    def compare_myers(self,
+                      x,
+                      y,
+                      linenox,
+                      linenoy,
+                      p_compare_maskEnabled=False,
+                      p_compare_ignorecase=False,
+                      idx=None,
+                      idy=None):
+        # 利用Myers算法计算编辑脚本，随后按照LCS相同的格式输出比对结果
+        # 输出的结果和compare_lcs一样，是一个翻转的列表
+        return self.compare(x, y, linenox, linenoy,
+                            p_compare_maskEnabled, p_compare_ignorecase, self.ENGINE_MYERS, idx, idy)
+
+    @staticmethod
+    def myers_diff(n, m, equal, p_Deadline=None):
+        # Myers线性空间差分算法（middle snake分治）
+        # n           源数据长度
+        # m           目的数据长度
+        # equal       比较函数，equal(i, j)表示源数据第i行和目的数据第j行是否相等
+        # p_Deadline  可选，CompareDeadline，超过截止时间后抛出CompareAborted
+        # 返回值是一个正序的编辑脚本，每一项为(op, i, j)，op为' '/'-'/'+'
+        # 算法的时间复杂度为O((N+M)*D)，D为差异的行数，空间复杂度为O(N+M)
+        m_DiffOps = []
+        # 待处理的任务栈，后进先出。为了保证输出为正序，右侧的任务需要先入栈
+        # ('D', x_lo, x_hi, y_lo, y_hi)    需要比对的区间
+        # ('S', x_lo, x_hi, y_lo)          已经确定相同的区间
+        m_Stack = [('D', 0, n, 0, m)]
+        while m_Stack:
+            if p_Deadline is not None:
+                p_Deadline.check()
+            m_Task = m_Stack.pop()
+            if m_Task[0] == 'S':
+                (_, x_lo, x_hi, y_lo) = m_Task
+                for i in range(x_lo, x_hi):
+                    m_DiffOps.append((' ', i, y_lo + i - x_lo))
+                continue
+            (_, x_lo, x_hi, y_lo, y_hi) = m_Task
+
+            # 去掉相同的头部
+            while x_lo < x_hi and y_lo < y_hi and equal(x_lo, y_lo):
+                m_DiffOps.append((' ', x_lo, y_lo))
+                x_lo = x_lo + 1
+                y_lo = y_lo + 1
+            # 去掉相同的尾部，尾部需要在最后输出
+            m_nSuffix = 0
+            while x_lo < x_hi - m_nSuffix and y_lo < y_hi - m_nSuffix and \
+                    equal(x_hi - m_nSuffix - 1, y_hi - m_nSuffix - 1):
+                m_nSuffix = m_nSuffix + 1
+            if m_nSuffix > 0:
+                x_hi = x_hi - m_nSuffix
+                y_hi = y_hi - m_nSuffix
+                m_Stack.append(('S', x_hi, x_hi + m_nSuffix, y_hi))
+
+            if x_lo == x_hi or y_lo == y_hi:
+                m_Split = None
+            else:
+                m_Split = POSIXCompare._myers_bisect(equal, x_lo, x_hi, y_lo, y_hi, p_Deadline)
+            if m_Split is None:
+                # 没有任何相同的内容，先输出删除，再输出增加
+                for i in range(x_lo, x_hi):
+                    m_DiffOps.append(('-', i, y_lo))
+                for j in range(y_lo, y_hi):
+                    m_DiffOps.append(('+', x_hi, j))
+            else:
+                (x_mid, y_mid) = m_Split
+                m_Stack.append(('D', x_lo + x_mid, x_hi, y_lo + y_mid, y_hi))
+                m_Stack.append(('D', x_lo, x_lo + x_mid, y_lo, y_lo + y_mid))
+
+        # 分治的结果中删除和增加可能交错出现，连续的差异中先输出删除，再输出增加，和LCS算法的输出保持一致
+        return POSIXCompare.__group_diff_ops(m_DiffOps)
+
+    @staticmethod
+    def __group_diff_ops(p_DiffOps):
+        # 连续的差异中先输出删除，再输出增加
+        m_SortedDiffOps = []
+        m_Inserts = []
+        for m_DiffOp in p_DiffOps:
+            if m_DiffOp[0] == '+':
+                m_Inserts.append(m_DiffOp)
+                continue
+            if m_DiffOp[0] == ' ' and m_Inserts:
+                m_SortedDiffOps.extend(m_Inserts)
+                m_Inserts = []
+            m_SortedDiffOps.append(m_DiffOp)
+        m_SortedDiffOps.extend(m_Inserts)
+        return m_SortedDiffOps
+
+    @staticmethod
+    def myers_diff_prefix(n, m, equal, p_nMaxDifferences, p_Deadline=None):
+        # Myers正向贪心算法，最多只查找p_nMaxDifferences个差异
+        # 如果差异的行数不超过p_nMaxDifferences，返回None，完整的编辑脚本需要用比对引擎重新计算
+        # 否则返回编辑脚本的开头部分，正好包含p_nMaxDifferences个差异，到差异用完时在文件中走得最远的位置为止
+        # 正向查找时只保留每条对角线上当前走得最远的位置，不保存每一轮的结果：
+        # 差异用完以后，在正好需要p_nMaxDifferences个差异才能到达的位置中选择走得最远的一个，
+        # 再用myers_diff计算从文件开头到这个位置的编辑脚本
+        # 算法的时间复杂度为O((N+M)*K)，K为p_nMaxDifferences，和文件的差异有多少无关，空间复杂度为O(N+M+K)
+        m_nMaxD = int(p_nMaxDifferences)
+        if n + m <= m_nMaxD:
+            # 差异不可能超过上限
+            return None
+        v_offset = m_nMaxD + 1
+        # v[k]为第k条对角线上走得最远的x，-1表示无法到达
+        # 第d轮只更新和d奇偶性相同的对角线，读取的是上一轮更新的相邻对角线，所以可以直接在v上更新
+        v = [-1] * (2 * m_nMaxD + 3)
+        # c[k]为第k条对角线第一次走到v[k]时用掉的差异数，也就是到达这个位置最少需要的差异数
+        c = [0] * (2 * m_nMaxD + 3)
+
+        for d in range(m_nMaxD + 1):
+            if p_Deadline is not None:
+                p_Deadline.check()
+            for k in range(-d, d + 1, 2):
+                if d == 0:
+                    x = 0
+                else:
+                    # 从k+1对角线向下走（增加一行），或者从k-1对角线向右走（删除一行）
+                    m_nDown = v[v_offset + k + 1] if k < d else -1
+                    if m_nDown != -1 and m_nDown - k > m:
+                        m_nDown = -1
+                    m_nRight = v[v_offset + k - 1] if k > -d else -1
+                    if m_nRight != -1:
+                        m_nRight = m_nRight + 1 if m_nRight < n else -1
+                    x = m_nDown if m_nDown >= m_nRight else m_nRight
+                    if x == -1:
+                        continue
+                y = x - k
+                while x < n and y < m and equal(x, y):
+                    x = x + 1
+                    y = y + 1
+                if x != v[v_offset + k]:
+                    v[v_offset + k] = x
+                    c[v_offset + k] = d
+                if x >= n and y >= m:
+                    return None
+
+        # 差异超过了上限，计算到达走得最远的位置的编辑脚本
+        m_nBestK = None
+        for k in range(-m_nMaxD, m_nMaxD + 1, 2):
+            x = v[v_offset + k]
+            if x != -1 and c[v_offset + k] == m_nMaxD and \
+                    (m_nBestK is None or 2 * x - k > 2 * v[v_offset + m_nBestK] - m_nBestK):
+                m_nBestK = k
+        x = v[v_offset + m_nBestK]
+        return POSIXCompare.myers_diff(x, x - m_nBestK, equal, p_Deadline)
+
+    @staticmethod
+    def _myers_bisect(equal, x_lo, x_hi, y_lo, y_hi, p_Deadline=None):
+        # 同时从正向和反向查找最短编辑路径，返回两条路径重叠的位置（相对于x_lo, y_lo）
+        # 如果两个区间没有任何相同的内容，返回None
+        n = x_hi - x_lo
+        m = y_hi - y_lo
+        max_d = (n + m + 1) // 2
+        v_offset = max_d
+        v_length = 2 * max_d + 2
+        v1 = [-1] * v_length
+        v2 = [-1] * v_length
+        v1[v_offset + 1] = 0
+        v2[v_offset + 1] = 0
+        delta = n - m
+        # 如果delta是奇数，正向路径会和反向路径重叠，否则是反向路径和正向路径重叠
+        front = (delta % 2 != 0)
+        k1start = 0
+        k1end = 0
+        k2start = 0
+        k2end = 0
+        for d in range(max_d):
+            if p_Deadline is not None:
+                p_Deadline.check()
+            # 正向查找
+            for k1 in range(-d + k1start, d + 1 - k1end, 2):
+                k1_offset = v_offset + k1
+                if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                    x1 = v1[k1_offset + 1]
+                else:
+                    x1 = v1[k1_offset - 1] + 1
+                y1 = x1 - k1
+                while x1 < n and y1 < m and equal(x_lo + x1, y_lo + y1):
+                    x1 = x1 + 1
+                    y1 = y1 + 1
+                v1[k1_offset] = x1
+                if x1 > n:
+                    k1end = k1end + 2
+                elif y1 > m:
+                    k1start = k1start + 2
+                elif front:
+                    k2_offset = v_offset + delta - k1
+                    if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                        if x1 >= n - v2[k2_offset]:
+                            return x1, y1
+            # 反向查找
+            for k2 in range(-d + k2start, d + 1 - k2end, 2):
+                k2_offset = v_offset + k2
+                if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                    x2 = v2[k2_offset + 1]
+                else:
+                    x2 = v2[k2_offset - 1] + 1
+                y2 = x2 - k2
+                while x2 < n and y2 < m and equal(x_hi - x2 - 1, y_hi - y2 - 1):
+                    x2 = x2 + 1
+                    y2 = y2 + 1
+                v2[k2_offset] = x2
+                if x2 > n:
+                    k2end = k2end + 2
+                elif y2 > m:
+                    k2start = k2start + 2
+                elif not front:
+                    k1_offset = v_offset + delta - k2
+                    if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                        x1 = v1[k1_offset]
+                        y1 = v_offset + x1 - k1_offset
+                        if x1 >= n - x2:
+                            return x1, y1
+        return None
+
+    def compare_lcs(self,
+                    x,
+                    y,
+                    linenox,
+                    linenoy,
+                    p_compare_maskEnabled=False,
+                    p_compare_ignorecase=False,
+                    idx=None,
+                    idy=None):
+        # 利用LCS算法比对，输出的结果是一个翻转的列表
+        return self.compare(x, y, linenox, linenoy,
+                            p_compare_maskEnabled, p_compare_ignorecase, self.ENGINE_LCS, idx, idy)
+
+    @staticmethod
+    def lcs_diff(n, m, equal, p_Deadline=None):
+        # LCS问题就是求两个字符串最长公共子串的问题。
+        # 解法就是用一个矩阵来记录两个字符串中所有位置的两个字符之间的匹配情况，若是匹配则为1，否则为0。
+        # 然后求出对角线最长的1序列，其对应的位置就是最长匹配子串的位置。
+
+        # n           源数据长度
+        # m           目的数据长度
+        # equal       比较函数，equal(i, j)表示源数据第i行和目的数据第j行是否相等
+        # p_Deadline  可选，CompareDeadline，超过截止时间后抛出CompareAborted
+        # 返回值是一个正序的编辑脚本，每一项为(op, i, j)，op为' '/'-'/'+'
+        #
+        # 内存的使用为O(M*sqrt(N))，不是线性的：
+        #   Hirschberg算法的内存为O(N+M)，但是它在中间行自行选择分割点，存在多个相同长度的公共子序列的时候，
+        #   选择的对齐方式和全矩阵回溯的结果不同，LCS引擎生成的dif文件会发生变化
+        #   这里保证编辑脚本和全矩阵回溯的结果完全相同，代价是保存sqrt(N)行；需要线性内存的时候使用MYERS引擎
+        #
+        # c[i][j]表示源数据前i+1行和目的数据前j+1行的LCS长度，c[-1][*]和c[*][-1]为0
+        # 完整的LCS矩阵需要N*M个整数，这里不保存完整的矩阵：
+        #   1： 按行计算LCS矩阵，只保留当前行和上一行，每隔k=sqrt(N)行保存一行作为检查点
+        #   2： 回溯时从最后一段开始，根据上一个检查点重新计算这一段的k行，再在这一段内回溯
+        # 每一行用array('I')保存，检查点和当前段各有sqrt(N)行，计算量是原来的两倍
+        # 回溯的规则和全矩阵算法相同，对于相同的输入，编辑脚本和全矩阵算法回溯的结果相同
+        # 注意：compare_text_files在比对之前会去掉两个文件相同的头部和尾部，存在多个相同长度的公共子序列的时候，
+        # 最终选择的对齐方式（即dif文件中+/-行的位置）可能和原有的整个文件做LCS的版本不同，差异的行数是相同的
+        m_nBlockSize = max(int(n ** 0.5), 1)
+
+        # 构建LCS数组的检查点，m_CheckPoints[b]为第b*k-1行，m_CheckPoints[0]为第-1行
+        # 每一行多分配一个元素作为c[i][-1]，利用Python的负数下标，row[-1]总是0
+        m_ZeroRow = array('I', bytes(4 * (m + 1)))
+        m_CheckPoints = [m_ZeroRow]
+        prev = m_ZeroRow.tolist()
+        for i in range(n):
+            if p_Deadline is not None:
+                p_Deadline.check()
+            prev = POSIXCompare.__lcs_row(prev, i, m, equal)
+            if (i + 1) % m_nBlockSize == 0 and i + 1 < n:
+                m_CheckPoints.append(array('I', prev))
+        prev = None
+
+        # 开始比较，从后往前回溯，最后再翻转
+        # m_BlockRows保存当前段的所有行，m_nBlockStart为当前段第一行的行号
+        m_DiffOps = []
+        next_i = n - 1
+        next_j = m - 1
+        m_BlockRows = None
+        m_nBlockStart = n
+        while True:
+            if next_i < 0 and next_j < 0:
+                break
+            elif next_i < 0:
+                m_DiffOps.append(('+', next_i + 1, next_j))
+                next_j = next_j - 1
+                continue
+            elif next_j < 0:
+                m_DiffOps.append(('-', next_i, next_j + 1))
+                next_i = next_i - 1
+                continue
+            elif equal(next_i, next_j):
+                m_DiffOps.append((' ', next_i, next_j))
+                next_i = next_i - 1
+                next_j = next_j - 1
+                continue
+
+            if next_i < m_nBlockStart:
+                # 回溯进入了新的一段，根据检查点重新计算这一段的所有行
+                m_nBlock = next_i // m_nBlockSize
+                m_nBlockStart = m_nBlock * m_nBlockSize
+                m_BlockRows = [m_CheckPoints[m_nBlock]]
+                prev = m_CheckPoints[m_nBlock].tolist()
+                for i in range(m_nBlockStart, min(m_nBlockStart + m_nBlockSize, n)):
+                    if p_Deadline is not None:
+                        p_Deadline.check()
+                    prev = POSIXCompare.__lcs_row(prev, i, m, equal)
+                    m_BlockRows.append(array('I', prev))
+                prev = None
+            # m_BlockRows[0]为当前段之前的一行
+            m_CurrentRow = m_BlockRows[next_i - m_nBlockStart + 1]
+            m_PreviousRow = m_BlockRows[next_i - m_nBlockStart]
+            if m_CurrentRow[next_j - 1] >= m_PreviousRow[next_j]:
+                m_DiffOps.append(('+', next_i + 1, next_j))
+                next_j = next_j - 1
+            else:
+                m_DiffOps.append(('-', next_i, next_j + 1))
+                next_i = next_i - 1
+        m_DiffOps.reverse()
+        return m_DiffOps
+
+    @staticmethod
+    def __lcs_row(prev, i, m, equal):
+        # 根据LCS矩阵的第i-1行计算第i行，prev和返回值都是长度为m+1的列表，最后一个元素总是0
+        cur = [0] * (m + 1)
+        for j in range(m):
+            if equal(i, j):
+                cur[j] = 1 + prev[j - 1]
+            else:
+                left = cur[j - 1]
+                up = prev[j]
+                cur[j] = left if left >= up else up
+        return cur
+
+    @staticmethod
+    def unique_anchors(idx, idy):
+        # 按照patience diff的方法，找到在两个文件中都只出现一次的行作为锚点
+        # 返回在两个文件中位置都递增的最长锚点序列[(i, j), ...]，相邻锚点之间的内容可以独立比对
+        m_Counts = {}
+        for m_nID in idx:
+            m_Counts[m_nID] = m_Counts.get(m_nID, 0) + 1
+        # 在参考文件中出现多次的行，位置记为-1
+        m_Positions = {}
+        for j, m_nID in enumerate(idy):
+            if m_Counts.get(m_nID) == 1:
+                m_Positions[m_nID] = -1 if m_nID in m_Positions else j
+        m_Counts = None
+        m_Candidates = [(i, m_Positions[m_nID]) for i, m_nID in enumerate(idx)
+                        if m_Positions.get(m_nID, -1) != -1]
+        m_Positions = None
+
+        # 按照工作文件中的顺序，求参考文件位置的最长递增子序列
+        # m_Tails[k]为长度为k+1的递增序列中最小的结尾位置，m_TailIndex[k]为对应的候选锚点
+        m_Tails = []
+        m_TailIndex = []
+        m_Previous = [-1] * len(m_Candidates)
+        for m_nPos, (_, j) in enumerate(m_Candidates):
+            k = bisect_left(m_Tails, j)
+            if k > 0:
+                m_Previous[m_nPos] = m_TailIndex[k - 1]
+            if k == len(m_Tails):
+                m_Tails.append(j)
+                m_TailIndex.append(m_nPos)
+            else:
+                m_Tails[k] = j
+                m_TailIndex[k] = m_nPos
+        m_Anchors = []
+        m_nPos = m_TailIndex[-1] if m_TailIndex else -1
+        while m_nPos != -1:
+            m_Anchors.append(m_Candidates[m_nPos])
+            m_nPos = m_Previous[m_nPos]
+        m_Anchors.reverse()
+        return m_Anchors
+
+    def parallel_diff(self, x, y, idx=None, idy=None,
+                      p_compare_maskEnabled=False,
+                      p_compare_ignorecase=False,
+                      p_compare_engine="MYERS"):
+        # 分段并行比对，返回正序的编辑脚本，格式和myers_diff相同
+        # 1： 以两个文件中都只出现一次的行作为锚点（参考unique_anchors），将两个文件切分为互相独立的段落
+        # 2： 内容完全相同的段落不需要比对，其余的段落分组后在m_ParallelWorkers个子进程中用指定的算法比对
+        # 3： 按顺序拼接各个段落的编辑脚本，锚点作为相同的行
+        # 锚点总是作为相同的行输出，所以结果可能和不分段比对时不同，但同样是正确的比对结果
+        if p_compare_engine is not None and \
+                str(p_compare_engine).upper() not in (self.ENGINE_MYERS, self.ENGINE_LCS):
+            raise DiffException('ERROR: unknown compare engine [%s]' % str(p_compare_engine))
+        if idx is None or idy is None:
+            m_LineIDs = {}
+            idx = self.intern_lines(x, m_LineIDs, p_compare_ignorecase)
+            idy = self.intern_lines(y, m_LineIDs, p_compare_ignorecase)
+            m_LineIDs = None
+        m_Anchors = self.unique_anchors(idx, idy)
+        equal = self.line_comparator(x, y, idx, idy, p_compare_maskEnabled, p_compare_ignorecase)
+
+        # 锚点之间的段落(x_lo, x_hi, y_lo, y_hi, 是否需要比对)，最后一个段落之后没有锚点
+        # 启用正则的时候，ID不同的行也可能相同，长度相同的段落需要再逐行比较一次
+        m_Segments = []
+        m_nSegmentLines = 0
+        x_lo = 0
+        y_lo = 0
+        for (x_hi, y_hi) in m_Anchors + [(len(x), len(y))]:
+            m_bDiff = x_hi - x_lo != y_hi - y_lo or idx[x_lo:x_hi] != idy[y_lo:y_hi]
+            if m_bDiff and p_compare_maskEnabled and x_hi - x_lo == y_hi - y_lo:
+                m_bDiff = not all(equal(i, y_lo + i - x_lo) for i in range(x_lo, x_hi))
+            m_Segments.append((x_lo, x_hi, y_lo, y_hi, m_bDiff))
+            if m_bDiff:
+                m_nSegmentLines = m_nSegmentLines + x_hi - x_lo + y_hi - y_lo
+            x_lo = x_hi + 1
+            y_lo = y_hi + 1
+
+        # 需要比对的段落按顺序分组，每一组作为一个任务
+        m_nWorkers = int(self.m_ParallelWorkers)
+        m_nTaskLines = max(m_nSegmentLines // (m_nWorkers * self.PARALLEL_TASKS_PER_WORKER), 1)
+        m_Tasks = []
+        m_Task = []
+        m_nLines = 0
+        for (x_lo, x_hi, y_lo, y_hi, m_bDiff) in m_Segments:
+            if not m_bDiff:
+                continue
+            m_Task.append((x[x_lo:x_hi], y[y_lo:y_hi], idx[x_lo:x_hi], idy[y_lo:y_hi]))
+            m_nLines = m_nLines + x_hi - x_lo + y_hi - y_lo
+            if m_nLines >= m_nTaskLines:
+                m_Tasks.append(m_Task)
+                m_Task = []
+                m_nLines = 0
+        if m_Task:
+            m_Tasks.append(m_Task)
+        if self.m_Stats is not None:
+            self.m_Stats.add_count("anchor_lines", len(m_Anchors))
+            self.m_Stats.add_count("parallel_segments", sum(1 for m_Segment in m_Segments if m_Segment[4]))
+            self.m_Stats.add_count("parallel_tasks", len(m_Tasks))
+
+        m_SegmentOps = []
+        if m_nSegmentLines < self.PARALLEL_MIN_SEGMENT_LINES or len(m_Tasks) < 2:
+            # 需要比对的内容很少，启动子进程的开销比比对本身还大
+            for m_Task in m_Tasks:
+                m_SegmentOps.extend(run_diff_segments(m_Task, p_compare_maskEnabled, p_compare_ignorecase,
+                                                      p_compare_engine, self.m_Deadline))
+        else:
+            # 进程池只在并行比对的时候才需要，在这里导入可以减少比对引擎的导入时间
+            from concurrent.futures import ProcessPoolExecutor, wait
+            m_Executor = ProcessPoolExecutor(max_workers=min(m_nWorkers, len(m_Tasks)))
+            m_Futures = []
+            try:
+                for m_Task in m_Tasks:
+                    m_Futures.append(m_Executor.submit(run_diff_segments, m_Task,
+                                                       p_compare_maskEnabled, p_compare_ignorecase,
+                                                       p_compare_engine, self.m_Deadline))
+                m_Tasks = None
+                for m_Future in m_Futures:
+                    # 子进程中只检查截止时间，取消标志需要在当前进程中检查
+                    while not m_Future.done():
+                        wait([m_Future], timeout=0.1)
+                        if self.m_Deadline is not None:
+                            self.m_Deadline.check()
+                    m_SegmentOps.extend(m_Future.result())
+            finally:
+                for m_Future in m_Futures:
+                    m_Future.cancel()
+                m_Executor.shutdown(wait=True)
+
+        # 按顺序拼接编辑脚本
+        m_DiffOps = []
+        m_nSegment = 0
+        for (x_lo, x_hi, y_lo, y_hi, m_bDiff) in m_Segments:
+            if m_bDiff:
+                for (m_Op, i, j) in m_SegmentOps[m_nSegment]:
+                    m_DiffOps.append((m_Op, x_lo + i, y_lo + j))
+                m_nSegment = m_nSegment + 1
+            else:
+                for i in range(x_lo, x_hi):
+                    m_DiffOps.append((' ', i, y_lo + i - x_lo))
+            if x_hi < len(x):
+                m_DiffOps.append((' ', x_hi, y_hi))
+        return m_DiffOps
+
+    @staticmethod
+    def normalize_lines(p_RawLines, p_SkipFilter=None, CompareIgnoreTailOrHeadBlank=False):
+        # 去掉每一行的回车换行，根据需要去掉首尾空格，并过滤掉需要忽略的行
+        # 返回保留下来的内容，以及每一行对应的原始行号，行号保存在array中，每一行只占用4个字节
+        (m_Lines, m_LineNos, _) = POSIXCompare.normalize_counted_lines(p_RawLines, p_SkipFilter,
+                                                                       CompareIgnoreTailOrHeadBlank)
+        return m_Lines, m_LineNos
+
+    @staticmethod
+    def normalize_counted_lines(p_RawLines, p_SkipFilter=None, CompareIgnoreTailOrHeadBlank=False):
+        # 和normalize_lines相同，另外返回原始的总行数（包括被忽略的行）
+        m_Lines = []
+        m_LineNos = array('I')
+        m_nLineNo = 0
+        for m_nLineNo, m_Line in enumerate(p_RawLines, 1):
+            if m_Line.endswith('\n'):
+                m_Line = m_Line[:-1]
+            if CompareIgnoreTailOrHeadBlank:
+                m_Line = m_Line.strip()
+            if p_SkipFilter is not None and p_SkipFilter.is_skipped(m_Line):
+                continue
+            m_Lines.append(m_Line)
+            m_LineNos.append(m_nLineNo)
+        return m_Lines, m_LineNos, m_nLineNo
+
+    def iter_text_lines(self, p_szFileName,
+                        skiplines=None,
+                        ignoreEmptyLine=False,
+                        CompareIgnoreTailOrHeadBlank=False,
+                        CompareIgnoreCase=False,
+                        p_KeepSkipped=False,
+                        p_CountLines=False):
+        # 逐行读取文件，文件内容不会被全部加载到内存中
+        # 返回(行号, 比对内容, 规范化后的内容, 之前被忽略的行)，被忽略的行只有在p_KeepSkipped为True时才返回
+        # 被忽略的行是一个(行号, 原始内容)的列表，没有被忽略的行时为None
+        # p_CountLines为True时（工作文件），读取到文件结尾后在m_WorkLineCount中记录文件的总行数
+        m_SkipFilter = SkipLineFilter(skiplines, ignoreEmptyLine)
+        m_SkippedLines = None
+        m_nLineNo = 0
+        with self.open_text_file(p_szFileName) as m_File:
+            for m_nLineNo, m_RawLine in enumerate(m_File, 1):
+                if m_RawLine.endswith('\n'):
+                    m_Line = m_RawLine[:-1]
+                else:
+                    m_Line = m_RawLine
+                if CompareIgnoreTailOrHeadBlank:
+                    m_Line = m_Line.strip()
+                if m_SkipFilter.is_skipped(m_Line):
+                    if p_KeepSkipped:
+                        if m_SkippedLines is None:
+                            m_SkippedLines = []
+                        m_SkippedLines.append((m_nLineNo, m_RawLine))
+                    continue
+                if CompareIgnoreCase:
+                    yield m_nLineNo, m_Line, m_Line.upper(), m_SkippedLines
+                else:
+                    yield m_nLineNo, m_Line, m_Line, m_SkippedLines
+                m_SkippedLines = None
+        if p_CountLines:
+            self.m_WorkLineCount = m_nLineNo
+
+    def compare_text_files_streaming(self, file1, file2,
+                                     skiplines=None,
+                                     ignoreEmptyLine=False,
+                                     CompareWithMask=None,
+                                     CompareIgnoreCase=False,
+                                     CompareIgnoreTailOrHeadBlank=False,
+                                     WindowSize=1024,
+                                     OutputFormat="ANNOTATED",
+                                     ContextLines=3):
+        # 流式比对两个文件，返回一个生成器，按正序逐行返回比对结果（包括被忽略的S行）
+        # 结果中存在+或者-开头的行，表示两个文件存在差异
+        # 相同的内容在读取的同时就被消费，只有存在差异的部分才会被缓存并用Myers算法比对
+        # 差异部分的缓存从WindowSize行开始，如果在窗口中找不到差异结束的位置，窗口会成倍扩大
+        # 所以内存的使用只和最大的差异块相关，而和文件大小无关
+        # OutputFormat和ContextLines决定比对结果的输出格式，参考format_compare_records
+        if not os.path.isfile(file1):
+            raise DiffException('ERROR: %s is not a file' % file1)
+        if not os.path.isfile(file2):
+            raise DiffException('ERROR: %s is not a file' % file2)
+
+        self.m_Truncated = False
+        self.m_WorkLineCount = None
+        m_Records = self.__iter_streaming_records(file1, file2, skiplines, ignoreEmptyLine, CompareWithMask,
+                                                  CompareIgnoreCase, CompareIgnoreTailOrHeadBlank, WindowSize)
+        for row in self.format_compare_records(m_Records, OutputFormat, ContextLines, file1, file2):
+            yield row
+
+    def __iter_streaming_records(self, file1, file2, skiplines, ignoreEmptyLine, CompareWithMask,
+                                 CompareIgnoreCase, CompareIgnoreTailOrHeadBlank, WindowSize):
+        # 流式比对的实现，按正序返回比对记录，记录的格式参考iter_compare_records
+        m_nLastWorkLineNo = 0
+        m_nLastRefLineNo = 0
+        m_WorkLines = self.iter_text_lines(file1, skiplines, ignoreEmptyLine, CompareIgnoreTailOrHeadBlank,
+                                           CompareIgnoreCase, p_KeepSkipped=True, p_CountLines=True)
+        m_RefLines = self.iter_text_lines(file2, skiplines, ignoreEmptyLine,
+                                          CompareIgnoreTailOrHeadBlank, CompareIgnoreCase)
+        m_WorkBuffer = deque()
+        m_RefBuffer = deque()
+        m_bWorkEOF = False
+        m_bRefEOF = False
+        m_nWindowSize = max(int(WindowSize), self.STREAM_SYNC_LINES * 2)
+        m_nUncheckedLines = 0
+        # 已经输出的差异行数，设置了m_MaxDifferences的时候，超过限制后不再继续比对
+        m_nDifferences = 0
+        while True:
+            # 逐行消费相同的内容，这部分内容不会被缓存
+            while True:
+                if self.m_Deadline is not None:
+                    m_nUncheckedLines = m_nUncheckedLines + 1
+                    if m_nUncheckedLines >= self.DEADLINE_CHECK_LINES:
+                        m_nUncheckedLines = 0
+                        self.m_Deadline.check()
+                if not m_WorkBuffer and not m_bWorkEOF:
+                    m_bWorkEOF = not self.__read_stream_line(m_WorkLines, m_WorkBuffer)
+                if not m_RefBuffer and not m_bRefEOF:
+                    m_bRefEOF = not self.__read_stream_line(m_RefLines, m_RefBuffer)
+                if not m_WorkBuffer or not m_RefBuffer:
+                    break
+                m_WorkLine = m_WorkBuffer[0]
+                m_RefLine = m_RefBuffer[0]
+                if m_WorkLine[2] != m_RefLine[2] and \
+                        not (CompareWithMask and
+                             self.compare_string(m_WorkLine[1], m_RefLine[1], True, CompareIgnoreCase)):
+                    break
+                for m_Record in self.__stream_records(' ', m_WorkLine, m_RefLine[0]):
+                    yield m_Record
+                m_nLastWorkLineNo = m_WorkLine[0]
+                m_nLastRefLineNo = m_RefLine[0]
+                m_WorkBuffer.popleft()
+                m_RefBuffer.popleft()
+            if not m_WorkBuffer and not m_RefBuffer:
+                break
+
+            # 读取一个窗口的内容，比对后找到差异结束的位置
+            while True:
+                while len(m_WorkBuffer) < m_nWindowSize and not m_bWorkEOF:
+                    m_bWorkEOF = not self.__read_stream_line(m_WorkLines, m_WorkBuffer)
+                while len(m_RefBuffer) < m_nWindowSize and not m_bRefEOF:
+                    m_bRefEOF = not self.__read_stream_line(m_RefLines, m_RefBuffer)
+                x = [m_Line[1] for m_Line in m_WorkBuffer]
+                y = [m_Line[1] for m_Line in m_RefBuffer]
+                m_LineIDs = {}
+                idx = self.intern_lines([m_Line[2] for m_Line in m_WorkBuffer], m_LineIDs)
+                idy = self.intern_lines([m_Line[2] for m_Line in m_RefBuffer], m_LineIDs)
+                m_LineIDs = None
+                equal = self.line_comparator(x, y, idx, idy, CompareWithMask, CompareIgnoreCase)
+                if self.m_MaxDifferences is not None:
+                    # 窗口内的差异超过了剩余的限制，输出开头的部分后结束比对
+                    m_DiffOps = self.myers_diff_prefix(len(x), len(y), equal,
+                                                       self.m_MaxDifferences - m_nDifferences, self.m_Deadline)
+                    if m_DiffOps is not None:
+                        self.m_Truncated = True
+                        m_nCommit = len(m_DiffOps)
+                        break
+                m_DiffOps = self.myers_diff(len(x), len(y), equal, self.m_Deadline)
+                if m_bWorkEOF and m_bRefEOF:
+                    m_nCommit = len(m_DiffOps)
+                    break
+                # 最后一段连续STREAM_SYNC_LINES行相同的内容之前的比对结果是可靠的
+                m_nCommit = self.__find_stream_sync(m_DiffOps)
+                if m_nCommit > 0:
+                    break
+                # 窗口内找不到差异结束的位置，扩大窗口后重新比对
+                m_nWindowSize = m_nWindowSize * 2
+
+            # 输出已经确定的比对结果，并从缓存中移除
+            m_nWorkUsed = 0
+            m_nRefUsed = 0
+            for m_nPos in range(m_nCommit):
+                m_Op = m_DiffOps[m_nPos][0]
+                if m_Op == '+':
+                    m_nLastRefLineNo = m_RefBuffer[m_nRefUsed][0]
+                    yield DiffRecord('+', m_nLastWorkLineNo, m_nLastRefLineNo, m_RefBuffer[m_nRefUsed][1])
+                    m_nRefUsed = m_nRefUsed + 1
+                else:
+                    if m_Op == ' ':
+                        m_nLastRefLineNo = m_RefBuffer[m_nRefUsed][0]
+                        m_nRefUsed = m_nRefUsed + 1
+                    for m_Record in self.__stream_records(m_Op, m_WorkBuffer[m_nWorkUsed], m_nLastRefLineNo):
+                        yield m_Record
+                    m_nLastWorkLineNo = m_WorkBuffer[m_nWorkUsed][0]
+                    m_nWorkUsed = m_nWorkUsed + 1
+            if self.m_Truncated:
+                return
+            m_nDifferences = m_nDifferences + m_nCommit - (m_nWorkUsed + m_nRefUsed - m_nCommit)
+            for _ in range(m_nWorkUsed):
+                m_WorkBuffer.popleft()
+            for _ in range(m_nRefUsed):
+                m_RefBuffer.popleft()
+            m_nWindowSize = max(int(WindowSize), self.STREAM_SYNC_LINES * 2)
+
+    @staticmethod
+    def __read_stream_line(p_Lines, p_Buffer):
+        # 从生成器中读取一行放入缓存，如果文件已经结束，返回False
+        for m_Line in p_Lines:
+            p_Buffer.append(m_Line)
+            return True
+        return False
+
+    def __find_stream_sync(self, p_DiffOps):
+        # 返回最后一段连续相同内容的起始位置，该位置之前的编辑脚本可以输出
+        # 如果连续相同的内容之前没有任何差异，返回0
+        m_nSameCount = 0
+        m_nSync = 0
+        m_bDiffFound = False
+        for m_nPos in range(len(p_DiffOps)):
+            if p_DiffOps[m_nPos][0] == ' ':
+                m_nSameCount = m_nSameCount + 1
+                if m_nSameCount == self.STREAM_SYNC_LINES and m_bDiffFound:
+                    m_nSync = m_nPos - self.STREAM_SYNC_LINES + 1
+            else:
+                m_nSameCount = 0
+                m_bDiffFound = True
+        return m_nSync
+
+    @staticmethod
+    def __stream_records(p_Op, p_WorkLine, p_nRefLineNo):
+        # 生成工作文件中一行的比对记录，在输出前需要先输出之前被忽略的行
+        if p_WorkLine[3] is not None:
+            for (m_nLineNo, m_RawLine) in p_WorkLine[3]:
+                yield DiffRecord('S', m_nLineNo, None, m_RawLine)
+        yield DiffRecord(p_Op, p_WorkLine[0], p_nRefLineNo, p_WorkLine[1])
+
+    @staticmethod
+    def iter_diff_hunks(p_Rows, p_nContextLines=3):
+        # 将正序的比对结果按照差异块分组，每次返回一个差异块包含的所有行
+        # 比对结果可以是DiffRecord，也可以是dif文件中格式化后的行
+        # 每个差异块包括连续的+/-行，以及前后最多p_nContextLines行相同或者被忽略的内容
+        # 两个差异块之间相同的内容不超过2*p_nContextLines行时，合并为一个差异块
+        m_nContextLines = max(int(p_nContextLines), 0)
+        m_Before = deque(maxlen=m_nContextLines)
+        m_Hunk = None
+        m_Pending = []
+        for row in p_Rows:
+            if (row.op if type(row) is DiffRecord else row[0]) in ('+', '-'):
+                if m_Hunk is None:
+                    m_Hunk = list(m_Before)
+                    m_Before.clear()
+                else:
+                    m_Hunk.extend(m_Pending)
+                m_Pending = []
+                m_Hunk.append(row)
+            elif m_Hunk is None:
+                m_Before.append(row)
+            else:
+                m_Pending.append(row)
+                if len(m_Pending) > 2 * m_nContextLines:
+                    m_Hunk.extend(m_Pending[:m_nContextLines])
+                    yield m_Hunk
+                    m_Before.extend(m_Pending[len(m_Pending) - m_nContextLines:])
+                    m_Hunk = None
+                    m_Pending = []
+        if m_Hunk is not None:
+            m_Hunk.extend(m_Pending[:m_nContextLines])
+            yield m_Hunk
+
+    @staticmethod
+    def compression_format(p_szFileName):
+        # 根据文件开头的内容判断文件的压缩格式，返回gzip、bzip2、xz或者zstd，不是压缩文件时返回None
+        with open(p_szFileName, mode='rb') as m_File:
+            m_Header = m_File.read(10)
+        for (m_Magic, m_szFormat) in POSIXCompare.COMPRESSION_MAGIC:
+            if m_Header.startswith(m_Magic):
+                return m_szFormat
+        if len(m_Header) == 10 and m_Header.startswith(b'BZh') and m_Header[3:4] in b'123456789' and \
+                m_Header[4:10] in POSIXCompare.BZIP2_BLOCK_MAGIC:
+            return "bzip2"
+        return None
+
+    @staticmethod
+    def open_text_file(p_szFileName):
+        # 以文本方式打开文件，压缩文件在读取的时候逐块解压，不生成临时文件
+        # 解压模块只有在遇到压缩文件的时候才导入，以减少比对引擎的导入时间
+        m_szFormat = POSIXCompare.compression_format(p_szFileName)
+        if m_szFormat is None:
+            return open(p_szFileName, mode='r', encoding='utf-8')
+        if m_szFormat == "gzip":
+            import gzip
+            return gzip.open(p_szFileName, mode='rt', encoding='utf-8')
+        if m_szFormat == "bzip2":
+            import bz2
+            return bz2.open(p_szFileName, mode='rt', encoding='utf-8')
+        if m_szFormat == "xz":
+            import lzma
+            return lzma.open(p_szFileName, mode='rt', encoding='utf-8')
+        try:
+            # zstd从Python 3.14开始才包含在标准库中
+            from compression import zstd
+        except ImportError:
+            raise DiffException('ERROR: %s is compressed with zstd, which is not supported by this Python' %
+                                p_szFileName)
+        return zstd.open(p_szFileName, mode='rt', encoding='utf-8')
+
+    @staticmethod
+    def find_text_file(p_szFileName):
+        # 返回文件本身，文件不存在的时候，返回同名的压缩文件（例如work.log.gz），都不存在时返回None
+        if os.path.isfile(p_szFileName):
+            return p_szFileName
+        for m_szExtension in POSIXCompare.COMPRESSION_EXTENSIONS:
+            if os.path.isfile(p_szFileName + m_szExtension):
+                return p_szFileName + m_szExtension
+        return None
+
+    @staticmethod
+    def strip_compression_extension(p_szFileName):
+        # 去掉压缩文件的扩展名，例如work.log.gz返回work.log
+        (m_szName, m_szExtension) = os.path.splitext(p_szFileName)
+        if m_szExtension.lower() in POSIXCompare.COMPRESSION_EXTENSIONS:
+            return m_szName
+        return p_szFileName
+
+    @staticmethod
+    def identical_files(file1, file2):
+        # 判断两个文件的内容是否完全相同，大小不同的文件不需要读取内容
+        # 内容完全相同的两个文件，在任何比对选项下的比对结果都是相同
+        try:
+            if os.path.getsize(file1) != os.path.getsize(file2):
+                return False
+            with open(file1, mode='rb') as m_File1, open(file2, mode='rb') as m_File2:
+                while True:
+                    m_Block1 = m_File1.read(POSIXCompare.EXACT_BLOCK_SIZE)
+                    if m_Block1 != m_File2.read(POSIXCompare.EXACT_BLOCK_SIZE):
+                        return False
+                    if not m_Block1:
+                        return True
+        except OSError:
+            # 无法读取的文件交给后续的比对处理，由比对给出错误信息
+            return False
+
+    def compare_exact_files(self, file1, file2, CompareEngine="MYERS", OutputFormat="ANNOTATED", ContextLines=3):
+        # 在没有设置任何比对选项的时候，按照字节直接比对两个文件
+        # 文件通过mmap映射到内存，首先比较文件大小和文件内容，如果完全相同，直接返回
+        # 如果存在差异，找到第一个和最后一个不同字节所在的行，只对这些行之间的内容进行比对
+        # 返回值和compare_text_files相同，如果无法使用字节比对（空文件、包含回车符或者压缩文件），返回None
+        # 文件完全相同时，比对结果为空
+        self.m_Truncated = False
+        self.m_WorkLineCount = None
+        m_nSize1 = os.path.getsize(file1)
+        m_nSize2 = os.path.getsize(file2)
+        if m_nSize1 == 0 or m_nSize2 == 0:
+            return None
+        if self.compression_format(file1) is not None or self.compression_format(file2) is not None:
+            return None
+        with CompareStats.phase(self.m_Stats, "exact_compare"):
+            m_Result = self.__mmap_compare(file1, file2, m_nSize1, m_nSize2)
+        if m_Result is None or len(m_Result) == 2:
+            return m_Result
+        (m_nHeadLines, x, y) = m_Result
+
+        # 只比对中间存在差异的部分，头部和尾部直接作为相同的行输出
+        with CompareStats.phase(self.m_Stats, "intern"):
+            m_LineIDs = {}
+            idx = self.intern_lines(x, m_LineIDs, p_Deadline=self.m_Deadline)
+            idy = self.intern_lines(y, m_LineIDs, p_Deadline=self.m_Deadline)
+            m_LineIDs = None
+        (m_CompareResult, m_DiffOps) = self.compare_ops(x, y, p_compare_engine=CompareEngine, idx=idx, idy=idy)
+        return m_CompareResult, self.format_compare_records(
+            self.__iter_exact_records(file1, m_nHeadLines, x, y, m_DiffOps, self.m_Truncated),
+            OutputFormat, ContextLines, file1, file2)
+
+    def __mmap_compare(self, file1, file2, p_nSize1, p_nSize2):
+        # 按照字节比对两个文件，文件完全相同时返回(True, [])，无法使用字节比对时返回None
+        # 否则返回(相同头部的行数, 工作文件中间部分的行, 参考文件中间部分的行)
+        with open(file1, mode='rb') as m_File1, open(file2, mode='rb') as m_File2:
+            with mmap.mmap(m_File1.fileno(), 0, access=mmap.ACCESS_READ) as m1, \
+                    mmap.mmap(m_File2.fileno(), 0, access=mmap.ACCESS_READ) as m2:
+                if p_nSize1 == p_nSize2 and self.__mmap_equal(m1, 0, m2, 0, p_nSize1):
+                    return True, []
+
+                # 文本模式读取文件时会转换回车换行符，这种情况下不能按照字节来确定行的位置
+                if m1.find(b'\r') != -1 or m2.find(b'\r') != -1:
+                    return None
+
+                # 相同的头部，从第一个不同字节所在行的行首开始比对
+                m_nMinSize = min(p_nSize1, p_nSize2)
+                m_nFirstDiff = self.__mmap_common_prefix(m1, m2, m_nMinSize)
+                m_nStart = m1.rfind(b'\n', 0, m_nFirstDiff) + 1
+
+                # 相同的尾部，从最后一个不同字节所在行的下一行开始都是相同的
+                m_nSuffix = self.__mmap_common_suffix(m1, p_nSize1, m2, p_nSize2, m_nMinSize - m_nStart)
+                m_nEnd1 = m1.find(b'\n', p_nSize1 - m_nSuffix)
+                if m_nEnd1 == -1:
+                    m_nEnd1 = p_nSize1
+                else:
+                    m_nEnd1 = m_nEnd1 + 1
+                m_nEnd2 = m_nEnd1 - p_nSize1 + p_nSize2
+
+                m_nHeadLines = m1[:m_nStart].count(b'\n')
+                x = self.__split_bytes_lines(m1[m_nStart:m_nEnd1])
+                y = self.__split_bytes_lines(m2[m_nStart:m_nEnd2])
+        return m_nHeadLines, x, y
+
+    def __iter_exact_records(self, file1, p_nHeadLines, x, y, p_DiffOps, p_bTruncated=False):
+        # 按正序返回字节比对的比对记录，相同的头部和尾部在输出的时候才从文件中读取
+        # 比对提前结束的时候，编辑脚本只是开头的部分，不再输出后面的内容
+        # 读取到文件结尾以后，在m_WorkLineCount中记录工作文件的总行数
+        with open(file1, mode='r', encoding='utf-8') as m_File:
+            for m_nLineNo in range(1, p_nHeadLines + 1):
+                m_Line = next(m_File)
+                if m_Line.endswith('\n'):
+                    m_Line = m_Line[:-1]
+                yield DiffRecord(' ', m_nLineNo, m_nLineNo, m_Line)
+            # 增加的行记录之前最后一个工作文件的行号，删除的行记录之前最后一个参考文件的行号
+            m_nLastWorkLineNo = p_nHeadLines
+            m_nLastRefLineNo = p_nHeadLines
+            for (m_Op, i, j) in p_DiffOps:
+                if m_Op == '+':
+                    m_nLastRefLineNo = p_nHeadLines + j + 1
+                    yield DiffRecord('+', m_nLastWorkLineNo, m_nLastRefLineNo, y[j])
+                    continue
+                next(m_File)
+                m_nLastWorkLineNo = p_nHeadLines + i + 1
+                if m_Op == ' ':
+                    m_nLastRefLineNo = p_nHeadLines + j + 1
+                yield DiffRecord(m_Op, m_nLastWorkLineNo, m_nLastRefLineNo, x[i])
+            if p_bTruncated:
+                return
+            m_nLineNo = p_nHeadLines + len(x)
+            for m_nLineNo, m_Line in enumerate(m_File, p_nHeadLines + len(x) + 1):
+                if m_Line.endswith('\n'):
+                    m_Line = m_Line[:-1]
+                yield DiffRecord(' ', m_nLineNo, m_nLineNo - len(x) + len(y), m_Line)
+            self.m_WorkLineCount = m_nLineNo
+
+    @staticmethod
+    def __mmap_equal(m1, p_nOffset1, m2, p_nOffset2, p_nLength):
+        # 按块比较两个文件中的一段内容是否相同
+        m_nBlockSize = POSIXCompare.EXACT_BLOCK_SIZE
+        for m_nPos in range(0, p_nLength, m_nBlockSize):
+            m_nSize = min(m_nBlockSize, p_nLength - m_nPos)
+            if m1[p_nOffset1 + m_nPos:p_nOffset1 + m_nPos + m_nSize] != \
+                    m2[p_nOffset2 + m_nPos:p_nOffset2 + m_nPos + m_nSize]:
+                return False
+        return True
+
+    @staticmethod
+    def __mmap_common_prefix(m1, m2, p_nLength):
+        # 返回两个文件相同头部的字节数，先按块查找，再在块内二分查找
+        m_nBlockSize = POSIXCompare.EXACT_BLOCK_SIZE
+        m_nLow = 0
+        while m_nLow < p_nLength:
+            m_nHigh = min(m_nLow + m_nBlockSize, p_nLength)
+            if m1[m_nLow:m_nHigh] != m2[m_nLow:m_nHigh]:
+                break
+            m_nLow = m_nHigh
+        else:
+            return p_nLength
+        while m_nHigh - m_nLow > 1:
+            m_nMid = (m_nLow + m_nHigh) // 2
+            if m1[m_nLow:m_nMid] == m2[m_nLow:m_nMid]:
+                m_nLow = m_nMid
+            else:
+                m_nHigh = m_nMid
+        return m_nLow
+
+    @staticmethod
+    def __mmap_common_suffix(m1, p_nSize1, m2, p_nSize2, p_nLength):
+        # 返回两个文件相同尾部的字节数，最多不超过p_nLength
+        m_nBlockSize = POSIXCompare.EXACT_BLOCK_SIZE
+        m_nLow = 0
+        while m_nLow < p_nLength:
+            m_nHigh = min(m_nLow + m_nBlockSize, p_nLength)
+            if m1[p_nSize1 - m_nHigh:p_nSize1 - m_nLow] != m2[p_nSize2 - m_nHigh:p_nSize2 - m_nLow]:
+                break
+            m_nLow = m_nHigh
+        else:
+            return p_nLength
+        while m_nHigh - m_nLow > 1:
+            m_nMid = (m_nLow + m_nHigh) // 2
+            if m1[p_nSize1 - m_nMid:p_nSize1 - m_nLow] == m2[p_nSize2 - m_nMid:p_nSize2 - m_nLow]:
+                m_nLow = m_nMid
+            else:
+                m_nHigh = m_nMid
+        return m_nLow
+
+    @staticmethod
+    def __split_bytes_lines(p_Content):
+        # 将字节内容解码后按照换行符拆分为行，结果中不包含换行符
+        if len(p_Content) == 0:
+            return []
+        m_Lines = p_Content.decode('utf-8').split('\n')
+        if m_Lines[-1] == '':
+            m_Lines.pop()
+        return m_Lines
+
+    def compare_text_files(self, file1, file2,
+                           skiplines=None,
+                           ignoreEmptyLine=False,
+                           CompareWithMask=None,
+                           CompareIgnoreCase=False,
+                           CompareIgnoreTailOrHeadBlank=False,
+                           CompareEngine="MYERS",
+                           OutputFormat="ANNOTATED",
+                           ContextLines=3):
+        if not os.path.isfile(file1):
+            raise DiffException('ERROR: %s is not a file' % file1)
+        if not os.path.isfile(file2):
+            raise DiffException('ERROR: %s is not a file' % file2)
+
+        # 没有设置任何比对选项的时候，首先尝试按照字节直接比对
+        self.m_Truncated = False
+        self.m_WorkLineCount = None
+        self.m_ReferencePatternIDs = None
+        if not skiplines and not ignoreEmptyLine and not CompareWithMask and \
+                not CompareIgnoreCase and not CompareIgnoreTailOrHeadBlank:
+            m_ExactResult = self.compare_exact_files(file1, file2, CompareEngine, OutputFormat, ContextLines)
+            if m_ExactResult is not None:
+                return m_ExactResult
+
+        # 逐行读取文件，一次遍历完成回车换行、首尾空格的处理，以及忽略行和空行的过滤
+        # 被忽略的行在输出比对结果的时候才从文件中读取，不在内存中保留文件的原始内容
+        m_SkipFilter = SkipLineFilter(skiplines, ignoreEmptyLine)
+        if self.m_Stats is not None:
+            m_SkipFilter.is_skipped = self.m_Stats.timed("skip_filter", m_SkipFilter.is_skipped)
+        # 启用了参考文件预处理结果的缓存，或者参考文件已经预热过的时候（参考CompareEngineRegistry）
+        # 参考文件的内容、行ID以及正则表达式的分类直接从缓存中读取
+        # 读取、解压、映射行ID以及去掉相同的头尾的时候都会定期检查截止时间
+        m_Artifact = None
+        with CompareStats.phase(self.m_Stats, "read"):
+            with self.open_text_file(file1) as m_File:
+                (file1content, lineno1, self.m_WorkLineCount) = self.normalize_counted_lines(
+                    self.iter_with_deadline(m_File, self.m_Deadline), m_SkipFilter, CompareIgnoreTailOrHeadBlank)
+            m_Artifact = SharedRegistry.reference_artifact(file2, self.m_ReferenceCache, skiplines, ignoreEmptyLine,
+                                                           CompareIgnoreCase, CompareIgnoreTailOrHeadBlank,
+                                                           self.m_Stats, self.m_Deadline)
+            if m_Artifact is not None:
+                (file2content, lineno2) = (m_Artifact.m_Lines, m_Artifact.m_LineNos)
+            else:
+                with self.open_text_file(file2) as m_File:
+                    (file2content, lineno2) = self.normalize_lines(self.iter_with_deadline(m_File, self.m_Deadline),
+                                                                   m_SkipFilter, CompareIgnoreTailOrHeadBlank)
+
+        # 将规范化后的每一行映射为整数ID，后续的比较只需要比较整数
+        with CompareStats.phase(self.m_Stats, "intern"):
+            if m_Artifact is not None:
+                # 参考文件的行ID就是预处理结果中的位置，工作文件在此基础上继续分配ID
+                # 预处理结果中的字典和预处理结果一起缓存，不需要每次比对都重建，也不能被修改
+                m_LineIDs = {}
+                id1 = self.intern_lines(file1content, m_LineIDs, CompareIgnoreCase, self.m_Deadline,
+                                        m_Artifact.m_KeyIDs)
+                id2 = m_Artifact.m_KeyIndex.tolist()
+                self.m_ReferencePatternIDs = m_Artifact.pattern_ids()
+            else:
+                m_LineIDs = {}
+                id1 = self.intern_lines(file1content, m_LineIDs, CompareIgnoreCase, self.m_Deadline)
+                id2 = self.intern_lines(file2content, m_LineIDs, CompareIgnoreCase, self.m_Deadline)
+            m_LineIDs = None
+            equal = self.line_comparator(file1content, file2content, id1, id2,
+                                         CompareWithMask, CompareIgnoreCase)
+
+        # 去掉两个文件中相同的头部和尾部，只对中间存在差异的部分进行比对
+        with CompareStats.phase(self.m_Stats, "trim"):
+            m_nMaxTrim = min(len(file1content), len(file2content))
+            m_nHead = 0
+            for m_nHead in self.iter_with_deadline(range(m_nMaxTrim), self.m_Deadline):
+                if not equal(m_nHead, m_nHead):
+                    break
+            else:
+                m_nHead = m_nMaxTrim
+            m_nTail = 0
+            for m_nTail in self.iter_with_deadline(range(m_nMaxTrim - m_nHead), self.m_Deadline):
+                if not equal(len(file1content) - m_nTail - 1, len(file2content) - m_nTail - 1):
+                    break
+            else:
+                m_nTail = m_nMaxTrim - m_nHead
+            m_nEnd1 = len(file1content) - m_nTail
+            m_nEnd2 = len(file2content) - m_nTail
+        if self.m_Stats is not None:
+            self.m_Stats.add_count("work_lines", len(file1content))
+            self.m_Stats.add_count("reference_lines", len(file2content))
+            self.m_Stats.add_count("trimmed_lines", m_nHead + m_nTail)
+
+        try:
+            (m_CompareResult, m_DiffOps) = self.compare_ops(file1content[m_nHead:m_nEnd1],
+                                                            file2content[m_nHead:m_nEnd2],
+                                                            p_compare_maskEnabled=CompareWithMask,
+                                                            p_compare_ignorecase=CompareIgnoreCase,
+                                                            p_compare_engine=CompareEngine,
+                                                            idx=id1[m_nHead:m_nEnd1],
+                                                            idy=id2[m_nHead:m_nEnd2])
+        finally:
+            self.m_ReferencePatternIDs = None
+
+        # 输出两个信息
+        # 1：  Compare的结果是否存在dif，True/False
+        # 2:   Compare的Dif结果，是一个生成器，按正序逐行返回比对结果，并补充进入被Skip掉的内容
+        #      比对结果的格式由OutputFormat决定，参考format_compare_records
+        #      比对提前结束的时候（m_Truncated），只返回到最后一个差异之后相同的内容为止
+        m_nTail = 0 if self.m_Truncated else len(file1content) - m_nEnd1
+        m_Records = self.iter_compare_records(
+            file1, file1content, lineno1, file2content, lineno2,
+            self.__iter_trimmed_ops(m_nHead, m_DiffOps, m_nTail, m_nEnd1, m_nEnd2))
+        return m_CompareResult, self.format_compare_records(m_Records, OutputFormat, ContextLines, file1, file2)
+
+    def compare_text_files_unordered(self, file1, file2,
+                                     skiplines=None,
+                                     ignoreEmptyLine=False,
+                                     CompareWithMask=None,
+                                     CompareIgnoreCase=False,
+                                     CompareIgnoreTailOrHeadBlank=False):
+        # 不考虑行的顺序，把两个文件作为行的多重集合进行比对，用于比对没有排序的查询结果
+        # 1： 参考文件的每一行按照规范化后的内容放入哈希表，记录每个内容出现的行号
+        # 2： 逐行读取工作文件，从哈希表中取走内容相同的参考文件的行，取不到的作为多出的行
+        # 3： 启用正则的时候，多出的行再和剩余的参考文件中的正则表达式配对，配对的方法参考match_extra_lines
+        # 返回值和compare_text_files相同，比对结果中只包括工作文件多出的行(-)和参考文件多出的行(+)
+        # 多出的行按工作文件的行号排序，之后是按参考文件的行号排序的缺少的行，格式和ANNOTATED格式相同
+        # 工作文件的内容不会全部保留在内存中，耗时和两个文件的行数成线性关系（不包括正则匹配的部分）
+        if not os.path.isfile(file1):
+            raise DiffException('ERROR: %s is not a file' % file1)
+        if not os.path.isfile(file2):
+            raise DiffException('ERROR: %s is not a file' % file2)
+        self.m_Truncated = False
+
+        m_nUncheckedLines = 0
+        with CompareStats.phase(self.m_Stats, "read"):
+            # 规范化后的内容 -> [(行号, 内容), ...]，按照在参考文件中出现的顺序
+            m_RefLines = OrderedDict()
+            for (m_nLineNo, m_Line, m_Key, _) in self.iter_with_deadline(
+                    self.iter_text_lines(file2, skiplines, ignoreEmptyLine, CompareIgnoreTailOrHeadBlank,
+                                         CompareIgnoreCase),
+                    self.m_Deadline):
+                m_Positions = m_RefLines.get(m_Key)
+                if m_Positions is None:
+                    m_Positions = m_RefLines[m_Key] = deque()
+                m_Positions.append((m_nLineNo, m_Line))
+            m_Extra = []
+            for (m_nLineNo, m_Line, m_Key, _) in self.iter_text_lines(file1, skiplines, ignoreEmptyLine,
+                                                                      CompareIgnoreTailOrHeadBlank,
+                                                                      CompareIgnoreCase):
+                if self.m_Deadline is not None:
+                    m_nUncheckedLines = m_nUncheckedLines + 1
+                    if m_nUncheckedLines >= self.DEADLINE_CHECK_LINES:
+                        m_nUncheckedLines = 0
+                        self.m_Deadline.check()
+                m_Positions = m_RefLines.get(m_Key)
+                if m_Positions:
+                    m_Positions.popleft()
+                else:
+                    m_Extra.append((m_nLineNo, m_Line))
+
+        # 按照正则表达式匹配剩余的行，只有包含正则元字符的参考文件的行才可能和内容不同的行匹配
+        if CompareWithMask and m_Extra:
+            with CompareStats.phase(self.m_Stats, "diff"):
+                m_Patterns = [m_Positions for (m_Key, m_Positions) in m_RefLines.items()
+                              if m_Positions and not LineMatchIndex.RegexMetaCharacters.isdisjoint(m_Key)]
+                if m_Patterns:
+                    m_Extra = self.match_extra_lines(m_Extra, m_Patterns, CompareIgnoreCase)
+        m_Missing = sorted(m_Position for m_Positions in m_RefLines.values() for m_Position in m_Positions)
+        m_RefLines = None
+        if self.m_Stats is not None:
+            self.m_Stats.add_count("edit_distance", len(m_Extra) + len(m_Missing))
+
+        # 设置了最多查找的差异行数的时候，只保留开头的部分
+        if self.m_MaxDifferences is not None and len(m_Extra) + len(m_Missing) > self.m_MaxDifferences:
+            self.m_Truncated = True
+            m_Missing = m_Missing[:max(self.m_MaxDifferences - len(m_Extra), 0)]
+            m_Extra = m_Extra[:self.m_MaxDifferences]
+        m_Records = [DiffRecord('-', m_nLineNo, 0, m_Line) for (m_nLineNo, m_Line) in m_Extra] + \
+                    [DiffRecord('+', 0, m_nLineNo, m_Line) for (m_nLineNo, m_Line) in m_Missing]
+        m_CompareResult = len(m_Records) == 0 and not self.m_Truncated
+        return m_CompareResult, self.iter_annotated_rows(m_Records)
+
+    def match_extra_lines(self, p_Extra, p_Patterns, p_compare_ignorecase=False):
+        # 不考虑顺序比对时，多出的行和参考文件中剩余的正则表达式之间的配对
+        # p_Extra       工作文件中多出的行[(行号, 内容), ...]，按照行号排序
+        # p_Patterns    参考文件中剩余的正则表达式，每一项是内容相同的行的deque[(行号, 内容), ...]
+        #               配对成功的参考文件的行从deque的开头取走
+        # 返回没有配对成功的多出的行
+        # 一个多出的行可能和多个正则表达式匹配，依次和第一个能够匹配的表达式配对时，结果会受到参考文件中行的顺序的影响
+        # 例如a1和ab比对a.*和a\d时，a1被a.*取走以后ab就没有可以配对的行了
+        # 所以这里求二分图的最大匹配：每个多出的行找不到空闲的表达式时，沿着增广路径调整之前的配对（广度优先）
+        # 内容相同的多出的行能够匹配的表达式也相同，匹配的结果按照内容缓存；一个行找不到增广路径时，
+        # 之后也不会再找到，内容相同的行不需要再尝试
+        # 查找失败时经过的表达式都已经配满，从它们出发的路径之后也不会找到空闲的表达式，以后的查找直接跳过
+        # 多出的行和表达式的内容一定不同（内容相同的行在哈希表中已经取走），只需要按照compare_string中的正则规则匹配
+        # 每个表达式只从缓存中取一次，无法编译的表达式不能和任何行配对
+        m_CompiledPatterns = [self.CompiledRegexPattern.get(m_Positions[0][1], p_compare_ignorecase)
+                              for m_Positions in p_Patterns]
+        m_Capacity = [len(m_Positions) for m_Positions in p_Patterns]
+        # 每个表达式已经配对的多出的行，以及每个多出的行配对的表达式
+        m_Assigned = [[] for _ in p_Patterns]
+        m_Match = [None] * len(p_Extra)
+        m_Edges = {}
+        m_Failed = set()
+        m_DeadGroups = set()
+
+        def edges(p_nExtra):
+            m_Line = p_Extra[p_nExtra][1]
+            m_Groups = m_Edges.get(m_Line)
+            if m_Groups is None:
+                m_Groups = m_Edges[m_Line] = []
+                for (m_nGroup, m_CompiledPattern) in enumerate(m_CompiledPatterns):
+                    if m_CompiledPattern is not None:
+                        matchObj = m_CompiledPattern.match(m_Line)
+                        if matchObj is not None and matchObj.group() == m_Line:
+                            m_Groups.append(m_nGroup)
+            return m_Groups
+
+        for m_nExtra in range(len(p_Extra)):
+            if self.m_Deadline is not None:
+                self.m_Deadline.check()
+            if p_Extra[m_nExtra][1] in m_Failed:
+                continue
+            m_Groups = edges(m_nExtra)
+            for m_nGroup in m_Groups:
+                if len(m_Assigned[m_nGroup]) < m_Capacity[m_nGroup]:
+                    m_Assigned[m_nGroup].append(m_nExtra)
+                    m_Match[m_nExtra] = m_nGroup
+                    break
+            else:
+                if m_Groups and self.__augment(m_nExtra, edges, m_Capacity, m_Assigned, m_Match, m_DeadGroups):
+                    continue
+                m_Failed.add(p_Extra[m_nExtra][1])
+
+        for (m_Positions, m_Lines) in zip(p_Patterns, m_Assigned):
+            for _ in m_Lines:
+                m_Positions.popleft()
+        return [m_Extra for (m_Extra, m_nGroup) in zip(p_Extra, m_Match) if m_nGroup is None]
+
+    @staticmethod
+    def __augment(p_nExtra, edges, p_Capacity, p_Assigned, p_Match, p_DeadGroups):
+        # 从没有配对的行p_nExtra开始广度优先查找增广路径，找到时沿路径调整配对，返回是否找到
+        # p_DeadGroups中的表达式不再经过，没有找到时把这次经过的表达式加入p_DeadGroups
+        m_GroupParent = {}
+        m_Seen = {p_nExtra}
+        m_Queue = deque([p_nExtra])
+        while m_Queue:
+            m_nExtra = m_Queue.popleft()
+            for m_nGroup in edges(m_nExtra):
+                if m_nGroup in m_GroupParent or m_nGroup in p_DeadGroups:
+                    continue
+                m_GroupParent[m_nGroup] = m_nExtra
+                if len(p_Assigned[m_nGroup]) < p_Capacity[m_nGroup]:
+                    # 路径上的每个行改为和到达它的下一个表达式配对
+                    while m_nGroup is not None:
+                        m_nExtra = m_GroupParent[m_nGroup]
+                        m_nOldGroup = p_Match[m_nExtra]
+                        if m_nOldGroup is not None:
+                            p_Assigned[m_nOldGroup].remove(m_nExtra)
+                        p_Assigned[m_nGroup].append(m_nExtra)
+                        p_Match[m_nExtra] = m_nGroup
+                        m_nGroup = m_nOldGroup
+                    return True
+                for m_nNext in p_Assigned[m_nGroup]:
+                    if m_nNext not in m_Seen:
+                        m_Seen.add(m_nNext)
+                        m_Queue.append(m_nNext)
+        p_DeadGroups.update(m_GroupParent)
+        return False
+
+    @staticmethod
+    def __iter_trimmed_ops(p_nHead, p_DiffOps, p_nTail, p_nEnd1, p_nEnd2):
+        # 将去掉的头部和尾部作为相同的行补充到编辑脚本中
+        for m_nPos in range(p_nHead):
+            yield ' ', m_nPos, m_nPos
+        for (m_Op, i, j) in p_DiffOps:
+            yield m_Op, i + p_nHead, j + p_nHead
+        for m_nPos in range(p_nTail):
+            yield ' ', p_nEnd1 + m_nPos, p_nEnd2 + m_nPos
+
+    @staticmethod
+    def iter_compare_records(file1, x, linenox, y, linenoy, p_DiffOps):
+        # 按正序返回比对记录DiffRecord(op, 工作文件行号, 参考文件行号, 内容)
+        #   ' '   相同的行，内容为工作文件中的内容
+        #   '-'   工作文件中多出的行，参考文件行号为之前最后一个参考文件的行号
+        #   '+'   参考文件中多出的行，工作文件行号为之前最后一个工作文件的行号
+        #   'S'   工作文件中被Skip掉的行，内容为包含换行符的原始内容，参考文件行号为None
+        # 在工作文件的每一行输出之前，先输出之前被Skip掉的内容，被Skip掉的内容需要时才从文件中读取
+        m_nLastPos = 0
+        m_nRawPos = 0
+        m_nLastRefLineNo = 0
+        m_RawFile = None
+        try:
+            for (m_Op, i, j) in p_DiffOps:
+                if m_Op == '+':
+                    # 当前日志没有，Log中有的，忽略不计
+                    m_nLastRefLineNo = linenoy[j]
+                    yield DiffRecord('+', m_nLastPos, m_nLastRefLineNo, y[j])
+                    continue
+                m_LineNo = linenox[i]
+                if m_LineNo > (m_nLastPos + 1):
+                    if m_RawFile is None:
+                        m_RawFile = POSIXCompare.open_text_file(file1)
+                    for _ in range(m_nLastPos - m_nRawPos):
+                        next(m_RawFile)
+                    for m_nPos in range(m_nLastPos + 1, m_LineNo):
+                        yield DiffRecord('S', m_nPos, None, next(m_RawFile))
+                    m_nRawPos = m_LineNo - 1
+                if m_Op == ' ':
+                    m_nLastRefLineNo = linenoy[j]
+                yield DiffRecord(m_Op, m_LineNo, m_nLastRefLineNo, x[i])
+                m_nLastPos = m_LineNo
+        finally:
+            if m_RawFile is not None:
+                m_RawFile.close()
+
+    @staticmethod
+    def iter_compare_result(file1, x, linenox, y, linenoy, p_DiffOps):
+        # 按正序逐行返回原有格式的比对结果
+        return POSIXCompare.iter_annotated_rows(
+            POSIXCompare.iter_compare_records(file1, x, linenox, y, linenoy, p_DiffOps))
+
+    def format_compare_records(self, p_Records, p_szOutputFormat="ANNOTATED", p_nContextLines=3,
+                               file1=None, file2=None):
+        # 将比对记录按照指定的格式输出
+        #   ANNOTATED   原有的格式，逐行输出工作文件的全部内容，以及参考文件中多出的行
+        #   UNIFIED     统一差异格式，只输出差异块以及前后p_nContextLines行相同的内容
+        if p_szOutputFormat is None or str(p_szOutputFormat).upper() == self.FORMAT_ANNOTATED:
+            return self.iter_annotated_rows(p_Records)
+        elif str(p_szOutputFormat).upper() == self.FORMAT_UNIFIED:
+            return self.iter_unified_rows(p_Records, file1, file2, p_nContextLines)
+        else:
+            raise DiffException('ERROR: unknown output format [%s]' % str(p_szOutputFormat))
+
+    @staticmethod
+    def iter_annotated_rows(p_Records):
+        # 原有的格式，相同、删除和被Skip掉的行输出工作文件的行号，增加的行输出参考文件的行号
+        for m_Record in p_Records:
+            if m_Record.op == '+':
+                yield "+{:>{}} ".format(m_Record.ref_lineno, 6) + m_Record.text
+            else:
+                yield m_Record.op + "{:>{}} ".format(m_Record.work_lineno, 6) + m_Record.text
+
+    def iter_unified_rows(self, p_Records, file1, file2, p_nContextLines=3):
+        # 统一差异格式，文件头之后是统计信息，随后是所有的差异块，没有差异时不输出任何内容
+        # 统计信息需要在全部比对完成后才能确定，所以差异块会先缓存，缓存的大小只和差异的多少相关
+        # 被Skip掉的行不参与比对，也不在差异块中输出，只在统计信息中计数
+        # 差异块中的行号必须是连续的，所以差异块在被Skip掉的行的位置会被拆分（参考__split_unified_hunk）
+        m_Counts = {'+': 0, '-': 0, 'S': 0}
+
+        def count_records():
+            for m_Record in p_Records:
+                if m_Record.op == 'S':
+                    m_Counts['S'] = m_Counts['S'] + 1
+                    continue
+                if m_Record.op != ' ':
+                    m_Counts[m_Record.op] = m_Counts[m_Record.op] + 1
+                yield m_Record
+
+        m_Parts = [m_Part
+                   for m_Hunk in self.iter_diff_hunks(count_records(), p_nContextLines)
+                   for m_Part in self.__split_unified_hunk(m_Hunk)]
+        if len(m_Parts) == 0:
+            return
+        m_Hunks = []
+        for (m_nPart, m_Part) in enumerate(m_Parts):
+            m_bAtEnd = False
+            if m_nPart == len(m_Parts) - 1 and m_Part[-1].op == ' ':
+                # 最后一个差异块之后的相同行不足的时候，需要确认是否已经到了工作文件的结尾
+                # 工作文件的总行数在产生比对记录的时候已经记录（m_WorkLineCount），不需要再次读取文件
+                m_bAtEnd = self.m_WorkLineCount == m_Part[-1].work_lineno
+            m_Hunks.append(self.__format_unified_hunk(self.__balance_unified_context(m_Part, m_bAtEnd)))
+        yield "--- " + str(file1)
+        yield "+++ " + str(file2)
+        yield "# " + str(len(m_Hunks)) + " hunks, " + str(m_Counts['-']) + " lines removed(-), " + \
+            str(m_Counts['+']) + " lines added(+), " + str(m_Counts['S']) + " lines skipped(S)"
+        for m_Hunk in m_Hunks:
+            for row in m_Hunk:
+                yield row
+
+    @staticmethod
+    def __split_unified_hunk(p_Hunk):
+        # 在工作文件或者参考文件行号不连续的地方（即被Skip掉或者被忽略的行）拆分差异块
+        # 这样每个差异块的@@行中的行数和差异块的内容一致，拆分后只包含相同的行的部分不再输出
+        m_Part = []
+        m_nNextWorkLineNo = None
+        m_nNextRefLineNo = None
+        for m_Record in p_Hunk:
+            if len(m_Part) != 0 and \
+                    ((m_Record.op != '+' and m_Record.work_lineno != m_nNextWorkLineNo) or
+                     (m_Record.op != '-' and m_Record.ref_lineno != m_nNextRefLineNo)):
+                if any(m_PartRecord.op != ' ' for m_PartRecord in m_Part):
+                    yield m_Part
+                m_Part = []
+            m_Part.append(m_Record)
+            # 对于-行，参考文件行号是之前最后一个参考文件的行号，+行的工作文件行号也是如此
+            m_nNextWorkLineNo = m_Record.work_lineno + 1
+            m_nNextRefLineNo = m_Record.ref_lineno + 1
+        if any(m_PartRecord.op != ' ' for m_PartRecord in m_Part):
+            yield m_Part
+
+    @staticmethod
+    def __balance_unified_context(p_Hunk, p_bAtEnd):
+        # patch认为前面相同的行比后面少的差异块位于文件的开头，后面相同的行比前面少的差异块位于文件的结尾
+        # 由于被拆分或者文件结尾有被Skip掉的行，前后相同的行数不一致又不在文件开头或者结尾的时候，前后保留相同的行数
+        m_nLeading = 0
+        while p_Hunk[m_nLeading].op == ' ':
+            m_nLeading = m_nLeading + 1
+        m_nTrailing = 0
+        while p_Hunk[len(p_Hunk) - 1 - m_nTrailing].op == ' ':
+            m_nTrailing = m_nTrailing + 1
+        if m_nLeading < m_nTrailing and p_Hunk[0].work_lineno <= 1:
+            return p_Hunk
+        if m_nTrailing < m_nLeading and p_bAtEnd:
+            return p_Hunk
+        m_nContext = min(m_nLeading, m_nTrailing)
+        return p_Hunk[m_nLeading - m_nContext:len(p_Hunk) - m_nTrailing + m_nContext]
+
+    @staticmethod
+    def __format_unified_hunk(p_Hunk):
+        # 生成一个差异块，第一行为@@ -工作文件起始行号,行数 +参考文件起始行号,行数 @@
+        # 一侧没有任何行的时候，起始行号为差异块之前的最后一行，和diff -u的规则相同
+        m_nWorkStart = None
+        m_nWorkCount = 0
+        m_nRefStart = None
+        m_nRefCount = 0
+        m_Rows = []
+        for m_Record in p_Hunk:
+            if m_Record.op != '+':
+                if m_nWorkStart is None:
+                    m_nWorkStart = m_Record.work_lineno
+                m_nWorkCount = m_nWorkCount + 1
+            if m_Record.op != '-':
+                if m_nRefStart is None:
+                    m_nRefStart = m_Record.ref_lineno
+                m_nRefCount = m_nRefCount + 1
+            m_Rows.append(m_Record.op + m_Record.text)
+        if m_nWorkStart is None:
+            m_nWorkStart = p_Hunk[0].work_lineno
+        if m_nRefStart is None:
+            m_nRefStart = p_Hunk[0].ref_lineno
+        m_Rows.insert(0, "@@ -" + str(m_nWorkStart) + "," + str(m_nWorkCount) +
+                      " +" + str(m_nRefStart) + "," + str(m_nRefCount) + " @@")
+        return m_Rows
+
+
+def run_diff_segments(p_Segments, p_compare_maskEnabled, p_compare_ignorecase, p_compare_engine, p_Deadline):
+    # 分段并行比对时在子进程中执行的任务，依次比对每一个段落，返回每个段落的编辑脚本
+    # p_Segments中的每一项为(x, y, idx, idy)，编辑脚本中的位置是相对于段落开头的
+    m_Comparer = POSIXCompare()
+    m_Comparer.m_Deadline = p_Deadline
+    return [m_Comparer.compare_ops(x, y, p_compare_maskEnabled, p_compare_ignorecase, p_compare_engine, idx, idy)[1]
+            for (x, y, idx, idy) in p_Segments]
+
+
+class CompareResultCache:
+    # 保存在磁盘上的比对结果缓存
+    # 缓存的键由工作文件和参考文件内容的哈希值，以及所有比对选项和比对引擎版本的指纹组成
+    # 比对成功的结果保存为<key>.suc，存在差异的结果保存为<key>.dif（即dif文件的内容）
+    # 缓存的总大小超过限制的时候，最久没有使用的结果会被删除
+    DEFAULT_MAXSIZE = 512 * 1024 * 1024
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, p_szCacheDir, p_nMaxSize=DEFAULT_MAXSIZE):
+        self.m_CacheDir = p_szCacheDir
+        self.m_nMaxSize = int(p_nMaxSize)
+
+    @staticmethod
+    def file_digest(p_szFileName):
+        # 计算文件内容的哈希值
+        m_Hash = hashlib.sha256()
+        with open(p_szFileName, mode='rb') as m_File:
+            while True:
+                m_Block = m_File.read(CompareResultCache.HASH_BLOCK_SIZE)
+                if not m_Block:
+                    break
+                m_Hash.update(m_Block)
+        return m_Hash.hexdigest()
+
+    def key(self, p_szWorkFile, p_szReferenceFile, p_Fingerprint):
+        m_Hash = hashlib.sha256()
+        m_Hash.update(self.file_digest(p_szWorkFile).encode('ascii'))
+        m_Hash.update(self.file_digest(p_szReferenceFile).encode('ascii'))
+        m_Hash.update(json.dumps(p_Fingerprint, ensure_ascii=True).encode('ascii'))
+        return m_Hash.hexdigest()
+
+    def get(self, p_szKey, p_szDifFile, p_szSucFile):
+        # 如果缓存中存在比对结果，则直接生成dif或者suc文件
+        # 返回比对结果，缓存中不存在时返回None
+        m_szCachedSuc = os.path.join(self.m_CacheDir, p_szKey + '.suc')
+        m_szCachedDif = os.path.join(self.m_CacheDir, p_szKey + '.dif')
+        try:
+            if os.path.isfile(m_szCachedSuc):
+                os.utime(m_szCachedSuc)
+                open(p_szSucFile, 'w').close()
+                return True
+            if os.path.isfile(m_szCachedDif):
+                os.utime(m_szCachedDif)
+                shutil.copyfile(m_szCachedDif, p_szDifFile)
+                return False
+        except OSError:
+            # 缓存文件可能刚刚被其他进程删除，按照没有缓存处理
+            pass
+        return None
+
+    def put(self, p_szKey, p_CompareResult, p_szDifFile):
+        # 将比对结果保存到缓存中，先写入临时文件再改名，保证多个进程同时写入时缓存文件是完整的
+        try:
+            os.makedirs(self.m_CacheDir, exist_ok=True)
+            if p_CompareResult:
+                m_szCachedFile = os.path.join(self.m_CacheDir, p_szKey + '.suc')
+            else:
+                m_szCachedFile = os.path.join(self.m_CacheDir, p_szKey + '.dif')
+            m_szTempFile = m_szCachedFile + '.' + str(os.getpid()) + '.tmp'
+            if p_CompareResult:
+                open(m_szTempFile, 'w').close()
+            else:
+                shutil.copyfile(p_szDifFile, m_szTempFile)
+            os.replace(m_szTempFile, m_szCachedFile)
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        # 按照最后使用的时间，删除超出容量的缓存文件
+        m_CachedFiles = []
+        m_nTotalSize = 0
+        try:
+            with os.scandir(self.m_CacheDir) as m_Entries:
+                for m_Entry in m_Entries:
+                    if not m_Entry.is_file() or not m_Entry.name.endswith(('.suc', '.dif')):
+                        continue
+                    m_Stat = m_Entry.stat()
+                    m_CachedFiles.append((m_Stat.st_mtime, m_Stat.st_size, m_Entry.path))
+                    m_nTotalSize = m_nTotalSize + m_Stat.st_size
+        except OSError:
+            return
+        if m_nTotalSize <= self.m_nMaxSize:
+            return
+        m_CachedFiles.sort()
+        for (_, m_nSize, m_szPath) in m_CachedFiles:
+            if m_nTotalSize <= self.m_nMaxSize:
+                break
+            try:
+                os.remove(m_szPath)
+            except OSError:
+                pass
+            m_nTotalSize = m_nTotalSize - m_nSize
+
+    def clear(self):
+        if not os.path.isdir(self.m_CacheDir):
+            return
+        with os.scandir(self.m_CacheDir) as m_Entries:
+            for m_Entry in m_Entries:
+                if m_Entry.is_file() and m_Entry.name.endswith(('.suc', '.dif', '.tmp')):
+                    try:
+                        os.remove(m_Entry.path)
+                    except OSError:
+                        pass
+
+
+class ReferenceArtifact:
+    # 参考文件预处理的结果，同一个参考文件在相同的选项下多次比对时，可以通过ReferenceArtifactCache直接读取
+    # m_Lines          去掉回车换行、首尾空格，过滤掉需要忽略的行之后的内容
+    # m_LineNos        每一行对应的原始行号
+    # m_Keys           所有不同的行规范化后的内容（忽略大小写时为大写），按照第一次出现的顺序排列
+    # m_KeyIndex       每一行在m_Keys中的位置，比对时直接作为参考文件的行ID使用
+    # m_PatternKeys    m_Keys中包含正则元字符的位置，启用正则比对时只有这些行需要执行正则匹配
+    # m_KeyIDs         m_Keys中每个内容到位置的字典，比对时用于映射工作文件的行ID，多个比对共用，不能修改
+    def __init__(self, p_Lines, p_LineNos, p_Keys, p_KeyIndex, p_PatternKeys, p_KeyIDs=None):
+        self.m_Lines = p_Lines
+        self.m_LineNos = p_LineNos
+        self.m_Keys = p_Keys
+        self.m_KeyIndex = p_KeyIndex
+        self.m_PatternKeys = p_PatternKeys
+        if p_KeyIDs is None:
+            p_KeyIDs = dict(zip(p_Keys, range(len(p_Keys))))
+        self.m_KeyIDs = p_KeyIDs
+
+    @staticmethod
+    def build(p_szFileName, skiplines=None, ignoreEmptyLine=False,
+              CompareIgnoreCase=False, CompareIgnoreTailOrHeadBlank=False, p_Deadline=None):
+        # 读取并预处理参考文件，处理的方法和compare_text_files相同
+        # 处理过程中定期检查比对的截止时间和取消标志，比对中止的时候不生成预处理结果
+        m_SkipFilter = SkipLineFilter(skiplines, ignoreEmptyLine)
+        with POSIXCompare.open_text_file(p_szFileName) as m_File:
+            (m_Lines, m_LineNos) = POSIXCompare.normalize_lines(POSIXCompare.iter_with_deadline(m_File, p_Deadline),
+                                                                m_SkipFilter, CompareIgnoreTailOrHeadBlank)
+        m_LineIDs = {}
+        m_KeyIndex = array('I', POSIXCompare.intern_lines(m_Lines, m_LineIDs, CompareIgnoreCase, p_Deadline))
+        # 字典按照插入的顺序遍历，第n个键的ID就是n
+        m_Keys = list(m_LineIDs)
+        m_PatternKeys = [m_nKey for (m_nKey, m_Key) in enumerate(m_Keys)
+                         if not LineMatchIndex.RegexMetaCharacters.isdisjoint(m_Key)]
+        return ReferenceArtifact(m_Lines, m_LineNos, m_Keys, m_KeyIndex, m_PatternKeys, m_LineIDs)
+
+    def pattern_ids(self):
+        # 返回所有是正则表达式的行ID，用于LineMatchIndex
+        return set(self.m_PatternKeys)
+
+    def memory_size(self):
+        # 估算预处理结果占用的内存（字节），用于限制进程内共享的预处理结果的总大小
+        # 不忽略大小写时m_Keys和m_Lines引用的是相同的字符串，这里重复计算，估算的结果偏大
+        return (sys.getsizeof(self.m_Lines) + sum(map(sys.getsizeof, self.m_Lines)) +
+                sys.getsizeof(self.m_Keys) + sum(map(sys.getsizeof, self.m_Keys)) +
+                sys.getsizeof(self.m_LineNos) + sys.getsizeof(self.m_KeyIndex) +
+                sys.getsizeof(self.m_PatternKeys) + sys.getsizeof(self.m_KeyIDs))
+
+
+class ReferenceArtifactPool:
+    # 内存中的参考文件预处理结果的LRU缓存，容量按照估算的内存大小限制，可以在多线程中使用
+    # 键为参考文件的全路径和预处理选项的指纹，参考文件的大小或者修改时间发生变化后，缓存的结果失效
+    DEFAULT_MAXMEMORY = 256 * 1024 * 1024
+
+    def __init__(self, p_nMaxMemory=DEFAULT_MAXMEMORY):
+        self.m_Lock = threading.Lock()
+        self.m_Artifacts = OrderedDict()
+        self.m_nMemory = 0
+        self.m_nMaxMemory = max(int(p_nMaxMemory), 0)
+        self.m_nHits = 0
+        self.m_nMisses = 0
+        self.m_nEvictions = 0
+
+    @staticmethod
+    def key(p_szReferenceFile, p_Fingerprint):
+        return os.path.abspath(p_szReferenceFile), json.dumps(p_Fingerprint, ensure_ascii=True)
+
+    def get(self, p_szReferenceFile, p_Fingerprint, p_ReferenceStat):
+        # 返回缓存的预处理结果，没有或者已经失效时返回None
+        m_Key = self.key(p_szReferenceFile, p_Fingerprint)
+        with self.m_Lock:
+            m_Entry = self.m_Artifacts.get(m_Key)
+            if m_Entry is not None and \
+                    (m_Entry[0] != p_ReferenceStat.st_size or m_Entry[1] != p_ReferenceStat.st_mtime_ns):
+                # 参考文件已经发生了变化
+                del self.m_Artifacts[m_Key]
+                self.m_nMemory = self.m_nMemory - m_Entry[3]
+                m_Entry = None
+            if m_Entry is None:
+                self.m_nMisses = self.m_nMisses + 1
+                return None
+            self.m_Artifacts.move_to_end(m_Key)
+            self.m_nHits = self.m_nHits + 1
+            return m_Entry[2]
+
+    def put(self, p_szReferenceFile, p_Fingerprint, p_ReferenceStat, p_Artifact):
+        # 保存预处理结果，超过容量的预处理结果不会被缓存
+        m_nSize = p_Artifact.memory_size()
+        if m_nSize > self.m_nMaxMemory:
+            return
+        m_Key = self.key(p_szReferenceFile, p_Fingerprint)
+        with self.m_Lock:
+            m_Entry = self.m_Artifacts.pop(m_Key, None)
+            if m_Entry is not None:
+                self.m_nMemory = self.m_nMemory - m_Entry[3]
+            self.m_Artifacts[m_Key] = (p_ReferenceStat.st_size, p_ReferenceStat.st_mtime_ns, p_Artifact, m_nSize)
+            self.m_nMemory = self.m_nMemory + m_nSize
+            self.__evict()
+
+    def __evict(self):
+        # 调用者需要持有锁
+        while self.m_nMemory > self.m_nMaxMemory and self.m_Artifacts:
+            (_, m_Entry) = self.m_Artifacts.popitem(last=False)
+            self.m_nMemory = self.m_nMemory - m_Entry[3]
+            self.m_nEvictions = self.m_nEvictions + 1
+
+    def resize(self, p_nMaxMemory):
+        with self.m_Lock:
+            self.m_nMaxMemory = max(int(p_nMaxMemory), 0)
+            self.__evict()
+
+    def clear(self):
+        with self.m_Lock:
+            self.m_Artifacts.clear()
+            self.m_nMemory = 0
+            self.m_nHits = 0
+            self.m_nMisses = 0
+            self.m_nEvictions = 0
+
+    def __len__(self):
+        return len(self.m_Artifacts)
+
+    def stats(self):
+        with self.m_Lock:
+            return {
+                "size": len(self.m_Artifacts),
+                "memory": self.m_nMemory,
+                "maxmemory": self.m_nMaxMemory,
+                "hits": self.m_nHits,
+                "misses": self.m_nMisses,
+                "evictions": self.m_nEvictions,
+            }
+
+
+class ReferenceArtifactCache:
+    # 参考文件预处理结果（参考ReferenceArtifact）的磁盘缓存
+    # 没有指定缓存目录的时候，缓存文件保存在参考文件所在目录下的SIDECAR_DIRECTORY中，随参考文件一起复制
+    # 缓存文件名由参考文件名和预处理选项的指纹组成，文件中记录了参考文件的大小和修改时间，参考文件变化后自动重建
+    # 缓存文件用marshal格式保存，只包含基本的数据类型，读取的时候不会执行任何代码
+    # 缓存目录无法写入（例如只读的T_LOG）的时候，只是不保存预处理结果，不影响比对
+    SIDECAR_DIRECTORY = ".compare_reference"
+    # 缓存文件的格式发生变化时需要修改，用来使之前保存的预处理结果失效
+    ARTIFACT_VERSION = 1
+
+    def __init__(self, p_szCacheDir=None, p_bDiskCache=True):
+        self.m_CacheDir = p_szCacheDir
+        # 为False时不读写磁盘上的缓存文件，预处理结果只保存在进程内（参考CompareEngineRegistry）
+        self.m_bDiskCache = p_bDiskCache
+
+    @staticmethod
+    def fingerprint(skiplines=None, ignoreEmptyLine=False,
+                    CompareIgnoreCase=False, CompareIgnoreTailOrHeadBlank=False):
+        # 所有影响参考文件预处理结果的选项
+        # 是否启用正则比对不影响预处理的结果，正则表达式的分类总是被保存
+        return [
+            ReferenceArtifactCache.ARTIFACT_VERSION,
+            POSIXCompare.ENGINE_VERSION,
+            sys.byteorder,
+            array('I').itemsize,
+            list(skiplines) if skiplines is not None else None,
+            bool(ignoreEmptyLine),
+            bool(CompareIgnoreCase),
+            bool(CompareIgnoreTailOrHeadBlank),
+        ]
+
+    def artifact_file(self, p_szReferenceFile, p_Fingerprint):
+        # 返回保存预处理结果的缓存文件名
+        # 使用单独的缓存目录时，不同目录下的同名参考文件通过全路径区分
+        m_Hash = hashlib.sha256()
+        m_Hash.update(json.dumps(p_Fingerprint, ensure_ascii=True).encode('ascii'))
+        if self.m_CacheDir is None:
+            m_szCacheDir = os.path.join(os.path.dirname(os.path.abspath(p_szReferenceFile)), self.SIDECAR_DIRECTORY)
+        else:
+            m_szCacheDir = self.m_CacheDir
+            m_Hash.update(os.path.abspath(p_szReferenceFile).encode('utf-8', 'surrogateescape'))
+        return os.path.join(m_szCacheDir,
+                            os.path.basename(p_szReferenceFile) + '.' + m_Hash.hexdigest()[:16] + '.artifact')
+
+    def load(self, p_szArtifactFile, p_ReferenceStat):
+        # 读取缓存的预处理结果，缓存不存在、已经损坏或者参考文件已经变化的时候返回None
+        try:
+            # marshal.load直接从文件中读取时每次只读取很少的字节，一次读入整个文件再解析要快得多
+            with open(p_szArtifactFile, mode='rb') as m_File:
+                m_Content = marshal.loads(m_File.read())
+            (m_nVersion, m_nSize, m_nMTime, m_Lines, m_LineNos, m_Keys, m_KeyIndex, m_PatternKeys) = m_Content
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if m_nVersion != self.ARTIFACT_VERSION or \
+                m_nSize != p_ReferenceStat.st_size or m_nMTime != p_ReferenceStat.st_mtime_ns:
+            return None
+        m_LineNoArray = array('I')
+        m_LineNoArray.frombytes(m_LineNos)
+        m_KeyIndexArray = array('I')
+        m_KeyIndexArray.frombytes(m_KeyIndex)
+        return ReferenceArtifact(m_Lines, m_LineNoArray, m_Keys, m_KeyIndexArray, m_PatternKeys)
+
+    def store(self, p_szArtifactFile, p_ReferenceStat, p_Artifact):
+        # 保存预处理结果，先写入临时文件再改名，保证多个进程同时写入时缓存文件是完整的
+        m_Content = (self.ARTIFACT_VERSION, p_ReferenceStat.st_size, p_ReferenceStat.st_mtime_ns,
+                     p_Artifact.m_Lines, p_Artifact.m_LineNos.tobytes(),
+                     p_Artifact.m_Keys, p_Artifact.m_KeyIndex.tobytes(), p_Artifact.m_PatternKeys)
+        m_szTempFile = p_szArtifactFile + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(p_szArtifactFile), exist_ok=True)
+            with open(m_szTempFile, mode='wb') as m_File:
+                marshal.dump(m_Content, m_File)
+            os.replace(m_szTempFile, p_szArtifactFile)
+        except OSError:
+            try:
+                os.remove(m_szTempFile)
+            except OSError:
+                pass
+
+    def get(self, p_szReferenceFile, skiplines=None, ignoreEmptyLine=False,
+            CompareIgnoreCase=False, CompareIgnoreTailOrHeadBlank=False, p_Stats=None, p_Deadline=None):
+        # 返回参考文件的预处理结果，缓存中没有或者已经失效的时候重新处理参考文件并保存
+        # 参考文件的状态在读取之前获取，读取过程中文件发生了变化，下一次比对时缓存会失效
+        if not self.m_bDiskCache:
+            return ReferenceArtifact.build(p_szReferenceFile, skiplines, ignoreEmptyLine,
+                                           CompareIgnoreCase, CompareIgnoreTailOrHeadBlank, p_Deadline)
+        m_ReferenceStat = os.stat(p_szReferenceFile)
+        m_szArtifactFile = self.artifact_file(
+            p_szReferenceFile,
+            self.fingerprint(skiplines, ignoreEmptyLine, CompareIgnoreCase, CompareIgnoreTailOrHeadBlank))
+        m_Artifact = self.load(m_szArtifactFile, m_ReferenceStat)
+        if m_Artifact is not None:
+            if p_Stats is not None:
+                p_Stats.add_count("reference_cache_hits")
+            return m_Artifact
+        if p_Stats is not None:
+            p_Stats.add_count("reference_cache_misses")
+        m_Artifact = ReferenceArtifact.build(p_szReferenceFile, skiplines, ignoreEmptyLine,
+                                             CompareIgnoreCase, CompareIgnoreTailOrHeadBlank, p_Deadline)
+        self.store(m_szArtifactFile, m_ReferenceStat, m_Artifact)
+        return m_Artifact
+
+    def clear(self, p_szReferenceDir=None):
+        # 删除缓存的预处理结果
+        # 使用参考文件旁边的缓存目录时，需要指定参考文件所在的目录
+        if self.m_CacheDir is None:
+            if p_szReferenceDir is None:
+                return
+            m_szCacheDir = os.path.join(p_szReferenceDir, self.SIDECAR_DIRECTORY)
+        else:
+            m_szCacheDir = self.m_CacheDir
+        if not os.path.isdir(m_szCacheDir):
+            return
+        with os.scandir(m_szCacheDir) as m_Entries:
+            for m_Entry in m_Entries:
+                if m_Entry.is_file() and m_Entry.name.endswith(('.artifact', '.tmp')):
+                    try:
+                        os.remove(m_Entry.path)
+                    except OSError:
+                        pass
+
+
+class ReferenceDirectoryIndex:
+    # 参考文件目录（T_LOG）的索引，在进程内共享
+    # 每个目录第一次被使用时，通过一次scandir读取目录下所有的文件名，之后查找参考文件时不再访问文件系统
+    # 目录的修改时间发生变化时，索引会被重建，同时清空已经缓存的查找结果
+    # 为了避免每次查找都访问文件系统，目录的修改时间最多每REVALIDATE_INTERVAL秒检查一次
+    # 目录索引有可能比文件系统晚REVALIDATE_INTERVAL秒，所以只缓存找到的结果，找不到时总是再检查一次文件系统
+    REVALIDATE_INTERVAL = 1.0
+
+    # 缓存的查找结果以及目录索引的最大数量（LRU）
+    DEFAULT_MAXRESOLVED = 4096
+    DEFAULT_MAXDIRECTORIES = 256
+
+    def __init__(self, p_nMaxResolved=DEFAULT_MAXRESOLVED, p_nMaxDirectories=DEFAULT_MAXDIRECTORIES):
+        self.m_Lock = threading.Lock()
+        self.m_Directories = OrderedDict()
+        self.m_ResolvedPaths = OrderedDict()
+        self.m_nMaxResolved = max(int(p_nMaxResolved), 1)
+        self.m_nMaxDirectories = max(int(p_nMaxDirectories), 1)
+        self.m_nHits = 0
+        self.m_nMisses = 0
+        self.m_nEvictions = 0
+
+    def __directory_files(self, p_szDirectory):
+        # 返回目录下所有文件名的集合，目录不存在时返回None
+        # 调用者需要持有锁
+        m_szDirectory = os.path.abspath(p_szDirectory)
+        m_Now = time.monotonic()
+        m_Entry = self.m_Directories.get(m_szDirectory)
+        if m_Entry is not None:
+            self.m_Directories.move_to_end(m_szDirectory)
+        if m_Entry is not None and m_Now - m_Entry[1] < self.REVALIDATE_INTERVAL:
+            return m_Entry[2]
+        try:
+            m_MTime = os.stat(m_szDirectory).st_mtime_ns
+        except OSError:
+            m_MTime = None
+        if m_Entry is not None and m_Entry[0] == m_MTime:
+            m_Entry[1] = m_Now
+            return m_Entry[2]
+
+        # 目录第一次被使用，或者目录已经发生了变化，重新建立索引
+        m_FileNames = None
+        if m_MTime is not None:
+            m_FileNames = set()
+            try:
+                with os.scandir(m_szDirectory) as m_DirEntries:
+                    for m_DirEntry in m_DirEntries:
+                        if m_DirEntry.is_file():
+                            m_FileNames.add(m_DirEntry.name)
+            except OSError:
+                m_FileNames = None
+        self.m_Directories[m_szDirectory] = [m_MTime, m_Now, m_FileNames]
+        if m_Entry is not None:
+            self.m_ResolvedPaths.clear()
+        self.__evict()
+        return m_FileNames
+
+    def resolve(self, p_Directories, p_szFileName):
+        # 在目录列表中按顺序查找文件，返回第一个找到的文件全路径，找不到时返回None
+        # 同一个目录下文件不存在的时候，查找同名的压缩文件（参考POSIXCompare.find_text_file）
+        if os.path.isabs(p_szFileName) or os.path.dirname(p_szFileName) != '':
+            # 包含路径的文件名无法通过目录索引查找
+            for m_szDirectory in p_Directories:
+                m_szFileName = POSIXCompare.find_text_file(os.path.join(m_szDirectory, p_szFileName))
+                if m_szFileName is not None:
+                    return m_szFileName
+            return None
+
+        m_Key = (tuple(p_Directories), os.getcwd(), p_szFileName)
+        m_Candidates = [p_szFileName] + [p_szFileName + m_szExtension
+                                         for m_szExtension in POSIXCompare.COMPRESSION_EXTENSIONS]
+        with self.m_Lock:
+            m_DirectoryFiles = [self.__directory_files(m_szDirectory) for m_szDirectory in p_Directories]
+            m_szResolvedPath = self.m_ResolvedPaths.get(m_Key)
+            if m_szResolvedPath is not None:
+                self.m_ResolvedPaths.move_to_end(m_Key)
+                self.m_nHits = self.m_nHits + 1
+                return m_szResolvedPath
+            self.m_nMisses = self.m_nMisses + 1
+            for (m_szDirectory, m_FileNames) in zip(p_Directories, m_DirectoryFiles):
+                if m_FileNames is None:
+                    continue
+                for m_szCandidate in m_Candidates:
+                    if m_szCandidate in m_FileNames:
+                        m_szResolvedPath = os.path.join(m_szDirectory, m_szCandidate)
+                        break
+                if m_szResolvedPath is not None:
+                    break
+            if m_szResolvedPath is not None:
+                self.m_ResolvedPaths[m_Key] = m_szResolvedPath
+                self.__evict()
+                return m_szResolvedPath
+
+        # 索引中没有找到，可能是索引还没有发现刚刚生成的文件，直接检查文件系统
+        # 找不到的结果不缓存，发现了新文件的目录在下一次查找时重建索引
+        for m_szDirectory in p_Directories:
+            for m_szCandidate in m_Candidates:
+                m_szFileName = os.path.join(m_szDirectory, m_szCandidate)
+                if os.path.isfile(m_szFileName):
+                    with self.m_Lock:
+                        m_Entry = self.m_Directories.get(os.path.abspath(m_szDirectory))
+                        if m_Entry is not None:
+                            m_Entry[1] = float("-inf")
+                    return m_szFileName
+        return None
+
+    def __evict(self):
+        # 调用者需要持有锁
+        # 被清除的目录索引下次使用时重新建立，无法判断目录在这期间是否发生过变化，所以同时清空查找结果
+        while len(self.m_ResolvedPaths) > self.m_nMaxResolved:
+            self.m_ResolvedPaths.popitem(last=False)
+            self.m_nEvictions = self.m_nEvictions + 1
+        while len(self.m_Directories) > self.m_nMaxDirectories:
+            self.m_Directories.popitem(last=False)
+            self.m_nEvictions = self.m_nEvictions + 1
+            self.m_ResolvedPaths.clear()
+
+    def clear(self):
+        with self.m_Lock:
+            self.m_Directories.clear()
+            self.m_ResolvedPaths.clear()
+            self.m_nHits = 0
+            self.m_nMisses = 0
+            self.m_nEvictions = 0
+
+    def stats(self):
+        with self.m_Lock:
+            return {
+                "directories": len(self.m_Directories),
+                "maxdirectories": self.m_nMaxDirectories,
+                "size": len(self.m_ResolvedPaths),
+                "maxsize": self.m_nMaxResolved,
+                "hits": self.m_nHits,
+                "misses": self.m_nMisses,
+                "evictions": self.m_nEvictions,
+            }
+
+
+class CompareEngineRegistry:
+    # 进程内共享的比对引擎状态，所有的关键字库实例（每个Suite一个）以及所有的线程共用
+    # 包括参考文件目录的索引、解析后的T_LOG目录列表、参考文件的预处理结果（按照内存大小限制容量）
+    # 编译后的正则表达式保存在POSIXCompare.CompiledRegexPattern中，同样是整个进程共享的
+    # 比对选项（例如忽略行）不在这里保存，由每个关键字库实例各自维护
+    # 所有的缓存都有容量限制，超过容量后最久没有使用的内容被清除
+    DEFAULT_MAXREFERENCEDIRS = 256
+
+    def __init__(self, p_nMaxArtifactMemory=ReferenceArtifactPool.DEFAULT_MAXMEMORY,
+                 p_nMaxReferenceDirs=DEFAULT_MAXREFERENCEDIRS):
+        self.m_Lock = threading.Lock()
+        self.m_ReferenceIndex = ReferenceDirectoryIndex()
+        self.m_ReferenceArtifacts = ReferenceArtifactPool(p_nMaxArtifactMemory)
+        self.m_ReferenceDirectories = OrderedDict()
+        self.m_nMaxReferenceDirs = max(int(p_nMaxReferenceDirs), 1)
+
+    def reference_directories(self, p_szReferenceDirs):
+        # 解析T_LOG的内容，返回参考文件目录的列表，没有定义T_LOG时返回None
+        # 目录之间用逗号分隔，包含逗号的目录可以用单引号括起来，解析的结果按照T_LOG的内容缓存
+        if p_szReferenceDirs is None:
+            return None
+        with self.m_Lock:
+            m_Directories = self.m_ReferenceDirectories.get(p_szReferenceDirs)
+            if m_Directories is not None:
+                self.m_ReferenceDirectories.move_to_end(p_szReferenceDirs)
+        if m_Directories is None:
+            m_T_LOG_environs = shlex.shlex(p_szReferenceDirs)
+            m_T_LOG_environs.whitespace = ','
+            m_T_LOG_environs.quotes = "'"
+            m_T_LOG_environs.whitespace_split = True
+            m_Directories = list(m_T_LOG_environs)
+            with self.m_Lock:
+                self.m_ReferenceDirectories[p_szReferenceDirs] = m_Directories
+                while len(self.m_ReferenceDirectories) > self.m_nMaxReferenceDirs:
+                    self.m_ReferenceDirectories.popitem(last=False)
+        return m_Directories
+
+    def resolve_reference(self, p_szReferenceFile, p_Directories=None):
+        # 在参考文件目录中查找参考文件，找不到的时候按照文件名本身（或者同名的压缩文件）查找
+        # 返回参考文件的路径，都不存在时返回None
+        m_szReferenceFile = None
+        if p_Directories is not None:
+            m_szReferenceFile = self.m_ReferenceIndex.resolve(p_Directories, p_szReferenceFile)
+        if m_szReferenceFile is None:
+            m_szReferenceFile = POSIXCompare.find_text_file(p_szReferenceFile)
+        return m_szReferenceFile
+
+    def reference_artifact(self, p_szReferenceFile, p_ReferenceCache=None,
+                           skiplines=None, ignoreEmptyLine=False,
+                           CompareIgnoreCase=False, CompareIgnoreTailOrHeadBlank=False, p_Stats=None,
+                           p_Deadline=None):
+        # 返回参考文件的预处理结果，优先使用进程内共享的结果
+        # p_ReferenceCache为None时只查找进程内已经有的结果（例如预热过的参考文件），找不到时返回None
+        # 否则通过p_ReferenceCache读取或者生成预处理结果，并保存在进程内
+        # 生成预处理结果的时候检查p_Deadline，比对超时或者被取消的时候抛出CompareAborted
+        if p_ReferenceCache is None and len(self.m_ReferenceArtifacts) == 0:
+            return None
+        m_ReferenceStat = os.stat(p_szReferenceFile)
+        m_Fingerprint = ReferenceArtifactCache.fingerprint(skiplines, ignoreEmptyLine,
+                                                          CompareIgnoreCase, CompareIgnoreTailOrHeadBlank)
+        m_Artifact = self.m_ReferenceArtifacts.get(p_szReferenceFile, m_Fingerprint, m_ReferenceStat)
+        if m_Artifact is not None:
+            if p_Stats is not None:
+                p_Stats.add_count("reference_memory_hits")
+            return m_Artifact
+        if p_ReferenceCache is None:
+            return None
+        m_Artifact = p_ReferenceCache.get(p_szReferenceFile, skiplines, ignoreEmptyLine,
+                                          CompareIgnoreCase, CompareIgnoreTailOrHeadBlank, p_Stats, p_Deadline)
+        self.m_ReferenceArtifacts.put(p_szReferenceFile, m_Fingerprint, m_ReferenceStat, m_Artifact)
+        return m_Artifact
+
+    def warm_reference(self, p_szReferenceFile, p_ReferenceCache=None,
+                       skiplines=None, ignoreEmptyLine=False, CompareWithMask=False,
+                       CompareIgnoreCase=False, CompareIgnoreTailOrHeadBlank=False):
+        # 预先处理参考文件，并保存在进程内，之后相同选项下的比对直接使用预处理的结果
+        # 启用正则比对的时候，同时编译参考文件中所有的正则表达式
+        if p_ReferenceCache is None:
+            p_ReferenceCache = ReferenceArtifactCache(p_bDiskCache=False)
+        m_Artifact = self.reference_artifact(p_szReferenceFile, p_ReferenceCache, skiplines, ignoreEmptyLine,
+                                             CompareIgnoreCase, CompareIgnoreTailOrHeadBlank)
+        if CompareWithMask and m_Artifact.m_PatternKeys:
+            m_PatternKeys = set(m_Artifact.m_PatternKeys)
+            m_Patterns = set()
+            for (m_Line, m_nKey) in zip(m_Artifact.m_Lines, m_Artifact.m_KeyIndex):
+                if m_nKey in m_PatternKeys and m_Line not in m_Patterns:
+                    m_Patterns.add(m_Line)
+                    POSIXCompare.CompiledRegexPattern.get(m_Line, CompareIgnoreCase)
+        return m_Artifact
+
+    def clear(self):
+        # 清空进程内共享的所有缓存
+        self.m_ReferenceIndex.clear()
+        self.m_ReferenceArtifacts.clear()
+        POSIXCompare.CompiledRegexPattern.clear()
+        with self.m_Lock:
+            self.m_ReferenceDirectories.clear()
+
+    def stats(self):
+        with self.m_Lock:
+            m_ReferenceDirectories = {
+                "size": len(self.m_ReferenceDirectories),
+                "maxsize": self.m_nMaxReferenceDirs,
+            }
+        return {
+            "reference_artifacts": self.m_ReferenceArtifacts.stats(),
+            "regex_patterns": POSIXCompare.CompiledRegexPattern.stats(),
+            "reference_directories": m_ReferenceDirectories,
+            "reference_index": self.m_ReferenceIndex.stats(),
+        }
+
+
+# 整个进程共享的比对引擎状态
+SharedRegistry = CompareEngineRegistry()
+
+
+class CompareJob:
+    # 一次文件比对所需要的全部信息，可以被传递到子进程中执行
+    # 比对超时的时候，在dif文件的最后一行添加的标记
+    ABORTED_MARKER = "*** %s, the compare result is incomplete ***"
+
+    def __init__(self, p_szWorkFile, p_szReferenceFile, p_szDifFile, p_szSucFile,
+                 skiplines=None,
+                 ignoreEmptyLine=False,
+                 CompareWithMask=False,
+                 CompareIgnoreCase=False,
+                 CompareIgnoreTailOrHeadBlank=False,
+                 CompareEngine="MYERS",
+                 CompareStreaming=False,
+                 ResultCacheDir=None,
+                 ResultCacheSize=CompareResultCache.DEFAULT_MAXSIZE,
+                 DiffFormat="ANNOTATED",
+                 DiffContextLines=3,
+                 CollectStats=False,
+                 TraceMemory=False,
+                 Timeout=None,
+                 MaxDifferences=None,
+                 ParallelWorkers=None,
+                 CompareUnordered=False,
+                 ReferenceCache=False,
+                 ReferenceCacheDir=None):
+        self.m_WorkFileName = p_szWorkFile
+        self.m_ReferenceFileName = p_szReferenceFile
+        self.m_DifFileName = p_szDifFile
+        self.m_SucFileName = p_szSucFile
+        self.m_SkipLines = skiplines
+        self.m_IgnoreEmptyLine = ignoreEmptyLine
+        self.m_CompareWithMask = CompareWithMask
+        self.m_CompareIgnoreCase = CompareIgnoreCase
+        self.m_CompareIgnoreTailOrHeadBlank = CompareIgnoreTailOrHeadBlank
+        self.m_CompareEngine = CompareEngine
+        self.m_CompareStreaming = CompareStreaming
+        self.m_ResultCacheDir = ResultCacheDir
+        self.m_ResultCacheSize = ResultCacheSize
+        self.m_DiffFormat = DiffFormat
+        self.m_DiffContextLines = DiffContextLines
+        self.m_TraceMemory = TraceMemory
+        # 比对的超时时间（秒），None表示不限制，比对开始时根据超时时间生成截止时间
+        # 也可以在比对之前直接设置m_Deadline，用来从其他线程中取消比对
+        self.m_Timeout = Timeout
+        self.m_Deadline = None
+        # 最多查找的差异行数，None表示不限制，0表示只判断是否相同，参考POSIXCompare.m_MaxDifferences
+        self.m_MaxDifferences = MaxDifferences
+        # 分段并行比对使用的进程数，None表示不启用，参考POSIXCompare.parallel_diff
+        self.m_ParallelWorkers = ParallelWorkers
+        # 是否不考虑行的顺序进行比对，参考POSIXCompare.compare_text_files_unordered
+        self.m_CompareUnordered = CompareUnordered
+        # 是否缓存参考文件的预处理结果，参考ReferenceArtifactCache
+        # 为MEMORY时只保存在进程内，否则同时保存在磁盘上，ReferenceCacheDir为None时保存在参考文件所在目录下
+        self.m_ReferenceCache = ReferenceCache
+        self.m_ReferenceCacheDir = ReferenceCacheDir
+        # 比对被中止的原因，参考CompareAborted，比对正常完成时为None
+        self.m_Aborted = None
+        # 比对的统计信息，只有在CollectStats为True的时候才会统计
+        self.m_Stats = None
+        if CollectStats:
+            self.m_Stats = CompareStats()
+            self.m_Stats.m_nCompares = 1
+
+    def fingerprint(self):
+        # 所有影响比对结果的选项，用来作为结果缓存的键的一部分
+        # UNIFIED格式的dif文件头中包含两个文件的文件名，文件名不同时不能共用缓存的结果
+        if str(self.m_DiffFormat).upper() == "UNIFIED":
+            m_FileNames = [str(self.m_WorkFileName), str(self.m_ReferenceFileName)]
+        else:
+            m_FileNames = None
+        return [
+            POSIXCompare.ENGINE_VERSION,
+            list(self.m_SkipLines) if self.m_SkipLines is not None else None,
+            bool(self.m_IgnoreEmptyLine),
+            bool(self.m_CompareWithMask),
+            bool(self.m_CompareIgnoreCase),
+            bool(self.m_CompareIgnoreTailOrHeadBlank),
+            str(self.m_CompareEngine).upper(),
+            bool(self.m_CompareStreaming),
+            str(self.m_DiffFormat).upper(),
+            int(self.m_DiffContextLines),
+            self.m_ParallelWorkers is not None and int(self.m_ParallelWorkers) > 1,
+            bool(self.m_CompareUnordered),
+            int(self.m_MaxDifferences) if self.m_MaxDifferences is not None else None,
+            m_FileNames,
+        ]
+
+    def run(self):
+        # 执行比对，并生成dif或者suc文件
+        # 返回(比对结果, 错误信息)，如果启用了统计，统计信息记录在m_Stats中
+        # 比对超时的时候，返回(False, None)，dif文件中是不完整的比对结果，m_Aborted为TIMEOUT
+        # 比对被取消的时候，返回(False, 错误信息)，不生成dif文件，m_Aborted为CANCELLED
+        # 差异超过了最多查找的差异行数的时候，返回(False, None)，dif文件中只有开头的部分，m_Aborted为TRUNCATED
+        self.m_Aborted = None
+        if self.m_Deadline is None and self.m_Timeout is not None:
+            self.m_Deadline = CompareDeadline(self.m_Timeout)
+        if self.m_Stats is None:
+            return self.__run_with_cache()
+
+        # tracemalloc只在统计的时候才需要，不在模块中导入，以减少比对引擎的导入时间
+        import tracemalloc
+        m_RegexStats = POSIXCompare.CompiledRegexPattern.stats()
+        m_bTraceMemory = self.m_TraceMemory and not tracemalloc.is_tracing()
+        if m_bTraceMemory:
+            tracemalloc.start()
+        try:
+            return self.__run_with_cache()
+        finally:
+            m_nPeakMemory = None
+            if m_bTraceMemory:
+                m_nPeakMemory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.m_Stats.record_memory(m_nPeakMemory)
+            # 正则表达式缓存的统计是整个进程共享的，这里记录的是比对前后的差值
+            # 记录的是缓存的查找次数，LineMatchIndex缓存了匹配结果，所以不等于实际执行正则匹配的次数
+            m_RegexStatsAfter = POSIXCompare.CompiledRegexPattern.stats()
+            self.m_Stats.add_count("regex_compiles", max(m_RegexStatsAfter["misses"] - m_RegexStats["misses"], 0))
+            self.m_Stats.add_count("regex_cache_lookups",
+                                   max(m_RegexStatsAfter["hits"] + m_RegexStatsAfter["misses"] -
+                                       m_RegexStats["hits"] - m_RegexStats["misses"], 0))
+
+    def __run_with_cache(self):
+        m_ResultCache = None
+        m_szCacheKey = None
+        if self.m_ResultCacheDir is not None:
+            m_ResultCache = CompareResultCache(self.m_ResultCacheDir, self.m_ResultCacheSize)
+            try:
+                m_szCacheKey = m_ResultCache.key(self.m_WorkFileName, self.m_ReferenceFileName, self.fingerprint())
+            except OSError:
+                m_ResultCache = None
+        if m_ResultCache is not None:
+            with CompareStats.phase(self.m_Stats, "cache_lookup"):
+                m_CompareResult = m_ResultCache.get(m_szCacheKey, self.m_DifFileName, self.m_SucFileName)
+            if m_CompareResult is not None:
+                if self.m_Stats is not None:
+                    self.m_Stats.add_count("cache_hits")
+                return m_CompareResult, None
+
+        (m_CompareResult, m_ErrorMessage) = self.__run_compare()
+        if m_ResultCache is not None and m_ErrorMessage is None and self.m_Aborted is None:
+            with CompareStats.phase(self.m_Stats, "cache_store"):
+                m_ResultCache.put(m_szCacheKey, m_CompareResult, self.m_DifFileName)
+        return m_CompareResult, m_ErrorMessage
+
+    def __run_compare(self):
+        m_Comparer = POSIXCompare()
+        m_Comparer.m_Stats = self.m_Stats
+        m_Comparer.m_Deadline = self.m_Deadline
+        m_Comparer.m_MaxDifferences = self.m_MaxDifferences
+        m_Comparer.m_ParallelWorkers = self.m_ParallelWorkers
+        if self.m_ReferenceCache:
+            m_Comparer.m_ReferenceCache = ReferenceArtifactCache(self.m_ReferenceCacheDir,
+                                                                 str(self.m_ReferenceCache).upper() != "MEMORY")
+        m_CompareResultFile = None
+        try:
+            if self.m_Deadline is not None:
+                self.m_Deadline.check()
+            if self.m_CompareStreaming and not self.m_CompareUnordered:
+                # 流式比对的结果直接写入dif文件，比对完成后如果没有差异，再删除dif文件
+                m_CompareResult = True
+                m_CompareResultFile = open(self.m_DifFileName, 'w', encoding="utf-8")
+                try:
+                    with CompareStats.phase(self.m_Stats, "streaming"):
+                        for line in m_Comparer.compare_text_files_streaming(
+                                self.m_WorkFileName, self.m_ReferenceFileName,
+                                self.m_SkipLines,
+                                self.m_IgnoreEmptyLine,
+                                self.m_CompareWithMask,
+                                self.m_CompareIgnoreCase,
+                                self.m_CompareIgnoreTailOrHeadBlank,
+                                OutputFormat=self.m_DiffFormat,
+                                ContextLines=self.m_DiffContextLines):
+                            if line[0] in ('+', '-'):
+                                m_CompareResult = False
+                            print(line, file=m_CompareResultFile)
+                        if m_Comparer.m_Truncated:
+                            m_CompareResult = False
+                            self.__truncate_compare(m_CompareResultFile)
+                except CompareAborted:
+                    raise
+                except DiffException:
+                    m_CompareResultFile.close()
+                    if m_CompareResult:
+                        os.remove(self.m_DifFileName)
+                    raise
+                m_CompareResultFile.close()
+                if m_CompareResult:
+                    os.remove(self.m_DifFileName)
+            else:
+                if self.m_CompareUnordered:
+                    # 不考虑行的顺序的比对，不区分比对算法和dif文件的格式，也不需要流式比对
+                    (m_CompareResult, m_CompareResultList) = m_Comparer.compare_text_files_unordered(
+                        self.m_WorkFileName, self.m_ReferenceFileName,
+                        self.m_SkipLines,
+                        self.m_IgnoreEmptyLine,
+                        self.m_CompareWithMask,
+                        self.m_CompareIgnoreCase,
+                        self.m_CompareIgnoreTailOrHeadBlank)
+                else:
+                    (m_CompareResult, m_CompareResultList) = m_Comparer.compare_text_files(
+                        self.m_WorkFileName, self.m_ReferenceFileName,
+                        self.m_SkipLines,
+                        self.m_IgnoreEmptyLine,
+                        self.m_CompareWithMask,
+                        self.m_CompareIgnoreCase,
+                        self.m_CompareIgnoreTailOrHeadBlank,
+                        self.m_CompareEngine,
+                        self.m_DiffFormat,
+                        self.m_DiffContextLines)
+                if not m_CompareResult:
+                    # 比对结果是一个生成器，逐行写入dif文件，不在内存中保留
+                    with CompareStats.phase(self.m_Stats, "write"):
+                        m_CompareResultFile = open(self.m_DifFileName, 'w', encoding="utf-8")
+                        m_nUncheckedLines = 0
+                        for line in m_CompareResultList:
+                            print(line, file=m_CompareResultFile)
+                            if self.m_Deadline is not None:
+                                m_nUncheckedLines = m_nUncheckedLines + 1
+                                if m_nUncheckedLines >= POSIXCompare.DEADLINE_CHECK_LINES:
+                                    m_nUncheckedLines = 0
+                                    self.m_Deadline.check()
+                        if m_Comparer.m_Truncated:
+                            self.__truncate_compare(m_CompareResultFile)
+                        m_CompareResultFile.close()
+        except CompareAborted as ca:
+            return self.__abort_compare(ca, m_CompareResultFile)
+        except DiffException as de:
+            return False, 'Fatal Diff Exception:: ' + de.message
+
+        if m_CompareResult:
+            m_CompareResultFile = open(self.m_SucFileName, 'w')
+            m_CompareResultFile.close()
+        return m_CompareResult, None
+
+    def __truncate_compare(self, p_CompareResultFile):
+        # 差异超过了最多查找的差异行数，在dif文件的最后标记比对结果不完整
+        self.m_Aborted = CompareAborted.TRUNCATED
+        if self.m_MaxDifferences == 0:
+            m_szMessage = 'Compare stopped at the first difference'
+        else:
+            m_szMessage = 'Compare stopped after %d differing lines' % self.m_MaxDifferences
+        print(self.ABORTED_MARKER % m_szMessage, file=p_CompareResultFile)
+
+    def __abort_compare(self, p_Aborted, p_CompareResultFile):
+        # 比对超时的时候，保留已经输出的部分比对结果，并在dif文件的最后标记比对结果不完整，作为存在差异处理
+        # 比对被取消的时候，删除已经输出的部分比对结果，返回错误信息
+        self.m_Aborted = p_Aborted.reason
+        if p_CompareResultFile is not None:
+            p_CompareResultFile.close()
+        if p_Aborted.reason == CompareAborted.CANCELLED:
+            if p_CompareResultFile is not None and os.path.exists(self.m_DifFileName):
+                os.remove(self.m_DifFileName)
+            return False, p_Aborted.message
+        m_CompareResultFile = open(self.m_DifFileName, 'w' if p_CompareResultFile is None else 'a', encoding="utf-8")
+        print(self.ABORTED_MARKER % p_Aborted.message, file=m_CompareResultFile)
+        m_CompareResultFile.close()
+        return False, None
+
+
+def run_compare_job(p_Job):
+    # 进程池中执行的比对任务，只返回比对结果、错误信息、统计信息和中止的原因，比对的内容已经写入了dif文件
+    (m_CompareResult, m_ErrorMessage) = p_Job.run()
+    return m_CompareResult, m_ErrorMessage, p_Job.m_Stats, p_Job.m_Aborted
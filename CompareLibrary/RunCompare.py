@@ -1,260 +1,15 @@
 # -*- coding: UTF-8 -*-
 import os
 import re
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from robot.api import logger
 from robot.errors import ExecutionFailed
-import shlex
-
-
-class DiffException(Exception):
-    def __init__(self, message):
-        Exception.__init__(self)
-        self.message = message
-
-
-class POSIXCompare:
-    CompiledRegexPattern = {}
-
-    def __init__(self):
-        pass
-
-    # 正则表达比较两个字符串
-    # p_str1                  原字符串
-    # p_str2                  正则表达式
-    # p_compare_maskEnabled   是否按照正则表达式来判断是否相等
-    # p_compare_ignorecase    是否忽略匹配中的大小写
-    def compare_string(self, p_str1, p_str2,
-                       p_compare_maskEnabled=False,
-                       p_compare_ignorecase=False):
-        # 如果两个字符串完全相等，直接返回
-        if p_str1 == p_str2:
-            return True
-
-        # 如果忽略大小写的情况下，两个字符串的大写相同，则直接返回
-        if p_compare_ignorecase:
-            if p_str1.upper() == p_str2.upper():
-                return True
-
-        # 如果没有启用正则，则直接返回不相等
-        if not p_compare_maskEnabled:
-            return False
-
-        # 用正则判断表达式是否相等
-        try:
-            if p_str2 in self.CompiledRegexPattern:
-                m_CompiledPattern = self.CompiledRegexPattern[p_str2]
-            else:
-                m_CompiledPattern = re.compile(p_str2)
-                self.CompiledRegexPattern[p_str2] = m_CompiledPattern
-            if p_compare_ignorecase:
-                matchObj = re.match(m_CompiledPattern, p_str1, re.IGNORECASE)
-            else:
-                matchObj = re.match(m_CompiledPattern, p_str1)
-            if matchObj is None:
-                return False
-            elif str(matchObj.group()) != p_str1:
-                return False
-            else:
-                return True
-        except re.error:
-            # 正则表达式错误，可能是由于这并非是一个正则表达式
-            return False
-
-    def compare(self,
-                x,
-                y,
-                linenox,
-                linenoy,
-                p_compare_maskEnabled=False,
-                p_compare_ignorecase=False):
-        # LCS问题就是求两个字符串最长公共子串的问题。
-        # 解法就是用一个矩阵来记录两个字符串中所有位置的两个字符之间的匹配情况，若是匹配则为1，否则为0。
-        # 然后求出对角线最长的1序列，其对应的位置就是最长匹配子串的位置。
-
-        # c           LCS数组
-        # x           源数据
-        # y           目的数据
-        # linenox     源数据行数信息
-        # linenoy     目的数据行数信息
-        # i           源数据长度
-        # j           目的数据长度
-        # p_result    比对结果
-        next_x = x
-        next_y = y
-        next_i = len(x) - 1
-        next_j = len(y) - 1
-
-        # This is our matrix comprised of list of lists.
-        # We allocate extra row and column with zeroes for the base case of empty
-        # sequence. Extra row and column is appended to the end and exploit
-        # Python's ability of negative indices: x[-1] is the last elem.
-        # 构建LCS数组
-        c = [[0 for _ in range(len(y) + 1)] for _ in range(len(x) + 1)]
-        for i, xi in enumerate(x):
-            for j, yj in enumerate(y):
-                if self.compare_string(xi, yj,
-                                       p_compare_maskEnabled, p_compare_ignorecase):
-                    c[i][j] = 1 + c[i - 1][j - 1]
-                else:
-                    c[i][j] = max(c[i][j - 1], c[i - 1][j])
-
-        # 开始比较
-        compare_result = True
-        m_CompareDiffResult = []
-        while True:
-            if next_i < 0 and next_j < 0:
-                break
-            elif next_i < 0:
-                compare_result = False
-                m_CompareDiffResult.append("+{:>{}} ".format(linenoy[next_j], 6) + next_y[next_j])
-                next_x = next_x
-                next_y = next_y
-                next_i = next_i
-                next_j = next_j - 1
-            elif next_j < 0:
-                compare_result = False
-                m_CompareDiffResult.append("-{:>{}} ".format(linenox[next_i], 6) + next_x[next_i])
-                next_x = next_x
-                next_y = next_y
-                next_i = next_i - 1
-                next_j = next_j
-            elif self.compare_string(next_x[next_i], next_y[next_j],
-                                     p_compare_maskEnabled, p_compare_ignorecase):
-                m_CompareDiffResult.append(" {:>{}} ".format(linenox[next_i], 6) + next_x[next_i])
-                next_x = next_x
-                next_y = next_y
-                next_i = next_i - 1
-                next_j = next_j - 1
-            elif c[next_i][next_j - 1] >= c[next_i - 1][next_j]:
-                compare_result = False
-                m_CompareDiffResult.append("+{:>{}} ".format(linenoy[next_j], 6) + next_y[next_j])
-                next_x = next_x
-                next_y = next_y
-                next_i = next_i
-                next_j = next_j - 1
-            elif c[next_i][next_j - 1] < c[next_i - 1][next_j]:
-                compare_result = False
-                m_CompareDiffResult.append("-{:>{}} ".format(linenox[next_i], 6) + next_x[next_i])
-                next_x = next_x
-                next_y = next_y
-                next_i = next_i - 1
-                next_j = next_j
-        return compare_result, m_CompareDiffResult
-
-    def compare_text_files(self, file1, file2,
-                           skiplines=None,
-                           ignoreEmptyLine=False,
-                           CompareWithMask=None,
-                           CompareIgnoreCase=False,
-                           CompareIgnoreTailOrHeadBlank=False):
-        if not os.path.isfile(file1):
-            raise DiffException('ERROR: %s is not a file' % file1)
-        if not os.path.isfile(file2):
-            raise DiffException('ERROR: %s is not a file' % file2)
-
-        # 将比较文件加载到数组
-        file1rawcontent = open(file1, mode='r', encoding='utf-8').readlines()
-
-        file1content = open(file1, mode='r', encoding='utf-8').readlines()
-        file2content = open(file2, mode='r', encoding='utf-8').readlines()
-
-        lineno1 = []
-        lineno2 = []
-        for m_nPos in range(0, len(file1content)):
-            lineno1.append(m_nPos + 1)
-        for m_nPos in range(0, len(file2content)):
-            lineno2.append(m_nPos + 1)
-
-        # 去掉filecontent中的回车换行
-        for m_nPos in range(0, len(file1content)):
-            if file1content[m_nPos].endswith('\n'):
-                file1content[m_nPos] = file1content[m_nPos][:-1]
-        for m_nPos in range(0, len(file2content)):
-            if file2content[m_nPos].endswith('\n'):
-                file2content[m_nPos] = file2content[m_nPos][:-1]
-
-        # 去掉fileconent中的首尾空格
-        if CompareIgnoreTailOrHeadBlank:
-            for m_nPos in range(0, len(file1content)):
-                file1content[m_nPos] = file1content[m_nPos].lstrip().rstrip()
-            for m_nPos in range(0, len(file2content)):
-                file2content[m_nPos] = file2content[m_nPos].lstrip().rstrip()
-
-        # 去除在SkipLine里头的所有内容
-        if skiplines is not None:
-            m_nPos = 0
-            while m_nPos < len(file1content):
-                bMatch = False
-                for pattern in skiplines:
-                    if self.compare_string(file1content[m_nPos], pattern, p_compare_maskEnabled=True):
-                        file1content.pop(m_nPos)
-                        lineno1.pop(m_nPos)
-                        bMatch = True
-                        break
-                if not bMatch:
-                    m_nPos = m_nPos + 1
-
-            m_nPos = 0
-            while m_nPos < len(file2content):
-                bMatch = False
-                for pattern in skiplines:
-                    if self.compare_string(file2content[m_nPos], pattern, p_compare_maskEnabled=True):
-                        file2content.pop(m_nPos)
-                        lineno2.pop(m_nPos)
-                        bMatch = True
-                        break
-                if not bMatch:
-                    m_nPos = m_nPos + 1
-
-        # 去除所有的空行
-        if ignoreEmptyLine:
-            m_nPos = 0
-            while m_nPos < len(file1content):
-                if len(file1content[m_nPos].strip()) == 0:
-                    file1content.pop(m_nPos)
-                    lineno1.pop(m_nPos)
-                else:
-                    m_nPos = m_nPos + 1
-            m_nPos = 0
-            while m_nPos < len(file2content):
-                if len(file2content[m_nPos].strip()) == 0:
-                    file2content.pop(m_nPos)
-                    lineno2.pop(m_nPos)
-                else:
-                    m_nPos = m_nPos + 1
-
-        # 输出两个信息
-        # 1：  Compare的结果是否存在dif，True/False
-        # 2:   Compare的Dif列表，注意：这里是一个翻转的列表
-        (m_CompareResult, m_CompareResultList) = self.compare(file1content, file2content, lineno1, lineno2,
-                                                              p_compare_maskEnabled=CompareWithMask,
-                                                              p_compare_ignorecase=CompareIgnoreCase)
-        # 首先翻转数组
-        # 随后从数组中补充进入被Skip掉的内容
-        m_nLastPos = 0
-        m_NewCompareResultList = []
-        for row in m_CompareResultList[::-1]:
-            if row.startswith('+'):
-                # 当前日志没有，Log中有的，忽略不计
-                m_NewCompareResultList.append(row)
-                continue
-            elif row.startswith('-'):
-                # 记录当前行号
-                m_LineNo = int(row[1:7])
-            elif row.startswith(' '):
-                # 记录当前行号
-                m_LineNo = int(row[0:7])
-            else:
-                raise ExecutionFailed("Missed line number. Bad compare result. [" + row + "]", continue_on_failure=True)
-            if m_LineNo > (m_nLastPos + 1):
-                for m_nPos in range(m_nLastPos + 1, m_LineNo):
-                    m_NewCompareResultList.append("S{:>{}} ".format(m_nPos, 6) + file1rawcontent[m_nPos - 1])
-                m_NewCompareResultList.append(row)
-                m_nLastPos = m_LineNo
-            else:
-                m_NewCompareResultList.append(row)
-                m_nLastPos = m_LineNo
-        return m_CompareResult, m_NewCompareResultList
+import fnmatch
+# 比对的核心实现在CompareEngine中，DiffException和POSIXCompare原来定义在这里，导入后原有的导入方式可以继续使用
+from CompareLibrary.CompareEngine import (DiffException, POSIXCompare, CompareStats, CompareResultCache,
+                                          ReferenceArtifactCache, SharedRegistry, CompareJob, run_compare_job)
 
 
 class RunCompare(object):
@@ -262,17 +17,38 @@ class RunCompare(object):
     # 也就是说多test case都引用了这个类的方法，但是只有第一个test case调用的时候实例化
     ROBOT_LIBRARY_SCOPE = 'TEST SUITE'
 
-    __Reference_LogDirLists = None
-    __SkipLines = []
+    # ANNOTATED格式的dif文件中，每一行开头的标记和行号
+    AnnotatedPrefix = re.compile(r'[ +\-S] *\d+ ')
+
+    __SkipLines = None                        # 比对时需要忽略的行，每个实例各自维护，在__init__中初始化
     __BreakWithDifference = False             # 是否在遇到比对错误的时候抛出运行例外
     __EnableConsoleOutPut = False             # 是否关闭在Console上的显示，默认是不关闭
     __IgnoreEmptyLine = False                 # 是否在比对的时候忽略空白行
     __CompareWithMask = False                 # 是否在比对的时候利用正则表达式
     __CompareIgnoreCase = False               # 是否再比对的时候忽略大小写
     __CompareIgnoreTailOrHeadBlank = False    # 是否忽略对比的前后空格
+    __CompareEngine = "MYERS"                 # 比对使用的算法，MYERS或者LCS
+    __CompareStreaming = False                # 是否使用流式比对，用于超大文件的比对
+    __ConsoleMaxHunks = -1                    # 在Console上最多显示的差异块个数，小于等于0表示不限制
+    __ConsoleContextLines = -1                # 在Console上显示的差异块前后的行数，小于0表示显示全部的比对结果
+    __ResultCacheDir = None                   # 比对结果缓存的目录，None表示不使用缓存
+    __ResultCacheSize = CompareResultCache.DEFAULT_MAXSIZE    # 比对结果缓存的最大容量（字节）
+    __DiffFormat = "ANNOTATED"                # dif文件的格式，ANNOTATED或者UNIFIED
+    __DiffContextLines = 3                    # UNIFIED格式下每个差异块前后的行数
+    __CollectStats = False                    # 是否统计比对各个阶段的耗时和计数
+    __TraceMemory = False                     # 统计时是否通过tracemalloc跟踪内存峰值
+    __LastStats = None                        # 最近一次比对的统计信息
+    __CompareTimeout = None                   # 每次比对的超时时间（秒），None表示不限制
+    __CompareMaxDifferences = None            # 最多查找的差异行数，None表示不限制，0表示只判断是否相同
+    __ParallelWorkers = None                  # 分段并行比对使用的进程数，None表示不启用
+    __CompareUnordered = False                # 是否不考虑行的顺序进行比对
+    __ReferenceCache = False                  # 是否缓存参考文件的预处理结果
+    __ReferenceCacheDir = None                # 参考文件预处理结果的缓存目录，None表示保存在参考文件所在目录下
+    __SuiteStats = None                       # 当前Suite中所有比对的统计信息的汇总
 
     def __init__(self):
-        pass
+        # 列表的内容会被修改，不能作为类的属性在所有Suite的实例之间共用
+        self.__SkipLines = []
 
     def Compare_Ignore_EmptyLine(self, p_IgnoreEmptyLine):
         """ 设置是否在比对的时候忽略空白行  """
@@ -305,6 +81,53 @@ class RunCompare(object):
         if str(p_ConsoleOutput).upper() == 'FALSE':
             self.__EnableConsoleOutPut = False
 
+    def Compare_Console_Limit(self, p_nMaxHunks, p_nContextLines=3):
+        """ 设置在屏幕上显示Dif文件内容时的限制  """
+        """
+        输入参数：
+             p_nMaxHunks:            最多显示的差异块个数，小于等于0表示不限制
+             p_nContextLines:        每个差异块前后显示的行数，默认是3，小于0表示显示全部的比对结果
+        返回值：
+            无
+
+        仅在Compare_Enable_ConsoleOutput为True的时候生效
+        没有调用这个关键字的时候不做任何限制，和之前一样显示dif文件的全部内容
+        超出限制的差异块不会显示，但是会在最后的汇总信息中统计，完整的比对结果可以在dif文件中查看
+        """
+        self.__ConsoleMaxHunks = int(p_nMaxHunks)
+        self.__ConsoleContextLines = int(p_nContextLines)
+
+    def Compare_Diff_Format(self, p_szFormat, p_nContextLines=3):
+        """ 设置dif文件的格式  """
+        """
+         输入参数：
+              p_szFormat:          dif文件的格式，ANNOTATED或者UNIFIED，默认是ANNOTATED
+              p_nContextLines:     UNIFIED格式下每个差异块前后输出的相同行数，默认是3
+         返回值：
+             无
+
+         ANNOTATED格式为原有的格式，逐行输出工作文件的全部内容（包括被忽略的S行），以及参考文件中多出的行
+         UNIFIED格式和diff -u类似，文件头之后是差异的统计信息，随后只输出@@开头的差异块，
+         dif文件的大小只和差异的多少相关，而和文件大小无关
+         """
+        if str(p_szFormat).upper() not in (POSIXCompare.FORMAT_ANNOTATED, POSIXCompare.FORMAT_UNIFIED):
+            raise ExecutionFailed(
+                message=('Unknown diff format [' + str(p_szFormat) + ']. Valid options are ANNOTATED or UNIFIED.'),
+                continue_on_failure=True
+            )
+        try:
+            m_nContextLines = int(p_nContextLines)
+        except ValueError:
+            m_nContextLines = -1
+        if m_nContextLines < 0:
+            raise ExecutionFailed(
+                message=('Invalid diff context lines [' + str(p_nContextLines) + ']. '
+                         'It must be a non-negative integer.'),
+                continue_on_failure=True
+            )
+        self.__DiffFormat = str(p_szFormat).upper()
+        self.__DiffContextLines = m_nContextLines
+
     def Compare_Break_When_Difference(self, p_BreakWithDifference):
         """ 设置是否在遇到错误的时候中断该Case的后续运行  """
         """
@@ -389,6 +212,398 @@ class RunCompare(object):
         if str(p_szIgnoreTailOrHeadBlank).upper() == 'FALSE':
             self.__CompareIgnoreTailOrHeadBlank = False
 
+    def Compare_Engine(self, p_szEngine):
+        """ 设置比对时使用的算法  """
+        """
+         输入参数：
+              p_szEngine:        比对算法，MYERS或者LCS，默认是MYERS
+         返回值：
+             无
+
+         MYERS算法的耗时和文件的差异多少相关，适合大文件中只有少量差异的场景
+         LCS算法为原有的LCS矩阵算法，耗时和两个文件行数的乘积相关，作为备选保留
+         LCS算法使用的内存为参考文件的行数乘以工作文件行数的平方根，比对大文件时建议使用MYERS算法
+         两种算法在比对之前都会去掉两个文件相同的头部和尾部，存在多种差异行数相同的对齐方式时，
+         LCS算法的比对结果中+/-行的位置可能和原有版本不同
+         """
+        if str(p_szEngine).upper() in ('MYERS', 'LCS'):
+            self.__CompareEngine = str(p_szEngine).upper()
+        else:
+            raise ExecutionFailed(
+                message=('Unknown compare engine [' + str(p_szEngine) + ']. Valid options are MYERS or LCS.'),
+                continue_on_failure=True
+            )
+
+    def Compare_Streaming(self, p_szStreaming):
+        """ 设置是否使用流式比对  """
+        """
+         输入参数：
+              p_szStreaming:        是否使用流式比对，默认是不使用
+         返回值：
+             无
+
+         流式比对时文件不会被全部加载到内存中，相同的内容在读取的同时就被消费，只有存在差异的部分才会被缓存
+         内存的使用只和最大的差异块相关，适合GB级别的大文件比对
+         流式比对总是使用MYERS算法，在差异很多的时候，比对结果可能不是最短的
+         """
+        if str(p_szStreaming).upper() == 'TRUE':
+            self.__CompareStreaming = True
+        if str(p_szStreaming).upper() == 'FALSE':
+            self.__CompareStreaming = False
+
+    def Compare_Result_Cache(self, p_szCacheDir, p_nMaxSizeMB=512):
+        """ 设置是否使用比对结果缓存  """
+        """
+         输入参数：
+              p_szCacheDir:        缓存目录，默认是不使用缓存
+                                   TRUE     使用缓存，缓存目录为T_WORK（没有定义T_WORK时为当前目录）下的.compare_cache
+                                   FALSE    不使用缓存
+                                   其他     作为缓存目录使用
+              p_nMaxSizeMB:        缓存的最大容量，单位为MB，默认是512
+         返回值：
+             无
+
+         缓存按照工作文件和参考文件的内容，以及所有比对选项来保存比对结果
+         如果文件内容和比对选项都和之前的某次比对相同，则直接用缓存的结果生成dif或者suc文件，不再重新比对
+         缓存超过容量后，最久没有使用的结果会被删除
+         """
+        if str(p_szCacheDir).upper() == 'FALSE':
+            self.__ResultCacheDir = None
+            return
+        if str(p_szCacheDir).upper() == 'TRUE':
+            if "T_WORK" in os.environ:
+                self.__ResultCacheDir = os.path.join(os.environ["T_WORK"], ".compare_cache")
+            else:
+                self.__ResultCacheDir = os.path.join(os.getcwd(), ".compare_cache")
+        else:
+            self.__ResultCacheDir = os.path.abspath(str(p_szCacheDir))
+        self.__ResultCacheSize = int(float(p_nMaxSizeMB) * 1024 * 1024)
+
+    def Compare_Clear_Result_Cache(self):
+        """ 清空比对结果缓存  """
+        """
+         输入参数：
+             无
+         返回值：
+             无
+
+         """
+        if self.__ResultCacheDir is not None:
+            CompareResultCache(self.__ResultCacheDir, self.__ResultCacheSize).clear()
+
+    def Compare_Reference_Cache(self, p_szCacheDir):
+        """ 设置是否缓存参考文件的预处理结果  """
+        """
+         输入参数：
+              p_szCacheDir:        缓存目录，默认是不使用缓存
+                                   TRUE     使用缓存，预处理结果保存在参考文件所在目录下的.compare_reference中
+                                   MEMORY   使用缓存，预处理结果只保存在进程内，不写入磁盘
+                                   FALSE    不使用缓存
+                                   其他     作为缓存目录使用
+         返回值：
+             无
+
+         参考文件第一次比对时，将过滤、规范化之后的内容，每一行的ID以及正则表达式的分类保存下来
+         之后在相同的选项下比对同一个参考文件时，直接读取保存的结果，不再重新处理参考文件
+         参考文件的大小或者修改时间发生变化后，预处理结果会被重新生成
+         缓存目录无法写入的时候，比对仍然正常进行，只是每次都重新处理参考文件
+         预处理结果同时保存在进程内，所有的Suite共用，容量参考Compare_Engine_Cache_Size
+         """
+        if str(p_szCacheDir).upper() == 'FALSE':
+            self.__ReferenceCache = False
+            self.__ReferenceCacheDir = None
+            return
+        if str(p_szCacheDir).upper() == 'MEMORY':
+            self.__ReferenceCache = 'MEMORY'
+            self.__ReferenceCacheDir = None
+            return
+        self.__ReferenceCache = True
+        if str(p_szCacheDir).upper() == 'TRUE':
+            self.__ReferenceCacheDir = None
+        else:
+            self.__ReferenceCacheDir = os.path.abspath(str(p_szCacheDir))
+
+    def Compare_Warm_Cache(self, *p_ReferenceFiles):
+        """ 预先处理参考文件，并保存在进程内共享的缓存中  """
+        """
+         输入参数：
+              p_ReferenceFiles:    需要预先处理的结果参考文件，可以指定多个，和Compare_Files一样在T_LOG中查找
+         返回值：
+             预先处理的参考文件个数
+
+         参考文件按照当前的比对选项（忽略行、空行、大小写、首尾空格）处理，启用正则比对时同时编译参考文件中的正则表达式
+         之后所有Suite在相同选项下比对这些参考文件时，直接使用预处理的结果
+         启用了Compare_Reference_Cache的时候，预处理结果同时保存在磁盘上
+         """
+        m_ReferenceCache = None
+        if self.__ReferenceCache and str(self.__ReferenceCache).upper() != 'MEMORY':
+            m_ReferenceCache = ReferenceArtifactCache(self.__ReferenceCacheDir)
+        m_ReferenceDirectories = SharedRegistry.reference_directories(os.environ.get("T_LOG"))
+        m_nWarmed = 0
+        for m_szReferenceFile in p_ReferenceFiles:
+            m_ReferenceLog = SharedRegistry.resolve_reference(str(m_szReferenceFile), m_ReferenceDirectories)
+            if m_ReferenceLog is None:
+                logger.info('===============   reference log [' + str(m_szReferenceFile) + '] does not exist ============')
+                continue
+            try:
+                SharedRegistry.warm_reference(m_ReferenceLog, m_ReferenceCache,
+                                              list(self.__SkipLines),
+                                              self.__IgnoreEmptyLine,
+                                              self.__CompareWithMask,
+                                              self.__CompareIgnoreCase,
+                                              self.__CompareIgnoreTailOrHeadBlank)
+            except (OSError, UnicodeDecodeError, DiffException) as ex:
+                logger.info('Failed to warm reference log [' + m_ReferenceLog + ']: ' + repr(ex))
+                continue
+            m_nWarmed = m_nWarmed + 1
+        logger.info("Warmed " + str(m_nWarmed) + " of " + str(len(p_ReferenceFiles)) + " reference logs.")
+        return m_nWarmed
+
+    def Compare_Clear_Cache(self):
+        """ 清空进程内共享的缓存  """
+        """
+         输入参数：
+             无
+         返回值：
+             无
+
+         清空参考文件的预处理结果、编译后的正则表达式、参考文件目录的索引以及解析后的T_LOG
+         磁盘上的比对结果缓存和参考文件预处理结果不会被删除，参考Compare_Clear_Result_Cache
+         """
+        SharedRegistry.clear()
+
+    def Compare_Engine_Cache_Size(self, p_nMaxMemoryMB):
+        """ 设置进程内共享的参考文件预处理结果的最大容量  """
+        """
+         输入参数：
+              p_nMaxMemoryMB:      最大容量，单位为MB，默认是256，0表示不在进程内保存预处理结果
+         返回值：
+             无
+
+         容量按照估算的内存大小计算，超过容量后，最久没有使用的预处理结果会被清除
+         """
+        try:
+            m_nMaxMemory = int(float(p_nMaxMemoryMB) * 1024 * 1024)
+        except ValueError:
+            m_nMaxMemory = -1
+        if m_nMaxMemory < 0:
+            raise ExecutionFailed(
+                message=('Invalid engine cache size [' + str(p_nMaxMemoryMB) + ']. It must be a non-negative number.'),
+                continue_on_failure=True
+            )
+        SharedRegistry.m_ReferenceArtifacts.resize(m_nMaxMemory)
+
+    def Compare_Get_Engine_Cache_Stats(self):
+        """ 获取进程内共享的缓存的统计信息  """
+        """
+         输入参数：
+              无
+         返回值：
+             字典，包含以下内容
+                 reference_artifacts     参考文件预处理结果的缓存，包括size、memory、maxmemory、hits、misses、evictions
+                 regex_patterns          正则表达式缓存，和Compare_Get_Regex_Cache_Stats的返回值相同
+                 reference_directories   解析过的T_LOG的缓存，包括size、maxsize
+                 reference_index         参考文件目录索引，包括directories、maxdirectories，
+                                         以及参考文件查找结果的size、maxsize、hits、misses、evictions
+
+         """
+        m_Stats = SharedRegistry.stats()
+        logger.info("Engine cache stats: " + str(m_Stats))
+        return m_Stats
+
+    def Compare_Regex_Cache_Size(self, p_nCacheSize):
+        """ 设置正则表达式缓存的最大容量  """
+        """
+         输入参数：
+              p_nCacheSize:        缓存中最多保留的正则表达式个数，默认是4096
+         返回值：
+             无
+
+         正则表达式缓存在整个进程内共享，超过容量后，最久没有使用的表达式会被清除
+         """
+        try:
+            m_nCacheSize = int(p_nCacheSize)
+        except ValueError:
+            m_nCacheSize = 0
+        if m_nCacheSize <= 0:
+            raise ExecutionFailed(
+                message=('Invalid regex cache size [' + str(p_nCacheSize) + ']. It must be a positive integer.'),
+                continue_on_failure=True
+            )
+        POSIXCompare.CompiledRegexPattern.resize(m_nCacheSize)
+
+    def Compare_Get_Regex_Cache_Stats(self):
+        """ 获取正则表达式缓存的统计信息  """
+        """
+         输入参数：
+              无
+         返回值：
+             字典，包含以下内容
+                 size          当前缓存的表达式个数
+                 maxsize       缓存的最大容量
+                 hits          命中次数
+                 misses        未命中次数
+                 evictions     因为超过容量被清除的次数
+                 invalid       无法编译的表达式个数
+
+         """
+        m_Stats = POSIXCompare.CompiledRegexPattern.stats()
+        logger.info("Regex cache stats: " + str(m_Stats))
+        return m_Stats
+
+    def Compare_Timeout(self, p_nTimeout):
+        """ 设置每次比对的超时时间  """
+        """
+         输入参数：
+              p_nTimeout:        超时时间（秒），默认是不限制，小于等于0或者NONE表示不限制
+         返回值：
+             无
+
+         比对超时的时候不再继续比对，dif文件中保留已经生成的部分比对结果，并在最后一行标记比对结果不完整
+         超时的比对作为存在差异处理，通常这意味着文件之间的差异太多
+         """
+        if str(p_nTimeout).upper() in ('NONE', ''):
+            self.__CompareTimeout = None
+            return
+        try:
+            m_nTimeout = float(p_nTimeout)
+        except ValueError:
+            raise ExecutionFailed(
+                message=('Invalid compare timeout [' + str(p_nTimeout) + ']. It must be a number of seconds.'),
+                continue_on_failure=True
+            )
+        self.__CompareTimeout = m_nTimeout if m_nTimeout > 0 else None
+
+    def Compare_Unordered(self, p_szUnordered):
+        """ 设置是否在比对的时候不考虑行的顺序  """
+        """
+         输入参数：
+              p_szUnordered:        是否不考虑行的顺序，默认是考虑
+         返回值：
+             无
+
+         用于比对没有排序的查询结果，两个文件作为行的集合进行比对，每一行出现的次数也需要相同
+         比对的耗时和文件的行数成线性关系，启用正则的时候，内容不同的行还会再按照正则表达式匹配一次
+         dif文件中只记录工作文件中多出的行(-)和参考文件中多出的行(+)，以及它们在各自文件中的行号
+         这种方式下不区分比对算法，也不使用流式比对，dif文件的格式总是ANNOTATED
+         """
+        if str(p_szUnordered).upper() == 'TRUE':
+            self.__CompareUnordered = True
+        if str(p_szUnordered).upper() == 'FALSE':
+            self.__CompareUnordered = False
+
+    def Compare_Parallel_Diff(self, p_nWorkers):
+        """ 设置是否将大文件切分为多个段落，在多个进程中并行比对  """
+        """
+         输入参数：
+              p_nWorkers:        并行比对使用的进程数，AUTO表示使用全部的CPU，默认是不启用，NONE或者小于2表示不启用
+         返回值：
+             无
+
+         只有参与比对的内容超过十万行的时候才会切分，切分的时候以两个文件中都只出现一次的行作为锚点
+         锚点之间的段落互相独立，在不同的进程中比对后再按顺序拼接，比对结果中被忽略的行仍然会按原来的位置输出
+         锚点总是作为相同的行，所以比对结果可能和不切分的时候略有不同，但同样是正确的比对结果
+         流式比对不支持并行比对，设置了最多查找的差异行数并且差异超过限制的时候，也不会启用并行比对
+         """
+        if str(p_nWorkers).upper() in ('NONE', ''):
+            self.__ParallelWorkers = None
+            return
+        if str(p_nWorkers).upper() == 'AUTO':
+            self.__ParallelWorkers = os.cpu_count() or 1
+            return
+        try:
+            m_nWorkers = int(p_nWorkers)
+        except ValueError:
+            raise ExecutionFailed(
+                message=('Invalid parallel workers [' + str(p_nWorkers) + ']. It must be an integer or AUTO.'),
+                continue_on_failure=True
+            )
+        self.__ParallelWorkers = m_nWorkers if m_nWorkers > 1 else None
+
+    def Compare_Max_Differences(self, p_nMaxDifferences):
+        """ 设置每次比对最多查找的差异行数  """
+        """
+         输入参数：
+              p_nMaxDifferences:   最多查找的差异行数，默认是不限制，NONE或者小于0表示不限制
+                                   0表示只判断文件是否相同，发现第一个差异的时候就结束比对
+         返回值：
+             无
+
+         差异的行数超过限制的时候不再继续比对，比对的耗时只和限制的大小相关，而和文件之间的差异有多少无关
+         dif文件中只保留开头的部分比对结果，并在最后一行标记比对结果不完整，比对作为存在差异处理
+         差异的行数没有超过限制的时候，比对结果和不限制的时候完全相同
+         """
+        if str(p_nMaxDifferences).upper() in ('NONE', ''):
+            self.__CompareMaxDifferences = None
+            return
+        try:
+            m_nMaxDifferences = int(p_nMaxDifferences)
+        except ValueError:
+            raise ExecutionFailed(
+                message=('Invalid max differences [' + str(p_nMaxDifferences) + ']. It must be an integer.'),
+                continue_on_failure=True
+            )
+        self.__CompareMaxDifferences = m_nMaxDifferences if m_nMaxDifferences >= 0 else None
+
+    def Compare_Enable_Stats(self, p_szEnableStats, p_szTraceMemory=False):
+        """ 设置是否统计比对各个阶段的耗时和计数  """
+        """
+         输入参数：
+              p_szEnableStats:        是否统计比对各个阶段的耗时和计数，默认是不统计
+              p_szTraceMemory:        是否通过tracemalloc跟踪每次比对的内存峰值，默认是不跟踪
+         返回值：
+             无
+
+         统计信息可以通过Compare_Get_Stats获取
+         跟踪内存峰值会明显降低比对的速度，只建议在分析问题的时候使用
+         """
+        if str(p_szEnableStats).upper() == 'TRUE':
+            self.__CollectStats = True
+        if str(p_szEnableStats).upper() == 'FALSE':
+            self.__CollectStats = False
+        if str(p_szTraceMemory).upper() == 'TRUE':
+            self.__TraceMemory = True
+        if str(p_szTraceMemory).upper() == 'FALSE':
+            self.__TraceMemory = False
+
+    def Compare_Get_Stats(self, p_szScope="LAST"):
+        """ 获取比对的统计信息  """
+        """
+         输入参数：
+              p_szScope:        统计的范围，默认是LAST
+                                LAST     最近一次Compare_Files，或者最近一次Compare_Files_Batch中所有比对的汇总
+                                SUITE    当前Suite中所有比对的汇总
+         返回值：
+             字典，没有统计信息时返回None，包含以下内容
+                 compares          比对的次数
+                 total_seconds     所有阶段的总耗时（秒）
+                 phases            各个阶段的耗时（秒），包括reference_lookup、cache_lookup、exact_compare、
+                                   read、skip_filter（包含在read中）、intern、trim、diff、streaming、write、
+                                   cache_store、console
+                 counters          各种计数，包括比对的行数、正则表达式的编译次数（regex_compiles）、
+                                   正则表达式缓存的查找次数（regex_cache_lookups）、LCS矩阵的大小、编辑距离、
+                                   Compare_Directories中内容完全相同而不需要比对的文件个数（identical_files）等
+                 peak_memory       tracemalloc统计的内存峰值（字节），没有跟踪内存时为None
+                 max_rss           进程的最大常驻内存（字节），无法获取时为None
+
+         需要先通过Compare_Enable_Stats启用统计
+         """
+        if str(p_szScope).upper() == 'LAST':
+            m_Stats = self.__LastStats
+        elif str(p_szScope).upper() == 'SUITE':
+            m_Stats = self.__SuiteStats
+        else:
+            raise ExecutionFailed(
+                message=('Unknown stats scope [' + str(p_szScope) + ']. Valid options are LAST or SUITE.'),
+                continue_on_failure=True
+            )
+        if m_Stats is None:
+            logger.info("Compare stats: no compare has been recorded. Please enable it with Compare_Enable_Stats.")
+            return None
+        m_Stats = m_Stats.as_dict()
+        logger.info("Compare stats [" + str(p_szScope).upper() + "]: " + json.dumps(m_Stats))
+        return m_Stats
+
     def Compare_Files(self, p_szWorkFile, p_szReferenceFile):
         """ 比较两个文件是否一致  """
         """
@@ -402,20 +617,356 @@ class RunCompare(object):
 
         例外：
             在Compare_Break_With_Difference为True后，若比对发现差异，则抛出例外
+
+        当前结果文件和结果参考文件可以是gzip、bzip2、xz压缩的文件（Python 3.14之后还支持zstd），比对时直接解压读取
+        文件不存在的时候，会查找同名的压缩文件，例如work.log不存在时使用work.log.gz
         """
-        if self.__Reference_LogDirLists is None:
-            if "T_LOG" in os.environ:
-                T_LOG = os.environ["T_LOG"]
-                m_T_LOG_environs = shlex.shlex(T_LOG)
-                m_T_LOG_environs.whitespace = ','
-                m_T_LOG_environs.quotes = "'"
-                m_T_LOG_environs.whitespace_split = True
-                self.__Reference_LogDirLists = list(m_T_LOG_environs)
+        (m_Job, m_ErrorMessage) = self.__PrepareCompareJob(p_szWorkFile, p_szReferenceFile)
+        if m_Job is None:
+            if self.__BreakWithDifference:
+                raise ExecutionFailed(
+                    message=m_ErrorMessage,
+                    continue_on_failure=True
+                )
+            return False
+
+        # compare file
+        (m_CompareResult, m_ErrorMessage) = m_Job.run()
+        if m_ErrorMessage is not None:
+            logger.info(m_ErrorMessage)
+            self.__RecordStats(m_Job.m_Stats)
+            if self.__BreakWithDifference:
+                raise ExecutionFailed(
+                    message=m_ErrorMessage,
+                    continue_on_failure=True
+                )
+            return False
+
+        self.__LogCompareResult(m_Job, m_CompareResult)
+        self.__RecordStats(m_Job.m_Stats)
+        if not m_CompareResult and self.__BreakWithDifference:
+            raise ExecutionFailed(
+                message=('Got Difference. Please check [' + m_Job.m_DifFileName + '] for more information.'),
+                continue_on_failure=self.__BreakWithDifference
+            )
+        return m_CompareResult
+
+    def Compare_Files_Batch(self, p_FilePairs, p_nParallel=None):
+        """ 并行比较多组文件是否一致  """
+        """
+        输入参数：
+             p_FilePairs:         需要比对的文件列表，可以是以下两种形式
+                                  1： 一个列表，列表中的每一项是(当前结果文件, 结果参考文件)，或者是用逗号分隔的字符串
+                                  2： 一个清单文件的文件名，文件中每一行是用逗号或者空格分隔的当前结果文件和结果参考文件，
+                                      空行和#开头的行会被忽略
+             p_nParallel：        并行比对的进程数，默认为CPU的个数
+
+        返回值：
+            一个列表，列表中的每一项对应一组文件的比对结果，是一个字典，包括
+                work           当前结果文件
+                reference      结果参考文件
+                result         True表示比对成功，False表示比对中发现了差异
+                file           生成的dif或者suc文件
+                message        比对失败时的错误信息
+                aborted        比对超时时为TIMEOUT，差异超过了最多查找的差异行数时为TRUNCATED，否则为None
+
+        例外：
+            在Compare_Break_With_Difference为True后，若有任何一组文件比对发现差异，则在全部比对完成后抛出例外
+
+        每一组文件的比对都和Compare_Files完全相同，会使用当前所有的比对设置，并生成相同的dif或者suc文件
+        """
+        m_FilePairs = self.__ParseFilePairs(p_FilePairs)
+        m_nParallel = self.__ParseParallel(p_nParallel)
+
+        # 首先在当前进程中确定所有文件的位置，不存在的文件直接记录为失败
+        m_ResultTable = []
+        m_Jobs = []
+        for (m_szWorkFile, m_szReferenceFile) in m_FilePairs:
+            (m_Job, m_ErrorMessage) = self.__PrepareCompareJob(m_szWorkFile, m_szReferenceFile)
+            m_Result = {
+                "work": m_szWorkFile,
+                "reference": m_szReferenceFile,
+                "result": False,
+                "file": None,
+                "message": m_ErrorMessage,
+                "aborted": None
+            }
+            m_ResultTable.append(m_Result)
+            if m_Job is not None:
+                m_Result["reference"] = m_Job.m_ReferenceFileName
+                m_Jobs.append((m_Result, m_Job))
+
+        self.__RunCompareJobs(m_Jobs, m_nParallel)
+        m_nFailed = self.__LogBatchSummary("Batch compare", m_ResultTable)
+        if m_nFailed > 0 and self.__BreakWithDifference:
+            raise ExecutionFailed(
+                message=('Got Difference in ' + str(m_nFailed) + ' of ' + str(len(m_ResultTable)) +
+                         ' file pairs. Please check the dif files for more information.'),
+                continue_on_failure=True
+            )
+        return m_ResultTable
+
+    def Compare_Directories(self, p_szWorkDirectory, p_szReferenceDirectory=None, p_szPattern="*.log",
+                            p_szReferenceExtension=".ref", p_nParallel=None, p_szSummaryFile=None):
+        """ 比较目录下的所有文件和参考文件是否一致  """
+        """
+        输入参数：
+             p_szWorkDirectory:       当前结果文件所在的目录，目录不存在并且定义了T_WORK的时候，作为T_WORK下的相对路径
+             p_szReferenceDirectory： 结果参考文件所在的目录，默认在T_LOG中查找每一个参考文件
+             p_szPattern：            需要比对的当前结果文件的文件名模式，多个模式用逗号分隔，默认是*.log
+                                      包含/的模式按照相对于p_szWorkDirectory的路径匹配，例如sub/*.log
+             p_szReferenceExtension： 参考文件的扩展名，默认是.ref，参考文件名是当前结果文件名替换扩展名后的结果
+                                      NONE表示参考文件和当前结果文件同名
+             p_nParallel：            并行比对的进程数，默认为CPU的个数
+             p_szSummaryFile：        汇总报告的文件名，默认是T_WORK（没有定义T_WORK时为当前目录）下的compare_directories.json
+
+        返回值：
+            一个列表，列表中的每一项对应一个当前结果文件的比对结果，和Compare_Files_Batch的返回值相同，另外包括
+                identical      True表示文件内容和参考文件完全相同，没有经过比对
+
+        例外：
+            在Compare_Break_With_Difference为True后，若有任何一个文件比对发现差异，则在全部比对完成后抛出例外
+
+        子目录中的文件也会被比对，参考文件在参考目录（或者T_LOG）的同名子目录中查找
+        dif和suc文件生成在T_WORK（没有定义T_WORK时为当前目录）下的同名子目录中
+        大小和内容都和参考文件完全相同的文件不需要比对，直接生成suc文件，其余的文件和Compare_Files_Batch一样并行比对
+        汇总报告是一个JSON文件，包括所有文件的比对结果，以及成功、失败和内容完全相同的文件个数
+        """
+        m_nParallel = self.__ParseParallel(p_nParallel)
+        if "T_WORK" in os.environ:
+            m_szResultDirectory = os.environ["T_WORK"]
+        else:
+            m_szResultDirectory = os.getcwd()
+        m_szWorkDirectory = str(p_szWorkDirectory)
+        if not os.path.isdir(m_szWorkDirectory) and "T_WORK" in os.environ and not os.path.isabs(m_szWorkDirectory):
+            m_szWorkDirectory = os.path.join(os.environ["T_WORK"], m_szWorkDirectory)
+        if not os.path.isdir(m_szWorkDirectory):
+            raise ExecutionFailed(
+                message=('Work directory [' + str(p_szWorkDirectory) + '] does not exist.'),
+                continue_on_failure=True
+            )
+        m_szReferenceDirectory = None
+        if p_szReferenceDirectory is not None and str(p_szReferenceDirectory).strip() != '' and \
+                str(p_szReferenceDirectory).upper() != 'NONE':
+            m_szReferenceDirectory = str(p_szReferenceDirectory)
+            if not os.path.isdir(m_szReferenceDirectory):
+                raise ExecutionFailed(
+                    message=('Reference directory [' + m_szReferenceDirectory + '] does not exist.'),
+                    continue_on_failure=True
+                )
+        m_szReferenceExtension = None
+        if p_szReferenceExtension is not None and str(p_szReferenceExtension).upper() != 'NONE':
+            m_szReferenceExtension = str(p_szReferenceExtension)
+        m_Patterns = [m_Pattern.strip() for m_Pattern in str(p_szPattern).split(',') if m_Pattern.strip() != '']
+
+        # 扫描目录，找到所有需要比对的当前结果文件，之前生成的dif和suc文件不参与比对
+        m_WorkFiles = []
+        for (m_szDirectory, m_SubDirectories, m_FileNames) in os.walk(m_szWorkDirectory):
+            m_SubDirectories.sort()
+            for m_szFileName in sorted(m_FileNames):
+                if m_szFileName.endswith(('.dif', '.suc')):
+                    continue
+                m_szRelativeName = os.path.relpath(os.path.join(m_szDirectory, m_szFileName), m_szWorkDirectory)
+                # 压缩文件同时按照去掉压缩扩展名之后的文件名匹配，例如*.log可以匹配work.log.gz
+                m_MatchNames = []
+                for m_szName in (m_szRelativeName, POSIXCompare.strip_compression_extension(m_szRelativeName)):
+                    m_MatchNames.append((m_szName.replace(os.sep, '/'), os.path.basename(m_szName)))
+                for m_Pattern in m_Patterns:
+                    if any(fnmatch.fnmatch(m_szMatchPath if '/' in m_Pattern else m_szMatchFile, m_Pattern)
+                           for (m_szMatchPath, m_szMatchFile) in m_MatchNames):
+                        m_WorkFiles.append(m_szRelativeName)
+                        break
+
+        # 确定每一个文件对应的参考文件和dif、suc文件的位置，不存在的文件直接记录为失败
+        m_ResultTable = []
+        m_Jobs = []
+        for m_szRelativeName in m_WorkFiles:
+            (m_szShortName, _) = os.path.splitext(POSIXCompare.strip_compression_extension(m_szRelativeName))
+            if m_szReferenceExtension is None:
+                m_szReferenceFile = POSIXCompare.strip_compression_extension(m_szRelativeName)
+            else:
+                m_szReferenceFile = m_szShortName + m_szReferenceExtension
+            if m_szReferenceDirectory is not None:
+                m_szReferenceFile = os.path.join(m_szReferenceDirectory, m_szReferenceFile)
+            m_szResultFile = os.path.join(m_szResultDirectory, m_szShortName)
+            os.makedirs(os.path.dirname(m_szResultFile), exist_ok=True)
+            m_szWorkFile = os.path.join(m_szWorkDirectory, m_szRelativeName)
+            (m_Job, m_ErrorMessage) = self.__PrepareCompareJob(m_szWorkFile, m_szReferenceFile, m_szResultFile)
+            m_Result = {
+                "work": m_szWorkFile,
+                "reference": m_szReferenceFile,
+                "result": False,
+                "file": None,
+                "message": m_ErrorMessage,
+                "aborted": None,
+                "identical": False
+            }
+            m_ResultTable.append(m_Result)
+            if m_Job is not None:
+                m_Result["reference"] = m_Job.m_ReferenceFileName
+                m_Jobs.append((m_Result, m_Job))
+
+        # 在线程中并行检查文件内容是否和参考文件完全相同，相同的文件不需要再启动比对
+        # 启用统计的时候，相同的文件同样作为一次比对记录统计信息，检查的耗时计入exact_compare
+        def check_identical(p_Job):
+            with CompareStats.phase(p_Job.m_Stats, "exact_compare"):
+                return POSIXCompare.identical_files(p_Job.m_WorkFileName, p_Job.m_ReferenceFileName)
+
+        with ThreadPoolExecutor(max_workers=m_nParallel) as m_Executor:
+            m_IdenticalFlags = list(m_Executor.map(check_identical, [m_Job for (_, m_Job) in m_Jobs]))
+        m_ChangedJobs = []
+        m_IdenticalStats = None
+        for ((m_Result, m_Job), m_bIdentical) in zip(m_Jobs, m_IdenticalFlags):
+            if m_bIdentical:
+                with CompareStats.phase(m_Job.m_Stats, "write"):
+                    open(m_Job.m_SucFileName, 'w').close()
+                m_Result["result"] = True
+                m_Result["file"] = m_Job.m_SucFileName
+                m_Result["identical"] = True
+                if m_Job.m_Stats is not None:
+                    m_Job.m_Stats.add_count("identical_files")
+                    m_Job.m_Stats.record_memory()
+                    if m_IdenticalStats is None:
+                        m_IdenticalStats = CompareStats()
+                    m_IdenticalStats.merge(m_Job.m_Stats)
+            else:
+                m_ChangedJobs.append((m_Result, m_Job))
+
+        self.__RunCompareJobs(m_ChangedJobs, m_nParallel, m_IdenticalStats)
+        m_nFailed = self.__LogBatchSummary("Directory compare", m_ResultTable)
+
+        # 生成汇总报告
+        if p_szSummaryFile is None or str(p_szSummaryFile).strip() == '':
+            m_szSummaryFile = os.path.join(m_szResultDirectory, "compare_directories.json")
+        else:
+            m_szSummaryFile = str(p_szSummaryFile)
+        m_Summary = {
+            "work_directory": os.path.abspath(m_szWorkDirectory),
+            "reference_directory": None if m_szReferenceDirectory is None else os.path.abspath(m_szReferenceDirectory),
+            "total": len(m_ResultTable),
+            "passed": len(m_ResultTable) - m_nFailed,
+            "failed": m_nFailed,
+            "identical": len(m_Jobs) - len(m_ChangedJobs),
+            "results": m_ResultTable
+        }
+        with open(m_szSummaryFile, mode='w', encoding='utf-8') as m_SummaryFile:
+            json.dump(m_Summary, m_SummaryFile, indent=2, ensure_ascii=False)
+        logger.write("  ===== Summary file    [" + m_szSummaryFile + "]")
+
+        if m_nFailed > 0 and self.__BreakWithDifference:
+            raise ExecutionFailed(
+                message=('Got Difference in ' + str(m_nFailed) + ' of ' + str(len(m_ResultTable)) +
+                         ' files under [' + str(p_szWorkDirectory) + ']. ' +
+                         'Please check the dif files for more information.'),
+                continue_on_failure=True
+            )
+        return m_ResultTable
+
+    @staticmethod
+    def __ParseParallel(p_nParallel):
+        # 并行比对的进程数，默认为CPU的个数
+        if p_nParallel is None or str(p_nParallel).strip() == '':
+            return os.cpu_count() or 1
+        return max(int(p_nParallel), 1)
+
+    def __RunCompareJobs(self, p_Jobs, p_nParallel, p_BatchStats=None):
+        # 执行比对，p_Jobs中的每一项为(结果字典, CompareJob)，比对的结果记录在结果字典中
+        # 比对的工作在进程池中完成，每个进程会自行生成dif或者suc文件
+        # p_BatchStats为同一批中不需要比对的文件的统计信息，和这一批比对的统计信息合并后一起记录
+        if p_nParallel > 1 and len(p_Jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(p_nParallel, len(p_Jobs))) as m_Executor:
+                m_Futures = [m_Executor.submit(run_compare_job, m_Job) for (_, m_Job) in p_Jobs]
+                m_JobResults = []
+                for m_Future in m_Futures:
+                    try:
+                        m_JobResults.append(m_Future.result())
+                    except Exception as ex:
+                        m_JobResults.append((False, 'Fatal Compare Exception:: ' + repr(ex), None, None))
+        else:
+            m_JobResults = [run_compare_job(m_Job) for (_, m_Job) in p_Jobs]
+
+        m_BatchStats = p_BatchStats
+        for ((m_Result, m_Job), (m_CompareResult, m_ErrorMessage, m_Stats, m_Aborted)) in zip(p_Jobs, m_JobResults):
+            # 在子进程中执行时，统计信息和中止的原因需要从子进程的返回值中获取
+            if m_Stats is not None:
+                m_Job.m_Stats = m_Stats
+            m_Job.m_Aborted = m_Aborted
+            if m_Job.m_Stats is not None:
+                if m_BatchStats is None:
+                    m_BatchStats = CompareStats()
+                m_BatchStats.merge(m_Job.m_Stats)
+            m_Result["result"] = m_CompareResult
+            m_Result["message"] = m_ErrorMessage
+            m_Result["aborted"] = m_Job.m_Aborted
+            if m_ErrorMessage is not None:
+                logger.info(m_ErrorMessage)
+                continue
+            if m_CompareResult:
+                m_Result["file"] = m_Job.m_SucFileName
+            else:
+                m_Result["file"] = m_Job.m_DifFileName
+            self.__LogCompareResult(m_Job, m_CompareResult)
+            if m_BatchStats is not None and m_Job.m_Stats is not None:
+                m_BatchStats.add_time("console", m_Job.m_Stats.m_Phases.get("console", 0.0))
+        if m_BatchStats is not None:
+            self.__RecordStats(m_BatchStats)
+
+    @staticmethod
+    def __LogBatchSummary(p_szTitle, p_ResultTable):
+        # 在Robot的日志中汇总所有的比对结果，返回存在差异的文件个数
+        m_nFailed = 0
+        for m_Result in p_ResultTable:
+            if not m_Result["result"]:
+                m_nFailed = m_nFailed + 1
+        logger.write("======= " + p_szTitle.ljust(15) + " [" + str(len(p_ResultTable) - m_nFailed) + " passed, " +
+                     str(m_nFailed) + " failed] >>>>> ")
+        for m_Result in p_ResultTable:
+            logger.write("  ===== " + ("PASS" if m_Result["result"] else "FAIL") +
+                         " [" + str(m_Result["work"]) + "] [" + str(m_Result["reference"]) + "]" +
+                         ("" if m_Result["file"] is None else " [" + str(m_Result["file"]) + "]"))
+        return m_nFailed
+
+    @staticmethod
+    def __ParseFilePairs(p_FilePairs):
+        # 将批量比对的参数转换为(当前结果文件, 结果参考文件)的列表
+        if isinstance(p_FilePairs, str):
+            if not os.path.isfile(p_FilePairs):
+                raise ExecutionFailed(
+                    message=('Compare manifest file [' + p_FilePairs + '] does not exist.'),
+                    continue_on_failure=True
+                )
+            with open(p_FilePairs, mode='r', encoding='utf-8') as m_ManifestFile:
+                p_FilePairs = [m_Line.strip() for m_Line in m_ManifestFile
+                               if m_Line.strip() != '' and not m_Line.strip().startswith('#')]
+        m_FilePairs = []
+        for m_FilePair in p_FilePairs:
+            if isinstance(m_FilePair, str):
+                if ',' in m_FilePair:
+                    m_FilePair = [m_File.strip() for m_File in m_FilePair.split(',')]
+                else:
+                    m_FilePair = m_FilePair.split()
+            if len(m_FilePair) != 2:
+                raise ExecutionFailed(
+                    message=('Invalid compare file pair [' + str(m_FilePair) + '].'),
+                    continue_on_failure=True
+                )
+            m_FilePairs.append((str(m_FilePair[0]), str(m_FilePair[1])))
+        return m_FilePairs
+
+    def __PrepareCompareJob(self, p_szWorkFile, p_szReferenceFile, p_szResultFile=None):
+        # 确定工作文件、参考文件、dif文件和suc文件的位置，并删除之前生成的dif和suc文件
+        # p_szResultFile为dif和suc文件的全路径（不包括扩展名），默认根据工作文件名生成在T_WORK或者当前目录下
+        # 返回(CompareJob, 错误信息)，如果文件不存在，CompareJob为None
+        m_ReferenceDirectories = SharedRegistry.reference_directories(os.environ.get("T_LOG"))
 
         # 检查work文件是否存在，如果存在，则文件是全路径
-        if os.path.exists(p_szWorkFile):
-            # 传递的是全路径
-            (m_WorkFilePath, m_TempFileName) = os.path.split(p_szWorkFile)
+        if p_szResultFile is not None:
+            m_DifFullFileName = p_szResultFile + '.dif'
+            m_SucFullFileName = p_szResultFile + '.suc'
+            m_szWorkFile = p_szWorkFile
+        elif POSIXCompare.find_text_file(p_szWorkFile) is not None:
+            # 传递的是全路径，文件不存在的时候使用同名的压缩文件，dif文件名中不包括压缩文件的扩展名
+            (m_WorkFilePath, m_TempFileName) = os.path.split(POSIXCompare.strip_compression_extension(p_szWorkFile))
             (m_ShortWorkFileName, m_WorkFileExtension) = os.path.splitext(m_TempFileName)
             # 如果定义了T_WORK，则dif文件生成在T_WORK下, 否则生成在当前目录下
             if "T_WORK" in os.environ:
@@ -430,21 +981,17 @@ class RunCompare(object):
                 m_SucFileName = m_ShortWorkFileName + '.suc'
             m_DifFullFileName = os.path.join(m_DifFilePath, m_DifFileName)
             m_SucFullFileName = os.path.join(m_SucFilePath, m_SucFileName)
-            m_szWorkFile = p_szWorkFile
+            m_szWorkFile = POSIXCompare.find_text_file(p_szWorkFile)
         else:
             if "T_WORK" not in os.environ:
-                logger.info('===============   work log [' + p_szWorkFile + '] does not exist. ' +
-                            ' T_WORK env does not exist too ============')
-                if self.__BreakWithDifference:
-                    raise ExecutionFailed(
-                        message=('===============   work log [' + p_szWorkFile + '] does not exist. ' +
-                                 ' T_WORK env does not exist too ============'),
-                        continue_on_failure=True
-                    )
-                return False
+                m_ErrorMessage = ('===============   work log [' + p_szWorkFile + '] does not exist. ' +
+                                  ' T_WORK env does not exist too ============')
+                logger.info(m_ErrorMessage)
+                return None, m_ErrorMessage
 
             # 传递的不是绝对路径，是相对路径
-            (m_ShortWorkFileName, m_WorkFileExtension) = os.path.splitext(p_szWorkFile)
+            (m_ShortWorkFileName, m_WorkFileExtension) = \
+                os.path.splitext(POSIXCompare.strip_compression_extension(p_szWorkFile))
             # 如果定义了T_WORK，则dif文件生成在T_WORK下, 否则生成在当前目录下
             m_DifFilePath = os.environ["T_WORK"]
             m_DifFileName = m_ShortWorkFileName + '.dif'
@@ -453,6 +1000,8 @@ class RunCompare(object):
             m_DifFullFileName = os.path.join(m_DifFilePath, m_DifFileName)
             m_SucFullFileName = os.path.join(m_SucFilePath, m_SucFileName)
             m_szWorkFile = os.path.join(os.environ['T_WORK'], p_szWorkFile)
+            if POSIXCompare.find_text_file(m_szWorkFile) is not None:
+                m_szWorkFile = POSIXCompare.find_text_file(m_szWorkFile)
 
         # remove old file first
         if os.path.exists(m_DifFullFileName):
@@ -462,112 +1011,163 @@ class RunCompare(object):
 
         # check if work file exist
         if not os.path.isfile(m_szWorkFile):
+            m_ErrorMessage = '===============   work log [' + p_szWorkFile + '] does not exist ============'
             m_CompareResultFile = open(m_DifFullFileName, 'w')
-            m_CompareResultFile.write(
-                '===============   work log [' + p_szWorkFile + '] does not exist ============')
+            m_CompareResultFile.write(m_ErrorMessage)
             m_CompareResultFile.close()
-            if self.__BreakWithDifference:
-                raise ExecutionFailed(
-                    message=('===============   work log [' + p_szWorkFile + '] does not exist ============'),
-                    continue_on_failure=True
-                )
-            return False
+            return None, m_ErrorMessage
 
         # search reference log
-        m_ReferenceLog = None
-        if self.__Reference_LogDirLists is not None:
-            for m_Reference_LogDir in self.__Reference_LogDirLists:
-                m_TempReferenceLog = os.path.join(m_Reference_LogDir, p_szReferenceFile)
-                if os.path.isfile(m_TempReferenceLog):
-                    m_ReferenceLog = m_TempReferenceLog
-                    break
+        m_nLookupStart = time.perf_counter()
+        m_ReferenceLog = SharedRegistry.resolve_reference(p_szReferenceFile, m_ReferenceDirectories)
         if m_ReferenceLog is None:
             m_ReferenceLog = p_szReferenceFile
         if not os.path.isfile(m_ReferenceLog):
-            logger.info('===============   reference log [' + m_ReferenceLog +
-                        '] does not exist ============')
+            m_ErrorMessage = '===============   reference log [' + m_ReferenceLog + '] does not exist ============'
+            logger.info(m_ErrorMessage)
             m_CompareResultFile = open(m_DifFullFileName, 'w')
-            m_CompareResultFile.write('===============   reference log [' + m_ReferenceLog +
-                                      '] does not exist ============')
+            m_CompareResultFile.write(m_ErrorMessage)
             m_CompareResultFile.close()
-            if self.__BreakWithDifference:
-                raise ExecutionFailed(
-                    message=('===============   reference log [' + m_ReferenceLog + '] does not exist ============'),
-                    continue_on_failure=True
-                )
-            return False
+            return None, m_ErrorMessage
 
-        # compare file
-        m_Comparer = POSIXCompare()
-        try:
-            # 这里的CompareResultList是一个被翻转了的列表，在输出的时候，需要翻转回来
-            (m_CompareResult, m_CompareResultList) = m_Comparer.compare_text_files(
-                m_szWorkFile, m_ReferenceLog,
-                self.__SkipLines,
-                self.__IgnoreEmptyLine,
-                self.__CompareWithMask,
-                self.__CompareIgnoreCase,
-                self.__CompareIgnoreTailOrHeadBlank)
-        except DiffException as de:
-            logger.info('Fatal Diff Exception:: ' + de.message)
-            if self.__BreakWithDifference:
-                raise ExecutionFailed(
-                    message=('Fatal Diff Exception:: ' + de.message),
-                    continue_on_failure=True
-                )
-            return False
+        m_Job = CompareJob(m_szWorkFile, m_ReferenceLog, m_DifFullFileName, m_SucFullFileName,
+                           skiplines=list(self.__SkipLines),
+                           ignoreEmptyLine=self.__IgnoreEmptyLine,
+                           CompareWithMask=self.__CompareWithMask,
+                           CompareIgnoreCase=self.__CompareIgnoreCase,
+                           CompareIgnoreTailOrHeadBlank=self.__CompareIgnoreTailOrHeadBlank,
+                           CompareEngine=self.__CompareEngine,
+                           CompareStreaming=self.__CompareStreaming,
+                           ResultCacheDir=self.__ResultCacheDir,
+                           ResultCacheSize=self.__ResultCacheSize,
+                           DiffFormat=self.__DiffFormat,
+                           DiffContextLines=self.__DiffContextLines,
+                           CollectStats=self.__CollectStats,
+                           TraceMemory=self.__TraceMemory,
+                           Timeout=self.__CompareTimeout,
+                           MaxDifferences=self.__CompareMaxDifferences,
+                           ParallelWorkers=self.__ParallelWorkers,
+                           CompareUnordered=self.__CompareUnordered,
+                           ReferenceCache=self.__ReferenceCache,
+                           ReferenceCacheDir=self.__ReferenceCacheDir)
+        if m_Job.m_Stats is not None:
+            m_Job.m_Stats.add_time("reference_lookup", time.perf_counter() - m_nLookupStart)
+        return m_Job, None
 
-        if m_CompareResult:
-            m_CompareResultFile = open(m_SucFullFileName, 'w')
-            m_CompareResultFile.close()
-            logger.write("======= Succ file       [" + m_SucFullFileName + "] >>>>> ")
-            logger.write("  ===== Work file       [" + os.path.abspath(m_szWorkFile) + "]")
-            logger.write("  ===== Ref  file       [" + os.path.abspath(m_ReferenceLog) + "]")
-            logger.write("  ===== Mask flag       [" + str(self.__CompareWithMask) + "]")
-            logger.write("  ===== BlankSpace flag [" + str(self.__CompareIgnoreTailOrHeadBlank) + "]")
-            logger.write("  ===== Case flag       [" + str(self.__CompareIgnoreCase) + "]")
-            logger.write("  ===== Empty line flag [" + str(self.__IgnoreEmptyLine) + "]")
-            for row in self.__SkipLines:
-                logger.write("  ===== Skip line       [" + str(row) + "]")
-            return True
+    def __LogCompareResult(self, p_Job, p_CompareResult):
+        # 在Robot的日志中记录比对的结果，比对的内容从生成的dif文件中读取
+        with CompareStats.phase(p_Job.m_Stats, "console"):
+            self.__WriteCompareResult(p_Job, p_CompareResult)
+
+    def __RecordStats(self, p_Stats):
+        # 记录最近一次比对的统计信息，并合并到Suite的汇总信息中
+        if p_Stats is None:
+            return
+        self.__LastStats = p_Stats
+        if self.__SuiteStats is None:
+            self.__SuiteStats = CompareStats()
+        self.__SuiteStats.merge(p_Stats)
+
+    def __WriteCompareResult(self, p_Job, p_CompareResult):
+        if p_CompareResult:
+            logger.write("======= Succ file       [" + p_Job.m_SucFileName + "] >>>>> ")
         else:
-            logger.write("======= Diff file       [" + m_DifFullFileName + "] >>>>> ")
-            logger.write("  ===== Work file       [" + os.path.abspath(m_szWorkFile) + "]")
-            logger.write("  ===== Ref  file       [" + os.path.abspath(m_ReferenceLog) + "]")
-            logger.write("  ===== Mask flag       [" + str(self.__CompareWithMask) + "]")
-            logger.write("  ===== BlankSpace flag [" + str(self.__CompareIgnoreTailOrHeadBlank) + "]")
-            logger.write("  ===== Case flag       [" + str(self.__CompareIgnoreCase) + "]")
-            logger.write("  ===== Empty line flag [" + str(self.__IgnoreEmptyLine) + "]")
-            for row in self.__SkipLines:
-                logger.write("  ===== Skip line       [" + str(row) + "]")
-
-            m_CompareResultFile = open(m_DifFullFileName, 'w', encoding="utf-8")
-            for line in m_CompareResultList:
-                print(line, file=m_CompareResultFile)
-                if self.__EnableConsoleOutPut:
-                    if line.startswith('-'):
-                        logger.write('<font style="color:Black;background-color:#E0E0E0">' + line[0:7] + '</font>' +
-                                     '<font style="color:white;background-color:Red">' + line[7:] + '</font>',
-                                     html=True)
-                    elif line.startswith('+'):
-                        logger.write('<font style="color:Black;background-color:#E0E0E0">' + line[0:7] + '</font>' +
-                                     '<font style="color:white;background-color:Green">' + line[7:] + '</font>',
-                                     html=True)
-                    elif line.startswith('S'):
-                        logger.write('<font style="color:Black;background-color:#E0E0E0">' + line + '</font>',
-                                     html=True)
-                    else:
-                        logger.write('<font style="color:Black;background-color:#E0E0E0">' + line[0:7] + '</font>' +
-                                     '<font style="color:Black;background-color:white">' + line[7:] + '</font>',
-                                     html=True)
-            m_CompareResultFile.close()
-            logger.write("======= Diff file [" + m_DifFullFileName + "] <<<<< ")
-            if self.__BreakWithDifference:
-                raise ExecutionFailed(
-                    message=('Got Difference. Please check [' + m_DifFullFileName + '] for more information.'),
-                    continue_on_failure=self.__BreakWithDifference
-                )
-            return False
+            logger.write("======= Diff file       [" + p_Job.m_DifFileName + "] >>>>> ")
+        logger.write("  ===== Work file       [" + os.path.abspath(p_Job.m_WorkFileName) + "]")
+        logger.write("  ===== Ref  file       [" + os.path.abspath(p_Job.m_ReferenceFileName) + "]")
+        logger.write("  ===== Mask flag       [" + str(self.__CompareWithMask) + "]")
+        logger.write("  ===== BlankSpace flag [" + str(self.__CompareIgnoreTailOrHeadBlank) + "]")
+        logger.write("  ===== Case flag       [" + str(self.__CompareIgnoreCase) + "]")
+        logger.write("  ===== Empty line flag [" + str(self.__IgnoreEmptyLine) + "]")
+        if p_Job.m_CompareUnordered:
+            logger.write("  ===== Unordered flag  [True]")
+        for row in self.__SkipLines:
+            logger.write("  ===== Skip line       [" + str(row) + "]")
+        if p_Job.m_Aborted is not None:
+            logger.write("  ===== Aborted         [" + str(p_Job.m_Aborted) + "] The compare result is incomplete.")
+        if p_CompareResult:
+            return
+
+        if self.__EnableConsoleOutPut:
+            if str(p_Job.m_DiffFormat).upper() == POSIXCompare.FORMAT_UNIFIED and not p_Job.m_CompareUnordered:
+                # dif文件中已经是差异块，直接输出前面的若干个差异块
+                m_nHunks = 0
+                for line in self.__ReadDifFile(p_Job.m_DifFileName):
+                    if line.startswith('@@'):
+                        m_nHunks = m_nHunks + 1
+                    if m_nHunks == 0:
+                        # 文件头中的工作文件和参考文件已经记录过，只记录统计信息
+                        if line.startswith('#'):
+                            logger.write("  ===== Diff summary    [" + line[1:].strip() + "]")
+                    elif self.__ConsoleMaxHunks <= 0 or m_nHunks <= self.__ConsoleMaxHunks:
+                        self.__WriteConsoleLine(line, 1)
+                if 0 < self.__ConsoleMaxHunks < m_nHunks:
+                    logger.write("  ===== Diff summary    [" + str(m_nHunks - self.__ConsoleMaxHunks) +
+                                 " hunks not shown]")
+            elif self.__ConsoleContextLines < 0:
+                # 输出全部的比对结果
+                for line in self.__ReadDifFile(p_Job.m_DifFileName):
+                    self.__WriteConsoleLine(line)
+            else:
+                # 只输出前面的若干个差异块，以及每个差异块前后的几行内容，最后输出汇总信息
+                m_nHunks = 0
+                m_nRemoved = 0
+                m_nAdded = 0
+                for m_Hunk in POSIXCompare.iter_diff_hunks(self.__ReadDifFile(p_Job.m_DifFileName),
+                                                           self.__ConsoleContextLines):
+                    m_nHunks = m_nHunks + 1
+                    m_bShowHunk = self.__ConsoleMaxHunks <= 0 or m_nHunks <= self.__ConsoleMaxHunks
+                    if m_bShowHunk:
+                        logger.write("  ===== Hunk            [" + str(m_nHunks) + "]")
+                    for line in m_Hunk:
+                        if line.startswith('-'):
+                            m_nRemoved = m_nRemoved + 1
+                        elif line.startswith('+'):
+                            m_nAdded = m_nAdded + 1
+                        if m_bShowHunk:
+                            self.__WriteConsoleLine(line)
+                m_szSummary = str(m_nHunks) + " hunks, " + str(m_nRemoved) + " lines removed(-), " + \
+                    str(m_nAdded) + " lines added(+)"
+                if 0 < self.__ConsoleMaxHunks < m_nHunks:
+                    m_szSummary = m_szSummary + ", " + str(m_nHunks - self.__ConsoleMaxHunks) + " hunks not shown"
+                logger.write("  ===== Diff summary    [" + m_szSummary + "]")
+        logger.write("======= Diff file [" + p_Job.m_DifFileName + "] <<<<< ")
+
+    @staticmethod
+    def __WriteConsoleLine(line, p_nPrefixLength=None):
+        # 在Robot的日志中用不同的颜色输出一行比对结果
+        # p_nPrefixLength为行首标记的长度，UNIFIED格式为1
+        # ANNOTATED格式为标记和行号，行号超过6位时宽度会增加，所以根据实际的内容来确定
+        if p_nPrefixLength is None:
+            m_PrefixMatch = RunCompare.AnnotatedPrefix.match(line)
+            p_nPrefixLength = 7 if m_PrefixMatch is None else m_PrefixMatch.end()
+        if line.startswith('-'):
+            logger.write('<font style="color:Black;background-color:#E0E0E0">' + line[0:p_nPrefixLength] + '</font>' +
+                         '<font style="color:white;background-color:Red">' + line[p_nPrefixLength:] + '</font>',
+                         html=True)
+        elif line.startswith('+'):
+            logger.write('<font style="color:Black;background-color:#E0E0E0">' + line[0:p_nPrefixLength] + '</font>' +
+                         '<font style="color:white;background-color:Green">' + line[p_nPrefixLength:] + '</font>',
+                         html=True)
+        elif line.startswith('S') or line.startswith('@@'):
+            logger.write('<font style="color:Black;background-color:#E0E0E0">' + line + '</font>',
+                         html=True)
+        else:
+            logger.write('<font style="color:Black;background-color:#E0E0E0">' + line[0:p_nPrefixLength] + '</font>' +
+                         '<font style="color:Black;background-color:white">' + line[p_nPrefixLength:] + '</font>',
+                         html=True)
+
+    @staticmethod
+    def __ReadDifFile(p_szDifFileName):
+        # 逐行读取dif文件中的比对结果
+        # S行的内容中包含了原始的换行符，写入文件后会多出一个空行，这里需要跳过
+        with open(p_szDifFileName, mode='r', encoding='utf-8') as m_DifFile:
+            for m_Line in m_DifFile:
+                if m_Line == '\n':
+                    continue
+                if m_Line.endswith('\n'):
+                    m_Line = m_Line[:-1]
+                yield m_Line
 
 
 if __name__ == '__main__':
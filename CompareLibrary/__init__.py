@@ -1,17 +1,51 @@
 # -*- coding: utf-8 -*-
+import sys
+import types
 
-from CompareLibrary.RunCompare import RunCompare
+ROBOT_LIBRARY_VERSION = '0.0.19'
 
 
-class CompareLibrary(RunCompare):
-    """ RobotFrameWork 扩展库
+class _CompareLibraryPackage(types.ModuleType):
+    # 包对应的模块对象
+    # 导入子模块CompareLibrary.RunCompare的时候，导入机制会把包的RunCompare属性设置为子模块
+    # 这里改为设置子模块中的关键字类，保证无论以什么顺序导入，CompareLibrary.RunCompare都是关键字类
+    def __setattr__(self, name, value):
+        if name == "RunCompare" and isinstance(value, types.ModuleType):
+            value = value.RunCompare
+        super().__setattr__(name, value)
 
-    `CompareLibrary` 是RobotFrameWork的一个扩展库，通过这个扩展库，我们可以在Robot中比对程序运行结果和参考文件的差异
 
-    https://pypi.org/project/robotframework-comparelibrary/
+sys.modules[__name__].__class__ = _CompareLibraryPackage
 
-    如何利用Robot来执行上述文件：
-    $>  robot [test file]
-    """
-    ROBOT_LIBRARY_DOC_FORMAT = 'TEXT'
-    ROBOT_LIBRARY_VERSION = '0.0.19'
+
+def __getattr__(name):
+    # Robot的关键字库在第一次使用的时候才导入（PEP 562）
+    # 只使用比对引擎（CompareLibrary.CompareEngine）的程序和进程池的子进程不需要导入Robot
+    if name not in ("CompareLibrary", "RunCompare"):
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    from CompareLibrary.RunCompare import RunCompare
+    globals()["RunCompare"] = RunCompare
+    if name == "CompareLibrary":
+
+        class CompareLibrary(RunCompare):
+            """ RobotFrameWork 扩展库
+
+            `CompareLibrary` 是RobotFrameWork的一个扩展库，通过这个扩展库，我们可以在Robot中比对程序运行结果和参考文件的差异
+
+            https://pypi.org/project/robotframework-comparelibrary/
+
+            如何利用Robot来执行上述文件：
+            $>  robot [test file]
+            """
+            ROBOT_LIBRARY_DOC_FORMAT = 'TEXT'
+            ROBOT_LIBRARY_VERSION = ROBOT_LIBRARY_VERSION
+
+        CompareLibrary.__module__ = __name__
+        CompareLibrary.__qualname__ = "CompareLibrary"
+        globals()["CompareLibrary"] = CompareLibrary
+        return CompareLibrary
+    return RunCompare
+
+
+def __dir__():
+    return sorted(list(globals()) + ["CompareLibrary", "RunCompare"])
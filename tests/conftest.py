@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+# 测试直接使用源代码目录中的CompareLibrary，不需要先安装
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
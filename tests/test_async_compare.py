@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# 异步的比对接口：超时返回不完整的比对结果，取消时中止正在执行的比对
+import asyncio
+import threading
+
+import pytest
+
+from CompareLibrary import AsyncCompare as AsyncCompareModule
+from CompareLibrary.AsyncCompare import AsyncCompare
+from CompareLibrary.CompareEngine import CompareAborted
+
+
+@pytest.fixture(autouse=True)
+def work_directory(tmp_path, monkeypatch):
+    # dif和suc文件生成在T_WORK下
+    monkeypatch.setenv("T_WORK", str(tmp_path))
+
+
+def write_lines(p_Path, p_Lines):
+    p_Path.write_text("".join(m_szLine + "\n" for m_szLine in p_Lines), encoding="utf-8")
+    return str(p_Path)
+
+
+def test_compare_many_keeps_the_order(tmp_path):
+    m_szSame = write_lines(tmp_path / "a.log", ["a", "b"])
+    m_szSameRef = write_lines(tmp_path / "a.ref", ["a", "b"])
+    m_szDiff = write_lines(tmp_path / "b.log", ["a", "c"])
+    m_szDiffRef = write_lines(tmp_path / "b.ref", ["a", "b"])
+
+    async def compare():
+        async with AsyncCompare(CollectStats=True) as m_Comparer:
+            return await m_Comparer.compare_many([(m_szDiff, m_szDiffRef), (m_szSame, m_szSameRef)])
+
+    (m_DiffResult, m_SameResult) = asyncio.run(compare())
+    assert (m_DiffResult["result"], m_DiffResult["file"]) == (False, str(tmp_path / "b.dif"))
+    assert (m_SameResult["result"], m_SameResult["file"]) == (True, str(tmp_path / "a.suc"))
+    assert m_DiffResult["message"] is None and m_DiffResult["aborted"] is None
+    assert m_DiffResult["stats"]["compares"] == 1
+
+
+def test_timeout_returns_an_incomplete_result(tmp_path):
+    m_szWork = write_lines(tmp_path / "a.log", ["line %d" % m_nLine for m_nLine in range(20000)])
+    m_szRef = write_lines(tmp_path / "a.ref", ["line %d" % m_nLine for m_nLine in range(20000)])
+
+    async def compare():
+        async with AsyncCompare(ignoreEmptyLine=True, Timeout=0) as m_Comparer:
+            return await m_Comparer.compare_files(m_szWork, m_szRef)
+
+    m_Result = asyncio.run(compare())
+    assert (m_Result["result"], m_Result["aborted"]) == (False, CompareAborted.TIMEOUT)
+    assert not (tmp_path / "a.suc").exists()
+
+
+def test_cancel_stops_the_running_compare(tmp_path, monkeypatch):
+    m_szWork = write_lines(tmp_path / "a.log", ["a"])
+    m_szRef = write_lines(tmp_path / "a.ref", ["b"])
+    m_Started = threading.Event()
+    m_Finished = []
+
+    def blocked_compare(p_Job):
+        # 模拟一个很慢的比对，只能通过截止时间中的取消标志中止
+        m_Started.set()
+        while True:
+            try:
+                p_Job.m_Deadline.check()
+            except CompareAborted as ex:
+                m_Finished.append(ex.reason)
+                raise
+            threading.Event().wait(0.01)
+
+    monkeypatch.setattr(AsyncCompareModule, "_prepare_and_run", blocked_compare)
+
+    async def compare():
+        async with AsyncCompare() as m_Comparer:
+            m_Task = asyncio.ensure_future(m_Comparer.compare_files(m_szWork, m_szRef))
+            while not m_Started.is_set():
+                await asyncio.sleep(0.01)
+            m_Task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await m_Task
+            m_Executor = m_Comparer.m_Executor
+        m_Executor.shutdown(wait=True)
+
+    asyncio.run(compare())
+    assert m_Finished == [CompareAborted.CANCELLED]
+    assert not (tmp_path / "a.dif").exists()
+
+
+def test_closed_comparer_raises(tmp_path):
+    m_Comparer = AsyncCompare()
+    m_Comparer.close()
+    with pytest.raises(RuntimeError):
+        asyncio.run(m_Comparer.compare_files(str(tmp_path / "a.log"), str(tmp_path / "a.ref")))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Compare_Directories：比对目录下所有的文件，内容完全相同的文件不需要比对
+import gzip
+import json
+import os
+
+import pytest
+
+pytest.importorskip("robot")
+
+from CompareLibrary.RunCompare import RunCompare  # noqa: E402
+
+
+@pytest.fixture
+def directories(tmp_path, monkeypatch):
+    m_WorkDirectory = tmp_path / "work"
+    m_ReferenceDirectory = tmp_path / "ref"
+    m_ResultDirectory = tmp_path / "result"
+    for m_Directory in (m_WorkDirectory, m_ReferenceDirectory, m_ResultDirectory):
+        m_Directory.mkdir()
+    monkeypatch.setenv("T_WORK", str(m_ResultDirectory))
+    monkeypatch.delenv("T_LOG", raising=False)
+
+    (m_WorkDirectory / "same.log").write_text("a\nb\n")
+    (m_ReferenceDirectory / "same.ref").write_text("a\nb\n")
+    (m_WorkDirectory / "diff.log").write_text("a\nb\n")
+    (m_ReferenceDirectory / "diff.ref").write_text("a\nc\n")
+    (m_WorkDirectory / "sub").mkdir()
+    (m_ReferenceDirectory / "sub").mkdir()
+    with gzip.open(str(m_WorkDirectory / "sub" / "packed.log.gz"), "wt") as m_File:
+        m_File.write("x\ny\n")
+    (m_ReferenceDirectory / "sub" / "packed.ref").write_text("x\ny\n")
+    (m_WorkDirectory / "orphan.log").write_text("z\n")
+    return m_WorkDirectory, m_ReferenceDirectory, m_ResultDirectory
+
+
+@pytest.mark.parametrize("p_nParallel", [1, 2])
+def test_compare_directories(directories, p_nParallel):
+    (m_WorkDirectory, m_ReferenceDirectory, m_ResultDirectory) = directories
+    m_Library = RunCompare()
+    m_Results = m_Library.Compare_Directories(str(m_WorkDirectory), str(m_ReferenceDirectory),
+                                              p_nParallel=p_nParallel)
+    m_Results = {os.path.relpath(m_Result["work"], str(m_WorkDirectory)): m_Result for m_Result in m_Results}
+    assert sorted(m_Results) == ["diff.log", "orphan.log", "same.log", os.path.join("sub", "packed.log.gz")]
+    assert (m_Results["same.log"]["result"], m_Results["same.log"]["identical"]) == (True, True)
+    assert (m_Results["diff.log"]["result"], m_Results["diff.log"]["identical"]) == (False, False)
+    assert m_Results["orphan.log"]["result"] is False and m_Results["orphan.log"]["message"] is not None
+    # 压缩的结果文件解压后和参考文件比对
+    assert m_Results[os.path.join("sub", "packed.log.gz")]["result"] is True
+    assert (m_ResultDirectory / "same.suc").exists()
+    assert (m_ResultDirectory / "diff.dif").exists()
+    assert (m_ResultDirectory / "sub" / "packed.suc").exists()
+
+    with open(str(m_ResultDirectory / "compare_directories.json"), encoding="utf-8") as m_File:
+        m_Summary = json.load(m_File)
+    assert (m_Summary["total"], m_Summary["passed"], m_Summary["failed"], m_Summary["identical"]) == (4, 2, 2, 1)
+
+
+def test_compare_directories_records_stats_for_identical_files(directories):
+    (m_WorkDirectory, m_ReferenceDirectory, _) = directories
+    m_Library = RunCompare()
+    m_Library.Compare_Enable_Stats("TRUE")
+    m_Library.Compare_Directories(str(m_WorkDirectory), str(m_ReferenceDirectory), p_szPattern="same.log,diff.log",
+                                  p_nParallel=1)
+    m_Stats = m_Library.Compare_Get_Stats("LAST")
+    # 两个文件都计入比对次数，内容相同的文件也记录了检查的耗时
+    assert m_Stats["compares"] == 2
+    assert m_Stats["counters"]["identical_files"] == 1
+    assert "exact_compare" in m_Stats["phases"]
+    assert m_Library.Compare_Get_Stats("SUITE")["compares"] == 2
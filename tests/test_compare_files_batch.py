@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Compare_Files_Batch：并行比对多组文件，结果按照输入的顺序返回，不存在的文件不影响其他文件的比对
+import pytest
+
+pytest.importorskip("robot")
+
+from robot.errors import ExecutionFailed  # noqa: E402
+
+from CompareLibrary.RunCompare import RunCompare  # noqa: E402
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    m_ResultDirectory = tmp_path / "result"
+    m_ResultDirectory.mkdir()
+    monkeypatch.setenv("T_WORK", str(m_ResultDirectory))
+    monkeypatch.delenv("T_LOG", raising=False)
+    for (m_szName, m_szWork, m_szRef) in (("same1", "a\nb\n", "a\nb\n"),
+                                           ("diff1", "a\nb\n", "a\nc\n"),
+                                           ("same2", "x\n# y\n", "x\n"),
+                                           ("diff2", "x\n", "y\n")):
+        (tmp_path / (m_szName + ".log")).write_text(m_szWork)
+        (tmp_path / (m_szName + ".ref")).write_text(m_szRef)
+    return tmp_path, m_ResultDirectory
+
+
+def file_pairs(p_Path, p_Names):
+    return [(str(p_Path / (m_szName + ".log")), str(p_Path / (m_szName + ".ref"))) for m_szName in p_Names]
+
+
+@pytest.mark.parametrize("p_nParallel", [1, 3])
+def test_batch_keeps_the_order(files, p_nParallel):
+    (m_Path, m_ResultDirectory) = files
+    m_Names = ["diff1", "same1", "missing", "diff2", "same2"]
+    m_Library = RunCompare()
+    m_Library.Compare_Skip("#.*")
+    m_Results = m_Library.Compare_Files_Batch(file_pairs(m_Path, m_Names), p_nParallel)
+
+    assert [m_Result["work"] for m_Result in m_Results] == [m_szWork for (m_szWork, _) in file_pairs(m_Path, m_Names)]
+    assert [m_Result["result"] for m_Result in m_Results] == [False, True, False, False, True]
+    assert [m_Result["file"] for m_Result in m_Results] == [
+        str(m_ResultDirectory / "diff1.dif"), str(m_ResultDirectory / "same1.suc"), None,
+        str(m_ResultDirectory / "diff2.dif"), str(m_ResultDirectory / "same2.suc")]
+    # 不存在的文件只在自己的结果中记录错误
+    assert [m_Result["message"] is None for m_Result in m_Results] == [True, True, False, True, True]
+    assert all(m_Result["aborted"] is None for m_Result in m_Results)
+    assert not (m_ResultDirectory / "missing.dif").exists()
+
+
+def test_parallel_and_serial_results_are_the_same(files):
+    (m_Path, m_ResultDirectory) = files
+    m_Names = ["same1", "diff1", "same2", "diff2"]
+    m_Expected = RunCompare().Compare_Files_Batch(file_pairs(m_Path, m_Names), 1)
+    m_szExpectedDif = (m_ResultDirectory / "diff1.dif").read_text()
+    assert RunCompare().Compare_Files_Batch(file_pairs(m_Path, m_Names), 4) == m_Expected
+    assert (m_ResultDirectory / "diff1.dif").read_text() == m_szExpectedDif
+
+
+def test_missing_reference_in_a_batch(files):
+    (m_Path, _) = files
+    m_Results = RunCompare().Compare_Files_Batch(
+        [(str(m_Path / "same1.log"), str(m_Path / "none.ref")), (str(m_Path / "same1.log"), str(m_Path / "same1.ref"))],
+        2)
+    assert (m_Results[0]["result"], m_Results[0]["file"]) == (False, None)
+    assert m_Results[0]["message"] is not None
+    assert (m_Results[1]["result"], m_Results[1]["message"]) == (True, None)
+
+
+def test_manifest_file(files):
+    (m_Path, _) = files
+    (m_Path / "pairs.txt").write_text(
+        "# 当前结果文件, 结果参考文件\n\n" +
+        "%s, %s\n" % file_pairs(m_Path, ["same1"])[0] + "%s %s\n" % file_pairs(m_Path, ["diff1"])[0])
+    m_Results = RunCompare().Compare_Files_Batch(str(m_Path / "pairs.txt"), 1)
+    assert [m_Result["result"] for m_Result in m_Results] == [True, False]
+
+    with pytest.raises(ExecutionFailed):
+        RunCompare().Compare_Files_Batch(str(m_Path / "none.txt"))
+    with pytest.raises(ExecutionFailed):
+        RunCompare().Compare_Files_Batch(["only_one_file.log"])
+
+
+def test_break_with_difference_after_the_whole_batch(files):
+    (m_Path, m_ResultDirectory) = files
+    m_Library = RunCompare()
+    m_Library.Compare_Break_When_Difference("TRUE")
+    with pytest.raises(ExecutionFailed, match="1 of 2"):
+        m_Library.Compare_Files_Batch(file_pairs(m_Path, ["diff1", "same1"]), 2)
+    # 发现差异以后仍然完成了其他文件的比对
+    assert (m_ResultDirectory / "same1.suc").exists()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# 压缩的工作文件和参考文件：按照文件内容判断压缩格式，比对的结果和未压缩的文件相同
+import bz2
+import gzip
+import lzma
+import os
+
+import pytest
+
+from CompareLibrary.CompareEngine import (CompareJob, DiffException, POSIXCompare, ReferenceDirectoryIndex,
+                                          SharedRegistry)
+
+COMPRESSORS = {
+    ".gz": gzip.compress,
+    ".bz2": bz2.compress,
+    ".xz": lzma.compress,
+}
+
+WORK_LINES = ["start", "# skipped", "same 1", "", "WORK ONLY", "same 2", "end"]
+REFERENCE_LINES = ["start", "same 1", "ref only", "same 2", "end"]
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_artifacts():
+    SharedRegistry.m_ReferenceArtifacts.clear()
+    yield
+    SharedRegistry.m_ReferenceArtifacts.clear()
+
+
+def write_lines(p_Path, p_Lines, p_szExtension=None):
+    m_Content = "".join(m_szLine + "\n" for m_szLine in p_Lines).encode("utf-8")
+    if p_szExtension is not None:
+        m_Content = COMPRESSORS[p_szExtension](m_Content)
+    p_Path.write_bytes(m_Content)
+    return str(p_Path)
+
+
+def run_job(p_Path, p_szWork, p_szRef, **kwargs):
+    m_Job = CompareJob(p_szWork, p_szRef, str(p_Path / "out.dif"), str(p_Path / "out.suc"), **kwargs)
+    (m_CompareResult, m_ErrorMessage) = m_Job.run()
+    assert m_ErrorMessage is None
+    m_szDifFile = p_Path / "out.dif"
+    m_szDif = m_szDifFile.read_text(encoding="utf-8") if m_szDifFile.exists() else None
+    for m_szFileName in ("out.dif", "out.suc"):
+        if (p_Path / m_szFileName).exists():
+            os.remove(str(p_Path / m_szFileName))
+    return m_CompareResult, m_szDif
+
+
+@pytest.mark.parametrize("p_szExtension", sorted(COMPRESSORS))
+def test_compression_format_is_detected_from_the_content(tmp_path, p_szExtension):
+    m_szFormat = {".gz": "gzip", ".bz2": "bzip2", ".xz": "xz"}[p_szExtension]
+    # 扩展名不影响判断的结果
+    assert POSIXCompare.compression_format(write_lines(tmp_path / "a.log", ["a"], p_szExtension)) == m_szFormat
+    assert POSIXCompare.compression_format(write_lines(tmp_path / "a.gz", [], p_szExtension)) == m_szFormat
+    assert POSIXCompare.compression_format(write_lines(tmp_path / ("b" + p_szExtension), ["a"])) is None
+    # 以BZh开头的文本不是bzip2文件
+    assert POSIXCompare.compression_format(write_lines(tmp_path / "c.log", ["BZh9 is the bzip2 header"])) is None
+
+
+@pytest.mark.parametrize("p_szExtension", sorted(COMPRESSORS))
+@pytest.mark.parametrize("p_Options", [
+    dict(),
+    dict(skiplines=["#.*"], ignoreEmptyLine=True),
+    dict(skiplines=["#.*"], ignoreEmptyLine=True, CompareStreaming=True),
+    dict(skiplines=["#.*"], ignoreEmptyLine=True, CompareUnordered=True),
+    dict(skiplines=["#.*"], ignoreEmptyLine=True, CompareIgnoreCase=True, ReferenceCache="MEMORY"),
+    dict(skiplines=["#.*"], ignoreEmptyLine=True, DiffFormat="UNIFIED"),
+], ids=["exact", "skip", "streaming", "unordered", "reference_cache", "unified"])
+def test_compressed_files_compare_like_plain_files(tmp_path, p_szExtension, p_Options):
+    m_szWork = write_lines(tmp_path / "a.log", WORK_LINES)
+    m_szRef = write_lines(tmp_path / "a.ref", REFERENCE_LINES)
+    m_szCompressedWork = write_lines(tmp_path / ("b.log" + p_szExtension), WORK_LINES, p_szExtension)
+    m_szCompressedRef = write_lines(tmp_path / ("b.ref" + p_szExtension), REFERENCE_LINES, p_szExtension)
+
+    (m_Expected, m_szExpectedDif) = run_job(tmp_path, m_szWork, m_szRef, **p_Options)
+    assert m_Expected is False
+    for (m_szWorkFile, m_szRefFile) in ((m_szCompressedWork, m_szRef),
+                                        (m_szWork, m_szCompressedRef),
+                                        (m_szCompressedWork, m_szCompressedRef)):
+        (m_Result, m_szDif) = run_job(tmp_path, m_szWorkFile, m_szRefFile, **p_Options)
+        if p_Options.get("DiffFormat") == "UNIFIED":
+            # 差异块的头部包含文件名
+            m_szDif = m_szDif.replace(m_szWorkFile, m_szWork).replace(m_szRefFile, m_szRef)
+        assert (m_Result, m_szDif) == (m_Expected, m_szExpectedDif)
+
+
+def test_identical_compressed_and_plain_files(tmp_path):
+    m_szWork = write_lines(tmp_path / "a.log.gz", REFERENCE_LINES, ".gz")
+    m_szRef = write_lines(tmp_path / "a.ref", REFERENCE_LINES)
+    assert run_job(tmp_path, m_szWork, m_szRef) == (True, None)
+
+
+def test_find_text_file_falls_back_to_compressed_files(tmp_path):
+    m_szPlain = str(tmp_path / "a.log")
+    assert POSIXCompare.find_text_file(m_szPlain) is None
+    m_szCompressed = write_lines(tmp_path / "a.log.xz", ["a"], ".xz")
+    assert POSIXCompare.find_text_file(m_szPlain) == m_szCompressed
+    # 未压缩的文件优先
+    write_lines(tmp_path / "a.log", ["a"])
+    assert POSIXCompare.find_text_file(m_szPlain) == m_szPlain
+
+    assert POSIXCompare.strip_compression_extension("dir/a.log.gz") == "dir/a.log"
+    assert POSIXCompare.strip_compression_extension("dir/a.log.XZ") == "dir/a.log"
+    assert POSIXCompare.strip_compression_extension("dir/a.log") == "dir/a.log"
+
+
+def test_reference_directories_find_compressed_references(tmp_path):
+    m_szFirst = tmp_path / "first"
+    m_szSecond = tmp_path / "second"
+    m_szFirst.mkdir()
+    m_szSecond.mkdir()
+    m_szCompressed = write_lines(m_szSecond / "a.ref.bz2", ["a"], ".bz2")
+    m_Index = ReferenceDirectoryIndex()
+    assert m_Index.resolve([str(m_szFirst), str(m_szSecond)], "a.ref") == m_szCompressed
+    # 前面的目录中的文件优先，即使后面的目录中有未压缩的文件
+    m_szFirstCompressed = write_lines(m_szFirst / "a.ref.gz", ["a"], ".gz")
+    write_lines(m_szSecond / "a.ref", ["a"])
+    m_Index = ReferenceDirectoryIndex()
+    assert m_Index.resolve([str(m_szFirst), str(m_szSecond)], "a.ref") == m_szFirstCompressed
+
+
+def test_zstd_needs_support_in_the_standard_library(tmp_path):
+    m_szFileName = tmp_path / "a.log.zst"
+    # zstd的帧头，只用于判断压缩格式
+    m_szFileName.write_bytes(b'\x28\xb5\x2f\xfd' + b'\x00' * 16)
+    assert POSIXCompare.compression_format(str(m_szFileName)) == "zstd"
+    try:
+        from compression import zstd  # noqa: F401
+    except ImportError:
+        with pytest.raises(DiffException):
+            POSIXCompare.open_text_file(str(m_szFileName))
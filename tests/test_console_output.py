@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# 在屏幕上显示比对结果：默认显示dif文件的全部内容，Compare_Console_Limit限制显示的差异块个数
+import sys
+
+import pytest
+
+pytest.importorskip("robot")
+
+from CompareLibrary.RunCompare import RunCompare  # noqa: E402
+
+
+class RecordingLogger:
+    # 代替robot.api.logger，记录所有写入日志的内容
+    def __init__(self):
+        self.m_Messages = []
+
+    def write(self, p_szMessage, *args, **kwargs):
+        self.m_Messages.append(p_szMessage)
+
+    def info(self, p_szMessage, *args, **kwargs):
+        self.m_Messages.append(p_szMessage)
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setenv("T_WORK", str(tmp_path))
+    monkeypatch.delenv("T_LOG", raising=False)
+    m_Logger = RecordingLogger()
+    monkeypatch.setattr(sys.modules["CompareLibrary.RunCompare"], "logger", m_Logger)
+    # 30个差异块，每两个差异块之间有10行相同的内容
+    m_WorkLines = []
+    m_RefLines = []
+    for m_nHunk in range(30):
+        m_WorkLines.extend(["same %d %d" % (m_nHunk, m_nLine) for m_nLine in range(10)] + ["work %d" % m_nHunk])
+        m_RefLines.extend(["same %d %d" % (m_nHunk, m_nLine) for m_nLine in range(10)] + ["ref %d" % m_nHunk])
+    (tmp_path / "a.log").write_text("".join(m_szLine + "\n" for m_szLine in m_WorkLines))
+    (tmp_path / "a.ref").write_text("".join(m_szLine + "\n" for m_szLine in m_RefLines))
+    m_Library = RunCompare()
+    m_Library.Compare_Enable_ConsoleOutput("TRUE")
+    return m_Library, m_Logger
+
+
+def compare(p_Path, p_Library):
+    (m_Library, m_Logger) = p_Library
+    del m_Logger.m_Messages[:]
+    assert m_Library.Compare_Files(str(p_Path / "a.log"), str(p_Path / "a.ref")) is False
+    return m_Logger.m_Messages
+
+
+def shown(p_Messages, p_szText):
+    return sum(1 for m_szMessage in p_Messages if p_szText in m_szMessage)
+
+
+def test_console_shows_the_whole_dif_file_by_default(tmp_path, library):
+    m_Messages = compare(tmp_path, library)
+    # 相同的行和差异的行全部显示，没有差异块和截断的标记
+    assert shown(m_Messages, "same ") == 300
+    assert shown(m_Messages, "work ") == 30 and shown(m_Messages, "ref ") == 30
+    assert shown(m_Messages, "===== Hunk") == 0
+    assert shown(m_Messages, "not shown") == 0
+
+
+def test_console_limit_caps_the_hunks(tmp_path, library):
+    library[0].Compare_Console_Limit(20, 3)
+    m_Messages = compare(tmp_path, library)
+    assert shown(m_Messages, "===== Hunk") == 20
+    assert shown(m_Messages, "work ") == 20 and shown(m_Messages, "ref ") == 20
+    # 每个差异块前后最多3行相同的内容
+    assert shown(m_Messages, "same ") == 20 * 6
+    assert [m_szMessage for m_szMessage in m_Messages if "Diff summary" in m_szMessage] == \
+        ["  ===== Diff summary    [30 hunks, 30 lines removed(-), 30 lines added(+), 10 hunks not shown]"]
+    # dif文件中仍然是完整的比对结果
+    assert (tmp_path / "a.dif").read_text().count("\n") == 330 + 30
+
+
+def test_console_limit_in_unified_format(tmp_path, library):
+    library[0].Compare_Diff_Format("UNIFIED", 1)
+    library[0].Compare_Console_Limit(5)
+    m_Messages = compare(tmp_path, library)
+    assert shown(m_Messages, "work ") == 5
+    assert shown(m_Messages, "[25 hunks not shown]") == 1
+
+
+def test_negative_limits_are_unlimited(tmp_path, library):
+    library[0].Compare_Console_Limit(2, 1)
+    assert shown(compare(tmp_path, library), "not shown") == 1
+    library[0].Compare_Console_Limit(-1, 1)
+    m_Messages = compare(tmp_path, library)
+    assert shown(m_Messages, "===== Hunk") == 30 and shown(m_Messages, "not shown") == 0
+    # 每个差异块之前的一行，以及除了最后一个差异块以外之后的一行
+    assert shown(m_Messages, "same ") == 30 + 29
+    library[0].Compare_Console_Limit(-1, -1)
+    assert shown(compare(tmp_path, library), "same ") == 300
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# 比对的截止时间：读取文件、映射行ID以及去掉相同的头尾的时候也会检查截止时间
+import pickle
+from itertools import islice
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare, CompareAborted, CompareDeadline, CompareJob
+from CompareLibrary.CompareEngine import ReferenceArtifactCache, SharedRegistry
+
+
+def write_lines(p_Path, p_nLines):
+    p_Path.write_text("".join("line %d\n" % m_nLine for m_nLine in range(p_nLines)), encoding="utf-8")
+
+
+def test_timeout_while_reading(tmp_path):
+    # 两个文件完全相同，比对本身不需要做任何事情，超时只能在读取的阶段被发现
+    write_lines(tmp_path / "a.log", 20000)
+    write_lines(tmp_path / "a.ref", 20000)
+    m_Comparer = POSIXCompare()
+    m_Comparer.m_Deadline = CompareDeadline(0)
+    with pytest.raises(CompareAborted) as m_Error:
+        m_Comparer.compare_text_files(str(tmp_path / "a.log"), str(tmp_path / "a.ref"), ignoreEmptyLine=True)
+    assert m_Error.value.reason == CompareAborted.TIMEOUT
+
+
+def test_deadline_checked_between_batches():
+    # 每一批行取出之前检查一次截止时间
+    m_Deadline = CompareDeadline(3600)
+    m_Lines = POSIXCompare.iter_with_deadline(range(3 * POSIXCompare.DEADLINE_CHECK_LINES), m_Deadline)
+    assert len(list(islice(m_Lines, POSIXCompare.DEADLINE_CHECK_LINES))) == POSIXCompare.DEADLINE_CHECK_LINES
+    m_Deadline.m_nDeadline = 0.0
+    with pytest.raises(CompareAborted):
+        list(m_Lines)
+
+
+def test_no_deadline_returns_input():
+    m_Lines = ["a", "b"]
+    assert POSIXCompare.iter_with_deadline(m_Lines, None) is m_Lines
+
+
+def test_job_timeout(tmp_path):
+    write_lines(tmp_path / "a.log", 20000)
+    write_lines(tmp_path / "a.ref", 20000)
+    m_Job = CompareJob(str(tmp_path / "a.log"), str(tmp_path / "a.ref"),
+                       str(tmp_path / "a.dif"), str(tmp_path / "a.suc"),
+                       ignoreEmptyLine=True, Timeout=0)
+    (m_CompareResult, m_ErrorMessage) = m_Job.run()
+    assert m_CompareResult is False
+    assert m_Job.m_Aborted == CompareAborted.TIMEOUT
+    assert not (tmp_path / "a.suc").exists()
+
+
+def cancelled_deadline():
+    m_Deadline = CompareDeadline(None)
+    m_Deadline.cancel()
+    return m_Deadline
+
+
+def test_cancel_while_reading_unordered_reference(tmp_path):
+    # 工作文件只有几行，取消只能在读取参考文件的时候被发现
+    write_lines(tmp_path / "a.log", 10)
+    write_lines(tmp_path / "a.ref", 20000)
+    m_Comparer = POSIXCompare()
+    m_Comparer.m_Deadline = cancelled_deadline()
+    with pytest.raises(CompareAborted) as m_Error:
+        m_Comparer.compare_text_files_unordered(str(tmp_path / "a.log"), str(tmp_path / "a.ref"))
+    assert m_Error.value.reason == CompareAborted.CANCELLED
+
+
+def test_cancel_while_building_reference_artifact(tmp_path):
+    # 预处理参考文件的时候被取消，不保存不完整的预处理结果
+    write_lines(tmp_path / "a.ref", 20000)
+    m_szReferenceFile = str(tmp_path / "a.ref")
+    with pytest.raises(CompareAborted) as m_Error:
+        SharedRegistry.reference_artifact(m_szReferenceFile, ReferenceArtifactCache(p_bDiskCache=False),
+                                          ignoreEmptyLine=True, p_Deadline=cancelled_deadline())
+    assert m_Error.value.reason == CompareAborted.CANCELLED
+    assert SharedRegistry.reference_artifact(m_szReferenceFile, None, ignoreEmptyLine=True) is None
+
+
+def test_deadline_checked_in_diff():
+    m_Deadline = CompareDeadline(0)
+    with pytest.raises(CompareAborted):
+        POSIXCompare.myers_diff(3, 3, lambda i, j: False, m_Deadline)
+    with pytest.raises(CompareAborted):
+        POSIXCompare.lcs_diff(3, 3, lambda i, j: False, m_Deadline)
+
+
+def test_cancel_flag_is_not_passed_to_worker_processes():
+    m_Deadline = cancelled_deadline()
+    m_Copy = pickle.loads(pickle.dumps(m_Deadline))
+    assert m_Deadline.cancelled() and not m_Copy.cancelled()
+    m_Copy.check()
+
+
+def run_limited_job(p_Path, p_nMaxDifferences, **kwargs):
+    m_Job = CompareJob(str(p_Path / "a.log"), str(p_Path / "a.ref"),
+                       str(p_Path / "a.dif"), str(p_Path / "a.suc"),
+                       ignoreEmptyLine=True, MaxDifferences=p_nMaxDifferences, **kwargs)
+    (m_CompareResult, m_ErrorMessage) = m_Job.run()
+    assert m_ErrorMessage is None
+    m_szDifFile = p_Path / "a.dif"
+    m_szDif = m_szDifFile.read_text(encoding="utf-8") if m_szDifFile.exists() else None
+    for m_szFileName in ("a.dif", "a.suc"):
+        if (p_Path / m_szFileName).exists():
+            (p_Path / m_szFileName).unlink()
+    return m_CompareResult, m_Job.m_Aborted, m_szDif
+
+
+@pytest.mark.parametrize("p_bStreaming", [False, True])
+def test_max_differences(tmp_path, p_bStreaming):
+    (tmp_path / "a.log").write_text("".join("a%d\n" % m_nLine for m_nLine in range(20)), encoding="utf-8")
+    (tmp_path / "a.ref").write_text("".join(("a%d\n" if m_nLine % 2 else "b%d\n") % m_nLine
+                                            for m_nLine in range(20)), encoding="utf-8")
+
+    # 0表示只判断是否相同，在第一个差异处停止
+    (m_CompareResult, m_Aborted, m_szDif) = run_limited_job(tmp_path, 0, CompareStreaming=p_bStreaming)
+    assert (m_CompareResult, m_Aborted) == (False, CompareAborted.TRUNCATED)
+    assert "first difference" in m_szDif
+
+    # 差异超过限制的时候，dif文件中只有开头的部分差异
+    (m_CompareResult, m_Aborted, m_szDif) = run_limited_job(tmp_path, 3, CompareStreaming=p_bStreaming)
+    assert (m_CompareResult, m_Aborted) == (False, CompareAborted.TRUNCATED)
+    m_DiffRows = [m_szRow for m_szRow in m_szDif.splitlines() if m_szRow[:1] in "+-"]
+    assert len(m_DiffRows) == 3 and "after 3 differing lines" in m_szDif
+
+    # 没有超过限制的时候，结果和不限制时相同
+    (m_CompareResult, m_Aborted, m_szDif) = run_limited_job(tmp_path, 100, CompareStreaming=p_bStreaming)
+    assert (m_CompareResult, m_Aborted, m_szDif) == \
+        run_limited_job(tmp_path, None, CompareStreaming=p_bStreaming)
+    assert m_Aborted is None and len([m_szRow for m_szRow in m_szDif.splitlines() if m_szRow[:1] in "+-"]) == 20
+
+    # 内容相同的时候比对成功
+    (tmp_path / "a.ref").write_text((tmp_path / "a.log").read_text(encoding="utf-8"), encoding="utf-8")
+    assert run_limited_job(tmp_path, 0, CompareStreaming=p_bStreaming) == (True, None, None)
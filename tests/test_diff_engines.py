@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# 比对算法：各种算法生成的编辑脚本都是合法的，差异的行数相同
+import random
+import time
+import tracemalloc
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare
+
+
+def full_matrix_lcs(n, m, equal):
+    # 原有的全矩阵LCS算法，作为lcs_diff的参考实现，回溯的规则和原有版本相同
+    c = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n):
+        for j in range(m):
+            if equal(i, j):
+                c[i][j] = 1 + c[i - 1][j - 1]
+            else:
+                c[i][j] = max(c[i][j - 1], c[i - 1][j])
+    m_DiffOps = []
+    (i, j) = (n - 1, m - 1)
+    while i >= 0 or j >= 0:
+        if i < 0:
+            m_DiffOps.append(('+', j))
+            j = j - 1
+        elif j < 0:
+            m_DiffOps.append(('-', i))
+            i = i - 1
+        elif equal(i, j):
+            m_DiffOps.append((' ', i, j))
+            (i, j) = (i - 1, j - 1)
+        elif c[i][j - 1] >= c[i - 1][j]:
+            m_DiffOps.append(('+', j))
+            j = j - 1
+        else:
+            m_DiffOps.append(('-', i))
+            i = i - 1
+    return m_DiffOps[::-1]
+
+
+def script_lines(p_DiffOps):
+    # 编辑脚本中每一项对应的行：相同的行为(i, j)，删除的行为i，增加的行为j
+    m_Lines = []
+    for (m_Op, i, j) in p_DiffOps:
+        if m_Op == ' ':
+            m_Lines.append((' ', i, j))
+        elif m_Op == '-':
+            m_Lines.append(('-', i))
+        else:
+            m_Lines.append(('+', j))
+    return m_Lines
+
+
+def random_lines(p_Random):
+    n = p_Random.randint(0, 40)
+    m = p_Random.randint(0, 40)
+    return ([p_Random.choice("abcd") for _ in range(n)],
+            [p_Random.choice("abcd") for _ in range(m)])
+
+
+@pytest.mark.parametrize("p_nSeed", range(200))
+def test_lcs_diff_matches_full_matrix(p_nSeed):
+    # 分段回溯的LCS和全矩阵算法对于相同的输入生成相同的编辑脚本
+    m_Random = random.Random(p_nSeed)
+    (x, y) = random_lines(m_Random)
+    equal = POSIXCompare().line_comparator(x, y)
+    assert script_lines(POSIXCompare.lcs_diff(len(x), len(y), equal)) == \
+        full_matrix_lcs(len(x), len(y), equal)
+
+
+def check_script(p_DiffOps, n, m, equal):
+    # 编辑脚本必须按顺序覆盖两边的每一行，相同的行必须相等，返回差异的行数
+    (m_nWork, m_nRef, m_nDiff) = (0, 0, 0)
+    for (m_Op, i, j) in p_DiffOps:
+        if m_Op == ' ':
+            assert (i, j) == (m_nWork, m_nRef) and equal(i, j)
+            (m_nWork, m_nRef) = (m_nWork + 1, m_nRef + 1)
+        elif m_Op == '-':
+            assert i == m_nWork
+            (m_nWork, m_nDiff) = (m_nWork + 1, m_nDiff + 1)
+        else:
+            assert m_Op == '+' and j == m_nRef
+            (m_nRef, m_nDiff) = (m_nRef + 1, m_nDiff + 1)
+    assert (m_nWork, m_nRef) == (n, m)
+    return m_nDiff
+
+
+def random_masked_lines(p_Random):
+    # 参考文件中有一部分是正则表达式
+    (x, y) = random_lines(p_Random)
+    y = [p_Random.choice(["[ab]", "c.*", "(a|d)"]) if p_Random.random() < 0.2 else m_Line for m_Line in y]
+    return x, y
+
+
+@pytest.mark.parametrize("p_nSeed", range(100))
+@pytest.mark.parametrize("p_bMask", [False, True])
+def test_engines_agree_on_the_number_of_differences(p_nSeed, p_bMask):
+    # Myers和LCS都是最短的编辑脚本，分段比对的锚点总是作为相同的行，差异可能更多但脚本同样合法
+    m_Random = random.Random(p_nSeed)
+    (x, y) = random_masked_lines(m_Random) if p_bMask else random_lines(m_Random)
+    m_Comparer = POSIXCompare()
+    m_Comparer.m_ParallelWorkers = 2
+    equal = m_Comparer.line_comparator(x, y, p_compare_maskEnabled=p_bMask)
+
+    m_nMyers = check_script(POSIXCompare.myers_diff(len(x), len(y), equal), len(x), len(y), equal)
+    m_nLCS = check_script(POSIXCompare.lcs_diff(len(x), len(y), equal), len(x), len(y), equal)
+    assert m_nMyers == m_nLCS
+    for m_szEngine in ("MYERS", "LCS"):
+        m_DiffOps = m_Comparer.parallel_diff(x, y, p_compare_maskEnabled=p_bMask, p_compare_engine=m_szEngine)
+        assert check_script(m_DiffOps, len(x), len(y), equal) >= m_nMyers
+
+
+def test_parallel_diff_in_worker_processes():
+    m_Random = random.Random(0)
+    y = ["line %d" % m_nLine for m_nLine in range(3000)]
+    x = list(y)
+    for _ in range(40):
+        m_nPos = m_Random.randrange(len(x))
+        x[m_nPos:m_nPos + 1] = ["changed %d" % m_nPos, "added %d" % m_nPos]
+    m_Comparer = POSIXCompare()
+    m_Comparer.m_ParallelWorkers = 2
+    # 强制使用进程池，而不是在当前进程中比对很少的差异
+    m_Comparer.PARALLEL_MIN_SEGMENT_LINES = 0
+    m_Comparer.PARALLEL_TASKS_PER_WORKER = 4
+    equal = m_Comparer.line_comparator(x, y)
+    m_DiffOps = m_Comparer.parallel_diff(x, y)
+    assert check_script(m_DiffOps, len(x), len(y), equal) == \
+        check_script(POSIXCompare.myers_diff(len(x), len(y), equal), len(x), len(y), equal)
+
+
+@pytest.mark.parametrize("p_nSeed", range(50))
+def test_streaming_compare_reconstructs_both_files(tmp_path, p_nSeed):
+    # 流式比对按窗口比对差异部分，结果同样覆盖两个文件的每一行，和完整比对的结论相同
+    m_Random = random.Random(p_nSeed)
+    (x, y) = random_lines(m_Random)
+    for (m_szFileName, m_Lines) in (("a.log", x), ("a.ref", y)):
+        (tmp_path / m_szFileName).write_text("".join(m_Line + "\n" for m_Line in m_Lines), encoding="utf-8")
+    m_szWork = str(tmp_path / "a.log")
+    m_szRef = str(tmp_path / "a.ref")
+
+    (m_Result, m_Rows) = POSIXCompare().compare_text_files(m_szWork, m_szRef)
+    m_nDiff = sum(1 for m_Row in m_Rows if m_Row[0] in "+-")
+    m_Rows = list(POSIXCompare().compare_text_files_streaming(m_szWork, m_szRef, WindowSize=4))
+    assert [m_Row[8:] for m_Row in m_Rows if m_Row[0] in " -"] == x
+    assert [m_Row[8:] for m_Row in m_Rows if m_Row[0] in " +"] == y
+    m_nStreamingDiff = sum(1 for m_Row in m_Rows if m_Row[0] in "+-")
+    assert m_nStreamingDiff >= m_nDiff
+    assert (m_nStreamingDiff == 0) == m_Result
+
+
+def check_prefix(p_DiffOps, equal):
+    # 编辑脚本的开头部分：从两个文件的开头连续覆盖每一行，返回差异的行数
+    (m_nWork, m_nRef, m_nDiff) = (0, 0, 0)
+    for (m_Op, i, j) in p_DiffOps:
+        if m_Op == ' ':
+            assert (i, j) == (m_nWork, m_nRef) and equal(i, j)
+            (m_nWork, m_nRef) = (m_nWork + 1, m_nRef + 1)
+        elif m_Op == '-':
+            assert i == m_nWork
+            (m_nWork, m_nDiff) = (m_nWork + 1, m_nDiff + 1)
+        else:
+            assert j == m_nRef
+            (m_nRef, m_nDiff) = (m_nRef + 1, m_nDiff + 1)
+    return m_nDiff
+
+
+@pytest.mark.parametrize("p_nSeed", range(100))
+def test_myers_diff_prefix(p_nSeed):
+    # 差异不超过上限时返回None，否则返回正好包含上限个差异的编辑脚本的开头部分
+    m_Random = random.Random(p_nSeed)
+    (x, y) = random_lines(m_Random)
+    equal = POSIXCompare().line_comparator(x, y)
+    m_nDiff = check_script(POSIXCompare.myers_diff(len(x), len(y), equal), len(x), len(y), equal)
+    for m_nMaxDifferences in (0, 1, m_Random.randint(0, 40), m_nDiff - 1, m_nDiff):
+        if m_nMaxDifferences < 0:
+            continue
+        m_DiffOps = POSIXCompare.myers_diff_prefix(len(x), len(y), equal, m_nMaxDifferences)
+        if m_nDiff <= m_nMaxDifferences:
+            assert m_DiffOps is None
+        else:
+            assert check_prefix(m_DiffOps, equal) == m_nMaxDifferences
+
+
+def test_myers_diff_prefix_memory_does_not_grow_with_the_limit():
+    # 保存每一轮的对角线时，内存和上限的平方成正比（这里大约是1.5MB）
+    # 行号都小于257，是Python缓存的小整数，统计的只是保存对角线使用的内存
+    x = ["a%d" % i for i in range(200)]
+    y = ["b%d" % i for i in range(200)]
+    equal = POSIXCompare().line_comparator(x, y)
+    tracemalloc.start()
+    try:
+        m_DiffOps = POSIXCompare.myers_diff_prefix(len(x), len(y), equal, 300)
+        (_, m_nPeak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert check_prefix(m_DiffOps, equal) == 300
+    assert m_nPeak < 200 * 1024
+
+
+def test_myers_diff_prefix_runtime_for_a_large_limit():
+    # 两个完全不同的大文件，查找几千个差异只需要几秒
+    x = ["a%d" % i for i in range(20000)]
+    y = ["b%d" % i for i in range(20000)]
+    equal = POSIXCompare().line_comparator(x, y)
+    m_nStart = time.perf_counter()
+    m_DiffOps = POSIXCompare.myers_diff_prefix(len(x), len(y), equal, 2000)
+    assert time.perf_counter() - m_nStart < 15
+    assert check_prefix(m_DiffOps, equal) == 2000
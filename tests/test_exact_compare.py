@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# 按照字节直接比对：没有任何比对选项的时候使用，比对的结果和逐行读取文件后比对相同
+import gzip
+import random
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare
+
+
+def write_bytes(p_Path, p_Content):
+    p_Path.write_bytes(p_Content)
+    return str(p_Path)
+
+
+def compare_exact(p_Path, p_Work, p_Ref, **kwargs):
+    m_szWork = write_bytes(p_Path / "a.log", p_Work)
+    m_szRef = write_bytes(p_Path / "a.ref", p_Ref)
+    m_Result = POSIXCompare().compare_exact_files(m_szWork, m_szRef, **kwargs)
+    if m_Result is None:
+        return None
+    return m_Result[0], list(m_Result[1])
+
+
+def compare_lines(p_Path, p_Work, p_Ref, **kwargs):
+    # 不使用字节比对，逐行读取文件后比对
+    m_szWork = write_bytes(p_Path / "a.log", p_Work)
+    m_szRef = write_bytes(p_Path / "a.ref", p_Ref)
+    m_Comparer = POSIXCompare()
+    m_Comparer.compare_exact_files = lambda *args, **kwargs: None
+    (m_CompareResult, m_Rows) = m_Comparer.compare_text_files(m_szWork, m_szRef, **kwargs)
+    return m_CompareResult, list(m_Rows)
+
+
+def test_identical_files(tmp_path):
+    assert compare_exact(tmp_path, b"a\nb\n", b"a\nb\n") == (True, [])
+    # 只有一行并且没有换行符的小文件
+    assert compare_exact(tmp_path, b"a", b"a") == (True, [])
+
+
+def test_files_that_differ_only_in_length(tmp_path):
+    assert compare_exact(tmp_path, b"a\nb\n", b"a\nb\nc\n") == (False, ["      1 a", "      2 b", "+     3 c"])
+    assert compare_exact(tmp_path, b"a\nb\nc\n", b"a\nb\n") == (False, ["      1 a", "      2 b", "-     3 c"])
+    # 只差最后的换行符的时候两个文件的内容相同
+    assert compare_exact(tmp_path, b"a\nb", b"a\nb\n") == (True, ["      1 a", "      2 b"])
+
+
+def test_difference_at_the_first_and_the_last_byte(tmp_path):
+    assert compare_exact(tmp_path, b"xa\nb\nc\n", b"ya\nb\nc\n") == \
+        (False, ["-     1 xa", "+     1 ya", "      2 b", "      3 c"])
+    assert compare_exact(tmp_path, b"a\nb\ncx\n", b"a\nb\ncy\n") == \
+        (False, ["      1 a", "      2 b", "-     3 cx", "+     3 cy"])
+    assert compare_exact(tmp_path, b"a\nb\ncx", b"a\nb\ncy") == \
+        (False, ["      1 a", "      2 b", "-     3 cx", "+     3 cy"])
+
+
+def test_files_that_need_the_line_compare(tmp_path):
+    # 空文件、包含回车符的文件和压缩文件不能按照字节比对
+    assert compare_exact(tmp_path, b"", b"") is None
+    assert compare_exact(tmp_path, b"a\n", b"") is None
+    assert compare_exact(tmp_path, b"a\r\nb\r\n", b"a\nc\n") is None
+    assert compare_exact(tmp_path, gzip.compress(b"a\n"), b"a\n") is None
+    # 包含回车符但是内容完全相同的文件不需要逐行比对
+    assert compare_exact(tmp_path, b"a\r\n", b"a\r\n") == (True, [])
+
+
+def random_content(p_Random):
+    m_Lines = [p_Random.choice(["a", "b", "c", "", "d e"]) for _ in range(p_Random.randint(1, 30))]
+    m_Content = "\n".join(m_Lines)
+    if p_Random.random() < 0.7:
+        m_Content = m_Content + "\n"
+    return m_Content.encode("utf-8")
+
+
+@pytest.mark.parametrize("p_nSeed", range(100))
+@pytest.mark.parametrize("p_Options", [
+    dict(),
+    dict(CompareEngine="LCS"),
+    dict(OutputFormat="UNIFIED", ContextLines=1),
+], ids=["myers", "lcs", "unified"])
+def test_same_rows_as_the_line_compare(tmp_path, p_nSeed, p_Options):
+    m_Random = random.Random(p_nSeed)
+    m_Ref = random_content(m_Random)
+    m_Work = bytearray(m_Ref)
+    # 在参考文件的基础上随机修改几个字节，保证两个文件有相同的头部和尾部
+    for _ in range(m_Random.randint(0, 4)):
+        m_nPos = m_Random.randint(0, len(m_Work))
+        if m_Random.random() < 0.5 and m_nPos < len(m_Work):
+            del m_Work[m_nPos]
+        else:
+            m_Work[m_nPos:m_nPos] = m_Random.choice([b"x", b"\n", b"b\n"])
+    if not m_Work or bytes(m_Work) == m_Ref:
+        # 空文件不使用字节比对，完全相同的文件直接返回空的比对结果
+        m_Work[0:0] = b"x"
+    m_Expected = compare_lines(tmp_path, bytes(m_Work), m_Ref, **p_Options)
+    assert compare_exact(tmp_path, bytes(m_Work), m_Ref, **p_Options) == m_Expected
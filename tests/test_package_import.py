@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# 包的导入方式：无论以什么顺序导入，CompareLibrary.RunCompare都是关键字类，只使用比对引擎时不导入Robot
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(p_szCode):
+    # 在新的解释器中执行，避免受到当前进程中已经导入的模块的影响
+    m_Env = dict(os.environ)
+    m_Env["PYTHONPATH"] = ROOT
+    m_Result = subprocess.run([sys.executable, "-c", p_szCode], env=m_Env, cwd=ROOT,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert m_Result.returncode == 0, m_Result.stderr
+    return m_Result.stdout.strip()
+
+
+@pytest.mark.parametrize("p_szImports", [
+    "import CompareLibrary.RunCompare\nfrom CompareLibrary import RunCompare",
+    "from CompareLibrary import RunCompare\nimport CompareLibrary.RunCompare",
+    "from CompareLibrary.RunCompare import RunCompare\nimport CompareLibrary\nRunCompare = CompareLibrary.RunCompare",
+    "import CompareLibrary.RunCompare as RunCompare",
+    "import CompareLibrary\nRunCompare = CompareLibrary.RunCompare",
+])
+def test_runcompare_is_keyword_class(p_szImports):
+    m_szOutput = run_python(p_szImports + "\n"
+                            "import CompareLibrary\n"
+                            "print(isinstance(RunCompare, type), CompareLibrary.RunCompare is RunCompare, "
+                            "issubclass(CompareLibrary.CompareLibrary, RunCompare))")
+    assert m_szOutput == "True True True"
+
+
+def test_engine_does_not_import_robot():
+    m_szOutput = run_python("import sys\n"
+                            "from CompareLibrary.CompareEngine import POSIXCompare\n"
+                            "print('robot' in sys.modules)")
+    assert m_szOutput == "False"
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# 参考文件预处理结果：缓存的结果在多次比对中共用，比对的结果和不使用缓存时相同
+import os
+
+import pytest
+
+from CompareLibrary.CompareEngine import CompareJob, POSIXCompare, ReferenceArtifactCache, SharedRegistry
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_artifacts():
+    SharedRegistry.m_ReferenceArtifacts.clear()
+    yield
+    SharedRegistry.m_ReferenceArtifacts.clear()
+
+
+# 没有任何比对选项的时候按照字节直接比对，不使用参考文件的预处理结果
+PREPROCESS = dict(ignoreEmptyLine=True)
+
+
+def write_lines(p_Path, p_Lines):
+    p_Path.write_text("".join(m_szLine + "\n" for m_szLine in p_Lines), encoding="utf-8")
+
+
+def run_job(p_Path, p_szWork, p_szRef, **kwargs):
+    m_Job = CompareJob(p_szWork, p_szRef,
+                       str(p_Path / "out.dif"), str(p_Path / "out.suc"), CollectStats=True, **kwargs)
+    (m_CompareResult, m_ErrorMessage) = m_Job.run()
+    assert m_ErrorMessage is None
+    m_szDifFile = p_Path / "out.dif"
+    m_szDif = m_szDifFile.read_text(encoding="utf-8") if m_szDifFile.exists() else None
+    for m_szFileName in ("out.dif", "out.suc"):
+        if (p_Path / m_szFileName).exists():
+            os.remove(str(p_Path / m_szFileName))
+    return m_CompareResult, m_szDif, m_Job.m_Stats.m_Counters
+
+
+def test_intern_lines_with_base_ids_does_not_modify_them():
+    m_BaseLineIDs = {"A": 0, "B": 1}
+    m_LineIDs = {}
+    assert POSIXCompare.intern_lines(["b", "c", "a", "c", "d"], m_LineIDs, True,
+                                     p_BaseLineIDs=m_BaseLineIDs) == [1, 2, 0, 2, 3]
+    assert m_BaseLineIDs == {"A": 0, "B": 1}
+    assert m_LineIDs == {"C": 2, "D": 3}
+
+
+@pytest.mark.parametrize("ignorecase", [False, True])
+def test_shared_artifact_is_reused_and_unchanged(tmp_path, ignorecase):
+    write_lines(tmp_path / "a.ref", ["head", "Line 1", "x.*", "line 2", "tail"])
+    write_lines(tmp_path / "a.log", ["head", "LINE 1", "xyz", "new", "tail"])
+    write_lines(tmp_path / "b.log", ["other", "line 2", "tail", "more"])
+    m_szRef = str(tmp_path / "a.ref")
+    m_Options = dict(CompareIgnoreCase=ignorecase, CompareWithMask=True)
+
+    m_Expected = [run_job(tmp_path, str(tmp_path / m_szWork), m_szRef, **m_Options)[:2]
+                  for m_szWork in ("a.log", "b.log")]
+    for m_nRound in range(2):
+        for (m_szWork, m_ExpectedResult) in zip(("a.log", "b.log"), m_Expected):
+            (m_Result, m_szDif, m_Counters) = run_job(tmp_path, str(tmp_path / m_szWork), m_szRef,
+                                                       ReferenceCache="MEMORY", **m_Options)
+            assert (m_Result, m_szDif) == m_ExpectedResult
+
+    # 只有第一次比对生成了预处理结果，之后的比对都直接使用进程内的结果
+    assert SharedRegistry.m_ReferenceArtifacts.stats()["misses"] == 1
+    assert m_Counters.get("reference_memory_hits") == 1
+    m_Artifact = SharedRegistry.reference_artifact(m_szRef, None, CompareIgnoreCase=ignorecase)
+    assert m_Artifact.m_KeyIDs == dict(zip(m_Artifact.m_Keys, range(len(m_Artifact.m_Keys))))
+
+
+def test_loaded_artifact_builds_the_same_ids(tmp_path):
+    write_lines(tmp_path / "a.ref", ["a", "b", "a", "c"])
+    m_szRef = str(tmp_path / "a.ref")
+    m_Cache = ReferenceArtifactCache(str(tmp_path / "cache"))
+    m_Built = m_Cache.get(m_szRef)
+    m_Loaded = m_Cache.get(m_szRef)
+    assert m_Loaded is not m_Built
+    assert m_Loaded.m_KeyIDs == m_Built.m_KeyIDs == {"a": 0, "b": 1, "c": 2}
+
+
+def test_sidecar_cache_hit_and_invalidation(tmp_path):
+    write_lines(tmp_path / "a.ref", ["a", "b", "c"])
+    write_lines(tmp_path / "a.log", ["a", "b", "c"])
+    m_szWork = str(tmp_path / "a.log")
+    m_szRef = str(tmp_path / "a.ref")
+
+    # 第一次比对生成参考文件旁边的缓存文件，之后的比对直接读取
+    (m_Result, _, m_Counters) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    assert m_Result is True and m_Counters.get("reference_cache_misses") == 1
+    assert len(os.listdir(str(tmp_path / ReferenceArtifactCache.SIDECAR_DIRECTORY))) == 1
+    SharedRegistry.m_ReferenceArtifacts.clear()
+    (m_Result, _, m_Counters) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    assert m_Result is True and m_Counters.get("reference_cache_hits") == 1
+
+    # 参考文件的大小和修改时间变化以后，进程内和磁盘上的预处理结果都不再使用
+    write_lines(tmp_path / "a.ref", ["a", "x", "c", "d"])
+    (m_Result, m_szDif, m_Counters) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    assert m_Result is False and "x" in m_szDif
+    assert m_Counters.get("reference_cache_misses") == 1 and "reference_memory_hits" not in m_Counters
+
+    # 大小相同，只有修改时间变化的时候同样重新处理
+    write_lines(tmp_path / "a.ref", ["a", "b", "c", "d"])
+    m_Stat = os.stat(m_szRef)
+    os.utime(m_szRef, ns=(m_Stat.st_atime_ns, m_Stat.st_mtime_ns + 1000000000))
+    write_lines(tmp_path / "a.log", ["a", "b", "c", "d"])
+    (m_Result, _, m_Counters) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    assert m_Result is True and m_Counters.get("reference_cache_misses") == 1
+
+
+def test_options_select_different_artifacts(tmp_path):
+    write_lines(tmp_path / "a.ref", ["A", "# comment", "b"])
+    write_lines(tmp_path / "a.log", ["a", "b"])
+    m_szWork = str(tmp_path / "a.log")
+    m_szRef = str(tmp_path / "a.ref")
+    m_szCacheDir = str(tmp_path / "cache")
+
+    (m_Result, _, _) = run_job(tmp_path, m_szWork, m_szRef,
+                               ReferenceCache=True, ReferenceCacheDir=m_szCacheDir, **PREPROCESS)
+    assert m_Result is False
+    (m_Result, _, m_Counters) = run_job(tmp_path, m_szWork, m_szRef,
+                                        ReferenceCache=True, ReferenceCacheDir=m_szCacheDir, **PREPROCESS,
+                                        skiplines=["#.*"], CompareIgnoreCase=True)
+    assert m_Result is True and m_Counters.get("reference_cache_misses") == 1
+    assert len(os.listdir(m_szCacheDir)) == 2
+    assert not (tmp_path / ReferenceArtifactCache.SIDECAR_DIRECTORY).exists()
+
+    ReferenceArtifactCache(m_szCacheDir).clear()
+    assert os.listdir(m_szCacheDir) == []
+
+
+def test_memory_mode_and_damaged_cache_files(tmp_path):
+    write_lines(tmp_path / "a.ref", ["a", "b"])
+    write_lines(tmp_path / "a.log", ["a", "b"])
+    m_szWork = str(tmp_path / "a.log")
+    m_szRef = str(tmp_path / "a.ref")
+
+    # MEMORY模式下不写入磁盘
+    (m_Result, _, _) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache="MEMORY", **PREPROCESS)
+    assert m_Result is True
+    assert not (tmp_path / ReferenceArtifactCache.SIDECAR_DIRECTORY).exists()
+
+    # 损坏的缓存文件被当作不存在，重新生成
+    SharedRegistry.m_ReferenceArtifacts.clear()
+    run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    m_szSidecar = tmp_path / ReferenceArtifactCache.SIDECAR_DIRECTORY
+    (m_szArtifactFile,) = [m_szSidecar / m_szFileName for m_szFileName in os.listdir(str(m_szSidecar))]
+    m_szArtifactFile.write_bytes(b"damaged")
+    SharedRegistry.m_ReferenceArtifacts.clear()
+    (m_Result, _, m_Counters) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    assert m_Result is True and m_Counters.get("reference_cache_misses") == 1
+    SharedRegistry.m_ReferenceArtifacts.clear()
+    (_, _, m_Counters) = run_job(tmp_path, m_szWork, m_szRef, ReferenceCache=True, **PREPROCESS)
+    assert m_Counters.get("reference_cache_hits") == 1
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# 参考文件目录索引：新生成的参考文件可以立即被找到，查找结果的缓存容量有限
+import os
+
+from CompareLibrary.CompareEngine import ReferenceDirectoryIndex, CompareEngineRegistry
+
+
+def test_new_reference_file_is_found_immediately(tmp_path):
+    m_Index = ReferenceDirectoryIndex()
+    m_Directories = [str(tmp_path)]
+    assert m_Index.resolve(m_Directories, "a.ref") is None
+
+    # 目录索引在REVALIDATE_INTERVAL之内不会重建，但新文件仍然应该被找到
+    (tmp_path / "a.ref").write_text("a\n")
+    assert m_Index.resolve(m_Directories, "a.ref") == os.path.join(str(tmp_path), "a.ref")
+
+
+def test_new_file_in_earlier_directory(tmp_path):
+    m_First = tmp_path / "first"
+    m_Second = tmp_path / "second"
+    m_First.mkdir()
+    m_Second.mkdir()
+    (m_Second / "a.ref").write_text("a\n")
+    m_Index = ReferenceDirectoryIndex()
+    m_Directories = [str(m_First), str(m_Second)]
+    assert m_Index.resolve(m_Directories, "a.ref") == os.path.join(str(m_Second), "a.ref")
+
+    (m_First / "b.ref").write_text("b\n")
+    assert m_Index.resolve(m_Directories, "b.ref") == os.path.join(str(m_First), "b.ref")
+
+
+def test_compressed_reference_file(tmp_path):
+    m_Index = ReferenceDirectoryIndex()
+    assert m_Index.resolve([str(tmp_path)], "a.ref") is None
+    (tmp_path / "a.ref.gz").write_bytes(b"")
+    assert m_Index.resolve([str(tmp_path)], "a.ref") == os.path.join(str(tmp_path), "a.ref.gz")
+
+
+def test_resolved_paths_are_bounded(tmp_path):
+    for m_nFile in range(10):
+        (tmp_path / ("%d.ref" % m_nFile)).write_text("")
+    m_Index = ReferenceDirectoryIndex(p_nMaxResolved=4)
+    for m_nFile in range(10):
+        assert m_Index.resolve([str(tmp_path)], "%d.ref" % m_nFile) is not None
+    assert len(m_Index.m_ResolvedPaths) == 4
+    assert m_Index.resolve([str(tmp_path)], "missing.ref") is None
+    assert len(m_Index.m_ResolvedPaths) == 4
+
+
+def test_directory_indexes_are_bounded(tmp_path):
+    m_Index = ReferenceDirectoryIndex(p_nMaxDirectories=2)
+    for m_nDirectory in range(5):
+        m_Directory = tmp_path / str(m_nDirectory)
+        m_Directory.mkdir()
+        (m_Directory / "a.ref").write_text("")
+        assert m_Index.resolve([str(m_Directory)], "a.ref") == os.path.join(str(m_Directory), "a.ref")
+    m_Stats = m_Index.stats()
+    assert m_Stats["directories"] == 2
+    assert m_Stats["evictions"] >= 3
+
+
+def test_registry_reference_directories_are_bounded():
+    m_Registry = CompareEngineRegistry(p_nMaxReferenceDirs=3)
+    for m_nEnviron in range(10):
+        assert m_Registry.reference_directories("a%d,b%d" % (m_nEnviron, m_nEnviron)) == \
+            ["a%d" % m_nEnviron, "b%d" % m_nEnviron]
+    m_Stats = m_Registry.stats()
+    assert m_Stats["reference_directories"] == {"size": 3, "maxsize": 3}
+    assert "reference_index" in m_Stats
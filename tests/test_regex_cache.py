@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# 正则表达式缓存：容量有限的LRU，无法编译的表达式也会被缓存，可以在多线程中使用
+import re
+import threading
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare, RegexPatternCache
+
+
+@pytest.fixture
+def shared_cache():
+    # 关键字修改的是进程内共享的缓存，测试之后恢复
+    m_Cache = POSIXCompare.CompiledRegexPattern
+    m_nMaxSize = m_Cache.m_nMaxSize
+    m_Cache.clear()
+    yield m_Cache
+    m_Cache.resize(m_nMaxSize)
+    m_Cache.clear()
+
+
+def test_least_recently_used_pattern_is_evicted():
+    m_Cache = RegexPatternCache(2)
+    m_Pattern = m_Cache.get("a.*")
+    m_Cache.get("b.*")
+    # a.*被再次使用以后，最久没有使用的是b.*
+    assert m_Cache.get("a.*") is m_Pattern
+    m_Cache.get("c.*")
+    assert len(m_Cache) == 2
+    assert m_Cache.get("a.*") is m_Pattern
+    assert m_Cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 3, "evictions": 1, "invalid": 0}
+    # b.*已经被清除，需要重新编译
+    assert m_Cache.get("b.*") is not None
+    assert m_Cache.stats()["misses"] == 4
+
+    # 缩小容量的时候立即清除多出的表达式
+    m_Cache.resize(1)
+    assert len(m_Cache) == 1 and m_Cache.stats()["evictions"] == 3
+
+
+def test_ignorecase_is_part_of_the_key():
+    m_Cache = RegexPatternCache()
+    m_Pattern = m_Cache.get("a.*")
+    m_IgnoreCasePattern = m_Cache.get("a.*", True)
+    assert m_Pattern is not m_IgnoreCasePattern
+    assert m_IgnoreCasePattern.flags & re.IGNORECASE and not m_Pattern.flags & re.IGNORECASE
+    assert m_Cache.stats()["misses"] == 2
+
+
+def test_invalid_patterns_are_cached():
+    m_Cache = RegexPatternCache()
+    assert m_Cache.get("[") is None
+    assert m_Cache.get("[") is None
+    assert m_Cache.stats() == {"size": 1, "maxsize": RegexPatternCache.DEFAULT_MAXSIZE,
+                               "hits": 1, "misses": 1, "evictions": 0, "invalid": 1}
+    m_Cache.clear()
+    assert m_Cache.stats()["invalid"] == 0 and len(m_Cache) == 0
+
+
+def test_concurrent_access():
+    m_Cache = RegexPatternCache(50)
+    m_Patterns = ["p%d.*" % m_nPattern for m_nPattern in range(100)] + ["(%d" % m_nPattern for m_nPattern in range(20)]
+    m_Errors = []
+    m_Barrier = threading.Barrier(8)
+
+    def worker(p_nWorker):
+        try:
+            m_Barrier.wait()
+            for m_nRound in range(20):
+                for m_szPattern in m_Patterns[p_nWorker::3]:
+                    m_CompiledPattern = m_Cache.get(m_szPattern)
+                    if m_szPattern.startswith("("):
+                        assert m_CompiledPattern is None
+                    else:
+                        assert m_CompiledPattern.pattern == m_szPattern
+        except Exception as ex:
+            m_Errors.append(ex)
+
+    m_Threads = [threading.Thread(target=worker, args=(m_nWorker % 3,)) for m_nWorker in range(8)]
+    for m_Thread in m_Threads:
+        m_Thread.start()
+    for m_Thread in m_Threads:
+        m_Thread.join()
+    assert m_Errors == []
+    m_Stats = m_Cache.stats()
+    assert m_Stats["size"] == len(m_Cache) <= 50
+    # 每一次查找都被统计为命中或者未命中
+    m_nLookups = sum(20 * len(m_Patterns[m_nWorker % 3::3]) for m_nWorker in range(8))
+    assert m_Stats["hits"] + m_Stats["misses"] == m_nLookups
+    # 两个线程同时编译同一个表达式的时候只保留一个结果，所以清除的次数不超过放入的次数减去缓存的大小
+    assert 0 < m_Stats["evictions"] <= m_Stats["misses"] - m_Stats["size"]
+    assert m_Stats["invalid"] >= 20
+
+
+def test_keywords(tmp_path, monkeypatch, shared_cache):
+    pytest.importorskip("robot")
+    from CompareLibrary.RunCompare import RunCompare
+    from robot.errors import ExecutionFailed
+
+    monkeypatch.setenv("T_WORK", str(tmp_path))
+    monkeypatch.delenv("T_LOG", raising=False)
+    (tmp_path / "a.log").write_text("x1\ny2\nz3\n", encoding="utf-8")
+    (tmp_path / "a.ref").write_text("x\\d\ny\\d\nz\\d\n", encoding="utf-8")
+    m_Library = RunCompare()
+    m_Library.Compare_Mask("TRUE")
+    m_Library.Compare_Regex_Cache_Size(2)
+    assert m_Library.Compare_Files(str(tmp_path / "a.log"), str(tmp_path / "a.ref"))
+    m_Stats = m_Library.Compare_Get_Regex_Cache_Stats()
+    assert (m_Stats["size"], m_Stats["maxsize"]) == (2, 2)
+    assert m_Stats["misses"] == 3 and m_Stats["evictions"] == 1
+
+    with pytest.raises(ExecutionFailed):
+        m_Library.Compare_Regex_Cache_Size(0)
+    with pytest.raises(ExecutionFailed):
+        m_Library.Compare_Regex_Cache_Size("many")
+    assert m_Library.Compare_Get_Regex_Cache_Stats()["maxsize"] == 2
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# 比对结果缓存：相同的输入和选项直接使用缓存的结果，输入或者选项变化时重新比对
+import os
+
+from CompareLibrary.CompareEngine import CompareJob
+
+
+def write_lines(p_Path, p_Lines):
+    p_Path.write_text("".join(m_szLine + "\n" for m_szLine in p_Lines), encoding="utf-8")
+
+
+def run_job(p_Path, p_szWork, p_szRef, **kwargs):
+    m_Job = CompareJob(p_szWork, p_szRef,
+                       str(p_Path / "out.dif"), str(p_Path / "out.suc"),
+                       ResultCacheDir=str(p_Path / "cache"), CollectStats=True, **kwargs)
+    (m_CompareResult, m_ErrorMessage) = m_Job.run()
+    assert m_ErrorMessage is None
+    m_szDifFile = p_Path / "out.dif"
+    m_szDif = m_szDifFile.read_text(encoding="utf-8") if m_szDifFile.exists() else None
+    for m_szFileName in ("out.dif", "out.suc"):
+        if (p_Path / m_szFileName).exists():
+            os.remove(str(p_Path / m_szFileName))
+    return m_CompareResult, m_szDif, m_Job.m_Stats.m_Counters.get("cache_hits", 0)
+
+
+def test_cache_hit_and_invalidation(tmp_path):
+    write_lines(tmp_path / "a.log", ["a", "b", "c"])
+    write_lines(tmp_path / "a.ref", ["a", "x", "c"])
+    m_szWork = str(tmp_path / "a.log")
+    m_szRef = str(tmp_path / "a.ref")
+
+    (m_Result1, m_szDif1, m_nHits) = run_job(tmp_path, m_szWork, m_szRef)
+    assert m_Result1 is False and m_nHits == 0
+    (m_Result2, m_szDif2, m_nHits) = run_job(tmp_path, m_szWork, m_szRef)
+    assert (m_Result2, m_szDif2, m_nHits) == (m_Result1, m_szDif1, 1)
+
+    # 工作文件的内容变化以后，缓存的结果不再使用
+    write_lines(tmp_path / "a.log", ["a", "x", "c"])
+    (m_Result3, m_szDif3, m_nHits) = run_job(tmp_path, m_szWork, m_szRef)
+    assert (m_Result3, m_szDif3, m_nHits) == (True, None, 0)
+
+    # 比对选项变化以后，缓存的结果不再使用
+    (m_Result4, _, m_nHits) = run_job(tmp_path, m_szWork, m_szRef, CompareIgnoreCase=True)
+    assert (m_Result4, m_nHits) == (True, 0)
+
+
+def test_max_differences_is_part_of_the_key(tmp_path):
+    write_lines(tmp_path / "a.log", ["a%d" % m_nLine for m_nLine in range(20)])
+    write_lines(tmp_path / "a.ref", ["b%d" % m_nLine for m_nLine in range(20)])
+    m_szWork = str(tmp_path / "a.log")
+    m_szRef = str(tmp_path / "a.ref")
+
+    (_, m_szFullDif, _) = run_job(tmp_path, m_szWork, m_szRef)
+    (_, m_szTruncatedDif, m_nHits) = run_job(tmp_path, m_szWork, m_szRef, MaxDifferences=4)
+    assert m_nHits == 0
+    assert m_szTruncatedDif != m_szFullDif
+
+
+def test_unified_headers_follow_the_file_names(tmp_path):
+    write_lines(tmp_path / "a.log", ["a", "b", "c"])
+    write_lines(tmp_path / "a.ref", ["a", "x", "c"])
+    write_lines(tmp_path / "b.log", ["a", "b", "c"])
+    write_lines(tmp_path / "b.ref", ["a", "x", "c"])
+
+    (_, m_szDif, _) = run_job(tmp_path, str(tmp_path / "a.log"), str(tmp_path / "a.ref"), DiffFormat="UNIFIED")
+    assert str(tmp_path / "a.log") in m_szDif
+    (_, m_szDif, m_nHits) = run_job(tmp_path, str(tmp_path / "b.log"), str(tmp_path / "b.ref"), DiffFormat="UNIFIED")
+    assert m_nHits == 0
+    assert str(tmp_path / "b.log") in m_szDif and str(tmp_path / "a.log") not in m_szDif
+
+    # ANNOTATED格式的结果中不包含文件名，内容相同的文件可以共用缓存的结果
+    run_job(tmp_path, str(tmp_path / "a.log"), str(tmp_path / "a.ref"))
+    (_, _, m_nHits) = run_job(tmp_path, str(tmp_path / "b.log"), str(tmp_path / "b.ref"))
+    assert m_nHits == 1
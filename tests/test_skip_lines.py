@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# 忽略行和正则比对的匹配规则：和原有版本的compare_string相同，使用re.match并且要求匹配的内容是整行
+import random
+import re
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare, SkipLineFilter
+
+
+def baseline_match(p_szLine, p_szPattern):
+    # 原有版本中判断一行是否被忽略的方法
+    if p_szLine == p_szPattern:
+        return True
+    try:
+        matchObj = re.match(re.compile(p_szPattern), p_szLine)
+    except re.error:
+        return False
+    return matchObj is not None and matchObj.group() == p_szLine
+
+
+@pytest.mark.parametrize("p_Patterns, p_szLine, p_bSkipped", [
+    (["a|ab"], "ab", False),
+    (["ab|a"], "ab", True),
+    (["x", "a|ab"], "ab", False),
+    (["a*?"], "aaa", False),
+    (["a*"], "aaa", True),
+    (["(a)\\1"], "aa", True),
+    (["(a)\\1", "b"], "b", True),
+    (["(["], "([", True),
+    (["(["], "(", False),
+    (["(?i)abc", "x"], "ABC", True),
+    (["^SQL.*"], "SQL> select 1", True),
+    (["abc$"], "abc", True),
+])
+def test_skip_rules(p_Patterns, p_szLine, p_bSkipped):
+    assert SkipLineFilter(p_Patterns).is_skipped(p_szLine) is p_bSkipped
+    assert any(baseline_match(p_szLine, m_szPattern) for m_szPattern in p_Patterns) is p_bSkipped
+
+
+@pytest.mark.parametrize("p_nSeed", range(50))
+def test_skip_filter_matches_baseline(p_nSeed):
+    m_Random = random.Random(p_nSeed)
+    m_Atoms = ["a", "b", "ab", "a*", "b+", "a*?", "(a|ab)", "(ab|a)", "[ab]", ".", "b?", "(a)\\1"]
+    m_Patterns = ["".join(m_Random.choice(m_Atoms) for _ in range(m_Random.randint(1, 3)))
+                  for _ in range(m_Random.randint(1, 4))]
+    if m_Random.random() < 0.5:
+        m_Patterns = ["|".join(m_Patterns)]
+    m_Filter = SkipLineFilter(m_Patterns)
+    for _ in range(200):
+        m_szLine = "".join(m_Random.choice("ab") for _ in range(m_Random.randint(0, 5)))
+        assert m_Filter.is_skipped(m_szLine) == \
+            any(baseline_match(m_szLine, m_szPattern) for m_szPattern in m_Patterns), (m_Patterns, m_szLine)
+
+
+def test_masked_compare_uses_the_same_rule():
+    # 启用正则比对时，参考文件中的正则表达式和工作文件的行按照相同的规则匹配
+    m_Comparer = POSIXCompare()
+    assert m_Comparer.compare_string("ab", "ab|a", True)
+    assert not m_Comparer.compare_string("ab", "a|ab", True)
+    x = ["ab", "ab"]
+    y = ["a|ab", "ab|a"]
+    equal = m_Comparer.line_comparator(x, y, p_compare_maskEnabled=True)
+    assert not equal(0, 0)
+    assert equal(1, 1)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# 比对的统计信息：最近一次比对以及整个Suite的汇总
+import pytest
+
+pytest.importorskip("robot")
+
+from CompareLibrary.RunCompare import RunCompare  # noqa: E402
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setenv("T_WORK", str(tmp_path))
+    monkeypatch.delenv("T_LOG", raising=False)
+    m_Library = RunCompare()
+    m_Library.Compare_Enable_Stats("TRUE")
+    return m_Library
+
+
+def test_last_and_suite_stats(tmp_path, library):
+    (tmp_path / "a.log").write_text("a\nb\n")
+    (tmp_path / "a.ref").write_text("a\n[b]\n")
+    library.Compare_Mask("TRUE")
+    for _ in range(2):
+        assert library.Compare_Files(str(tmp_path / "a.log"), str(tmp_path / "a.ref"))
+    m_LastStats = library.Compare_Get_Stats("LAST")
+    m_SuiteStats = library.Compare_Get_Stats("SUITE")
+    assert m_LastStats["compares"] == 1
+    assert m_SuiteStats["compares"] == 2
+    assert m_SuiteStats["counters"]["work_lines"] == 2 * m_LastStats["counters"]["work_lines"]
+    # 记录的是正则表达式缓存的查找次数
+    assert "regex_cache_lookups" in m_LastStats["counters"]
+    assert "regex_lookups" not in m_LastStats["counters"]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# 统一差异格式：生成的dif文件可以被patch使用，把工作文件还原为参考文件
+import random
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+),(\d+) \+(\d+),(\d+) @@$')
+
+
+def random_files(p_Random):
+    m_Reference = ["line %d" % p_Random.randint(0, 20) for _ in range(p_Random.randint(0, 60))]
+    m_Work = list(m_Reference)
+    for _ in range(p_Random.randint(0, 8)):
+        m_nPos = p_Random.randint(0, len(m_Work))
+        m_fAction = p_Random.random()
+        if m_fAction < 0.3 and len(m_Work) != 0:
+            del m_Work[min(m_nPos, len(m_Work) - 1)]
+        elif m_fAction < 0.6:
+            m_Work.insert(m_nPos, "new %d" % p_Random.randint(0, 20))
+        else:
+            # 只在工作文件中出现，会被Skip掉的行
+            m_Work.insert(m_nPos, "# skipped %d" % p_Random.randint(0, 20))
+    # 两个文件中都有被忽略的空行
+    for m_Lines in (m_Work, m_Reference):
+        for _ in range(p_Random.randint(0, 3)):
+            m_Lines.insert(p_Random.randint(0, len(m_Lines)), "")
+    return m_Work, m_Reference
+
+
+def compared_lines(p_Lines):
+    # 参与比对的行，即去掉被Skip掉的行和空行
+    return [m_szLine for m_szLine in p_Lines if m_szLine != "" and not m_szLine.startswith("# skipped")]
+
+
+def write_lines(p_Path, p_Lines):
+    p_Path.write_text("".join(m_szLine + "\n" for m_szLine in p_Lines), encoding="utf-8")
+
+
+def check_hunk_counts(p_Rows):
+    # 每个差异块@@行中的行数必须和差异块的内容一致
+    m_nRow = 3
+    while m_nRow < len(p_Rows):
+        m_Match = HUNK_HEADER.match(p_Rows[m_nRow])
+        assert m_Match is not None, p_Rows[m_nRow]
+        m_nRow = m_nRow + 1
+        m_nWorkCount = 0
+        m_nRefCount = 0
+        while m_nRow < len(p_Rows) and not p_Rows[m_nRow].startswith("@@"):
+            if p_Rows[m_nRow][0] != '+':
+                m_nWorkCount = m_nWorkCount + 1
+            if p_Rows[m_nRow][0] != '-':
+                m_nRefCount = m_nRefCount + 1
+            m_nRow = m_nRow + 1
+        assert (m_nWorkCount, m_nRefCount) == (int(m_Match.group(2)), int(m_Match.group(4)))
+
+
+@pytest.mark.skipif(shutil.which("patch") is None, reason="patch is not installed")
+@pytest.mark.parametrize("p_bStreaming", [False, True])
+@pytest.mark.parametrize("p_nSeed", range(60))
+def test_unified_diff_round_trips_through_patch(tmp_path, p_nSeed, p_bStreaming):
+    m_Random = random.Random(p_nSeed)
+    (m_Work, m_Reference) = random_files(m_Random)
+    write_lines(tmp_path / "work.log", m_Work)
+    write_lines(tmp_path / "work.ref", m_Reference)
+
+    m_Comparer = POSIXCompare()
+    if p_bStreaming:
+        m_CompareFunction = m_Comparer.compare_text_files_streaming
+    else:
+        m_CompareFunction = m_Comparer.compare_text_files
+    m_Rows = m_CompareFunction(str(tmp_path / "work.log"), str(tmp_path / "work.ref"),
+                               skiplines=["# skipped.*"], ignoreEmptyLine=True,
+                               OutputFormat="UNIFIED", ContextLines=m_Random.randint(0, 3))
+    if not p_bStreaming:
+        m_Rows = m_Rows[1]
+    m_Rows = list(m_Rows)
+    if compared_lines(m_Work) == compared_lines(m_Reference):
+        assert m_Rows == []
+        return
+    check_hunk_counts(m_Rows)
+
+    # 被Skip掉的行和空行不在差异块中，patch之后工作文件中的这些行仍然保留，参考文件中的这些行不会被添加
+    write_lines(tmp_path / "work.dif", m_Rows)
+    subprocess.run(["patch", "--quiet", "--fuzz=0", "-o", str(tmp_path / "patched.log"),
+                    str(tmp_path / "work.log"), str(tmp_path / "work.dif")], check=True)
+    m_Patched = (tmp_path / "patched.log").read_text(encoding="utf-8").splitlines()
+    assert compared_lines(m_Patched) == compared_lines(m_Reference)
+
+
+@pytest.mark.parametrize("p_szMode", ["exact", "lines", "streaming"])
+@pytest.mark.parametrize("p_bTrailingSkipped", [False, True])
+def test_last_hunk_at_the_end_of_the_work_file(tmp_path, monkeypatch, p_szMode, p_bTrailingSkipped):
+    # 位于文件结尾的差异块保留前面所有的相同行，工作文件结尾还有被Skip掉的行的时候前后保留相同的行数
+    # 工作文件的总行数在比对的时候已经记录，生成差异块的时候不再重新读取工作文件
+    if p_szMode == "exact" and p_bTrailingSkipped:
+        pytest.skip("exact compare has no skipped lines")
+    m_Work = ["a", "b", "c", "d", "x", "e"] + (["# skipped"] if p_bTrailingSkipped else [])
+    write_lines(tmp_path / "work.log", m_Work)
+    write_lines(tmp_path / "work.ref", ["a", "b", "c", "d", "y", "e"])
+    m_Opened = []
+    m_OpenTextFile = POSIXCompare.open_text_file
+
+    def open_text_file(p_szFileName):
+        m_Opened.append(p_szFileName)
+        return m_OpenTextFile(p_szFileName)
+
+    monkeypatch.setattr(POSIXCompare, "open_text_file", staticmethod(open_text_file))
+    m_Options = dict(OutputFormat="UNIFIED", ContextLines=3)
+    if p_szMode != "exact":
+        m_Options["skiplines"] = ["# skipped"]
+    m_Comparer = POSIXCompare()
+    if p_szMode == "streaming":
+        m_Rows = list(m_Comparer.compare_text_files_streaming(str(tmp_path / "work.log"),
+                                                              str(tmp_path / "work.ref"), **m_Options))
+    else:
+        m_Rows = list(m_Comparer.compare_text_files(str(tmp_path / "work.log"),
+                                                    str(tmp_path / "work.ref"), **m_Options)[1])
+    if p_bTrailingSkipped:
+        assert m_Rows[3:] == ["@@ -4,3 +4,3 @@", " d", "-x", "+y", " e"]
+    else:
+        assert m_Rows[3:] == ["@@ -2,5 +2,5 @@", " b", " c", " d", "-x", "+y", " e"]
+    # 按照字节比对的时候直接读取文件，不使用open_text_file
+    assert m_Opened.count(str(tmp_path / "work.log")) == (0 if p_szMode == "exact" else 1)
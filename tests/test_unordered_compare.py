@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# 不考虑行的顺序的比对：两个文件作为行的多重集合比对，启用正则时多出的行和参考文件中的正则表达式配对
+import random
+
+import pytest
+
+from CompareLibrary.CompareEngine import POSIXCompare
+
+
+def write_lines(p_Path, p_Lines):
+    p_Path.write_text("".join(m_szLine + "\n" for m_szLine in p_Lines), encoding="utf-8")
+    return str(p_Path)
+
+
+def compare(p_Path, p_WorkLines, p_RefLines, p_Comparer=None, **kwargs):
+    m_szWork = write_lines(p_Path / "a.log", p_WorkLines)
+    m_szRef = write_lines(p_Path / "a.ref", p_RefLines)
+    if p_Comparer is None:
+        p_Comparer = POSIXCompare()
+    (m_CompareResult, m_Rows) = p_Comparer.compare_text_files_unordered(m_szWork, m_szRef, **kwargs)
+    return m_CompareResult, list(m_Rows)
+
+
+def test_order_is_ignored(tmp_path):
+    assert compare(tmp_path, ["c", "a", "b"], ["a", "b", "c"]) == (True, [])
+
+
+def test_duplicates_are_counted(tmp_path):
+    (m_CompareResult, m_Rows) = compare(tmp_path, ["a", "b", "a"], ["b", "a", "b"])
+    assert m_CompareResult is False
+    # 多出的是工作文件中的第二个a，缺少的是参考文件中的第二个b
+    assert m_Rows == ["-     3 a", "+     3 b"]
+
+
+def test_skip_and_ignore_options(tmp_path):
+    assert compare(tmp_path, ["# x", " B", "", "a"], ["A", "b"], skiplines=["#.*"], ignoreEmptyLine=True,
+                   CompareIgnoreCase=True, CompareIgnoreTailOrHeadBlank=True) == (True, [])
+
+
+def test_mask_matches_extra_lines(tmp_path):
+    assert compare(tmp_path, ["id 12", "x"], ["x", r"id \d+"], CompareWithMask=True) == (True, [])
+    # 不启用正则的时候按照内容比对
+    assert compare(tmp_path, ["id 12", "x"], ["x", r"id \d+"])[0] is False
+    assert compare(tmp_path, ["ID 12"], [r"id \d+"], CompareWithMask=True, CompareIgnoreCase=True) == (True, [])
+
+
+@pytest.mark.parametrize("p_RefLines", [["a.*", r"a\d"], [r"a\d", "a.*"]])
+def test_mask_pairing_does_not_depend_on_reference_order(tmp_path, p_RefLines):
+    # a1能够匹配两个表达式，ab只能匹配a.*，依次配对的时候a.*在前面会被a1取走
+    assert compare(tmp_path, ["a1", "ab"], p_RefLines, CompareWithMask=True) == (True, [])
+
+
+def test_mask_pairing_with_duplicates(tmp_path):
+    # 表达式出现多次的时候可以和多个行配对
+    assert compare(tmp_path, ["a1", "a2", "ab", "ab"], [r"a\d", "a.*", r"a\d", "a.*"],
+                   CompareWithMask=True) == (True, [])
+    (m_CompareResult, m_Rows) = compare(tmp_path, ["a1", "ab", "ab", "ab"], [r"a\d", "a.*", "a.*", "b"],
+                                        CompareWithMask=True)
+    assert m_CompareResult is False
+    assert m_Rows == ["-     4 ab", "+     4 b"]
+
+
+def test_mask_only_tries_regex_lines(tmp_path):
+    # 不包含正则元字符的参考文件的行只能和内容相同的行匹配，不需要编译，也不会放入正则表达式的缓存
+    m_Patterns = []
+
+    class RecordingCache:
+        def get(self, p_szPattern, p_bIgnoreCase=False):
+            m_Patterns.append(p_szPattern)
+            return POSIXCompare.CompiledRegexPattern.get(p_szPattern, p_bIgnoreCase)
+
+    m_Comparer = POSIXCompare()
+    m_Comparer.CompiledRegexPattern = RecordingCache()
+    (m_CompareResult, m_Rows) = compare(tmp_path, ["x1", "x2", "y"], ["lit1", "lit2", r"x\d", "y"],
+                                        m_Comparer, CompareWithMask=True)
+    assert (m_CompareResult, m_Rows) == (False, ["-     2 x2", "+     1 lit1", "+     2 lit2"])
+    assert m_Patterns == [r"x\d"]
+
+
+def maximum_matching(p_Extra, p_Patterns, p_Comparer):
+    # 穷举所有配对，返回最多能够配对的行数
+    if not p_Extra:
+        return 0
+    m_nBest = maximum_matching(p_Extra[1:], p_Patterns, p_Comparer)
+    for m_nPos in range(len(p_Patterns)):
+        if p_Comparer.compare_string(p_Extra[0], p_Patterns[m_nPos], True, False):
+            m_nBest = max(m_nBest, 1 + maximum_matching(p_Extra[1:], p_Patterns[:m_nPos] + p_Patterns[m_nPos + 1:],
+                                                        p_Comparer))
+    return m_nBest
+
+
+@pytest.mark.parametrize("p_nSeed", range(100))
+def test_mask_pairing_is_maximum(tmp_path, p_nSeed):
+    m_Random = random.Random(p_nSeed)
+    m_Extra = [m_Random.choice(["a1", "ab", "b2", "bb", "a2"]) for _ in range(m_Random.randint(0, 6))]
+    m_Patterns = [m_Random.choice(["a.*", r"a\d", r"[ab]\d", "b.", r".\d", "a[b-z]"])
+                  for _ in range(m_Random.randint(0, 6))]
+    m_Comparer = POSIXCompare()
+    (m_CompareResult, m_Rows) = compare(tmp_path, m_Extra, m_Patterns, m_Comparer, CompareWithMask=True)
+    m_nMatched = maximum_matching(m_Extra, m_Patterns, m_Comparer)
+    m_ExtraRows = [m_szRow for m_szRow in m_Rows if m_szRow[0] == "-"]
+    m_MissingRows = [m_szRow for m_szRow in m_Rows if m_szRow[0] == "+"]
+    assert len(m_ExtraRows) == len(m_Extra) - m_nMatched
+    assert len(m_MissingRows) == len(m_Patterns) - m_nMatched
+    assert m_CompareResult == (len(m_Rows) == 0)